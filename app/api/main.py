@@ -87,10 +87,23 @@ async def startup_event():
     
     # Store in app state
     app.state.bot = bot
+    
+    # Receive cache invalidations from the bot process
+    from app.core.invalidation import start_listener
+    await start_listener()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close bot session on shutdown"""
+    from app.tasks.reprocess import reprocess_job
+    await reprocess_job.shutdown()
+    
+    from app.tasks.file_sizes import file_size_backfill
+    await file_size_backfill.shutdown()
+    
+    from app.core.invalidation import stop_listener
+    await stop_listener()
+    
     if hasattr(app.state, "bot"):
         await app.state.bot.session.close()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -35,19 +35,39 @@ async def get_admin_logs(
     limit: int = 100,
     admin_id: Optional[int] = None,
     action_type: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_admin: AdminUser = Depends(require_super_admin)
 ):
-    """Get admin audit logs (super admin only, read-only)"""
-    from app.models.crud import get_admin_logs, get_admin_logs_count, get_admin_by_id
+    """
+    Get admin audit logs (super admin only, read-only)
     
-    logs = await get_admin_logs(
-        db,
-        skip=skip,
-        limit=limit,
-        admin_id=admin_id,
-        action_type=action_type
-    )
+    Pass cursor (empty for the first page, then next_cursor) for keyset
+    pagination; skip is kept for older clients.
+    """
+    from app.models.crud import get_admin_logs, get_admin_logs_count, get_admin_by_id, get_admin_logs_page
+    
+    next_cursor = None
+    if cursor is not None:
+        try:
+            page = await get_admin_logs_page(
+                db,
+                cursor=cursor or None,
+                limit=limit,
+                admin_id=admin_id,
+                action_type=action_type
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        logs, next_cursor = page.items, page.next_cursor
+    else:
+        logs = await get_admin_logs(
+            db,
+            skip=skip,
+            limit=limit,
+            admin_id=admin_id,
+            action_type=action_type
+        )
     total = await get_admin_logs_count(db)
     
     # Get admin usernames for logs
@@ -85,5 +105,6 @@ async def get_admin_logs(
         "logs": logs_data,
         "total": total,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
@@ -28,49 +28,72 @@ async def get_files(
     limit: int = 50,
     file_type: str = None,
     search: str = None,
+    cursor: str = None,
+    tag: str = None,
+    level: str = None,
     db: AsyncSession = Depends(get_db),
     token: dict = Depends(verify_token)
 ):
-    """Get files list with optional filtering and search (with lazy file size loading)"""
-    from app.models.crud import get_all_files, get_files_count, search_files
-    from app.bot.helpers import format_file_size
-    from app.bot.main import _bot_instance
-    import logging
+    """
+    Get files list with optional filtering and search
     
-    logger = logging.getLogger(__name__)
+    Pass cursor (empty for the first page, then next_cursor) for keyset
+    pagination; skip is kept for older clients. tag and level filters
+    (see /api/files/facets) need a cursor.
+    """
+    from app.models.crud import (
+        get_all_files, get_files_count, search_files, get_all_files_page, search_files_page,
+        get_facet_counts
+    )
+    from app.models.tags import normalize_tags
+    from app.bot.helpers import format_file_size
     
-    if search:
+    next_cursor = None
+    if cursor is not None:
+        try:
+            if search:
+                page = await search_files_page(db, query=search, file_type=file_type, cursor=cursor or None, limit=limit)
+            else:
+                page = await get_all_files_page(
+                    db, file_type=file_type, cursor=cursor or None, limit=limit, tag=tag, level=level
+                )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        files, next_cursor = page.items, page.next_cursor
+        if search:
+            total = len(files)
+        elif tag or level:
+            facets = await get_facet_counts(db, level=level if tag else None)
+            counts = dict(facets.tags) if tag else dict(facets.levels)
+            total = counts.get(next(iter(normalize_tags(tag)), "") if tag else level, 0)
+        else:
+            total = await get_files_count(db, file_type=file_type)
+    elif search:
         files = await search_files(db, query=search, file_type=file_type, skip=skip, limit=limit)
         total = len(files)  # search_files returns limited results
     else:
         files = await get_all_files(db, file_type=file_type, skip=skip, limit=limit)
         total = await get_files_count(db, file_type=file_type)
     
-    # Lazy loading: fetch and save file sizes for files without size
+    # Download increments not yet reconciled into files.downloads_count
+    from app.core.counters import download_counter
+    pending_downloads = await download_counter.get_pending([f.id for f in files])
+    
+    # Missing sizes are filled in the background, shown on next load
+    if any(f.file_size is None for f in files):
+        from app.tasks.file_sizes import file_size_backfill
+        file_size_backfill.trigger()
+    
     files_data = []
     for f in files:
         file_size = f.file_size
-        
-        # If size is not in database and bot is available, fetch and save it
-        if file_size is None and _bot_instance:
-            try:
-                file_info = await _bot_instance.get_file(f.file_id)
-                if file_info and file_info.file_size:
-                    file_size = file_info.file_size
-                    # Save to database for next time
-                    f.file_size = file_size
-                    await db.commit()
-                    logger.info(f"✅ Fetched and saved size for: {f.title} ({file_size} bytes)")
-            except Exception as e:
-                logger.warning(f"⚠️ Could not fetch size for {f.title}: {e}")
-        
         files_data.append({
             "id": f.id,
             "title": f.title,
             "file_type": f.file_type,
             "file_size": file_size or 0,
             "file_size_formatted": format_file_size(file_size) if file_size else "Unknown",
-            "downloads_count": f.downloads_count,
+            "downloads_count": (f.downloads_count or 0) + pending_downloads.get(f.id, 0),
             "created_at": f.created_at.isoformat()
         })
     
@@ -79,7 +102,59 @@ async def get_files(
         "total": total,
         "skip": skip,
         "limit": limit,
-        "search": search
+        "search": search,
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/api/files/reprocess")
+async def get_reprocess_status(token: dict = Depends(verify_token)):
+    """Get catalog reprocessing job progress"""
+    from app.tasks.reprocess import reprocess_job
+    return await reprocess_job.get_status()
+
+
+@router.post("/api/files/reprocess")
+async def start_reprocess(
+    mode: str = Form("missing"),
+    token: dict = Depends(verify_token)
+):
+    """Start catalog reprocessing (mode: missing, all or resume)"""
+    from app.tasks.reprocess import reprocess_job
+    
+    try:
+        status = await reprocess_job.start(mode)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    
+    return {"success": True, "status": status}
+
+
+@router.post("/api/files/reprocess/stop")
+async def stop_reprocess(token: dict = Depends(verify_token)):
+    """Stop catalog reprocessing (resumable)"""
+    from app.tasks.reprocess import reprocess_job
+    
+    if not await reprocess_job.stop():
+        return JSONResponse({"error": "Reprocessing is not running"}, status_code=409)
+    
+    return {"success": True, "message": "Reprocessing will stop after the current uploads"}
+
+
+@router.get("/api/files/facets")
+async def get_files_facets(
+    level: str = None,
+    db: AsyncSession = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """Get file counts per tag (within level, if given) and per level"""
+    from app.models.crud import get_facet_counts
+    
+    facets = await get_facet_counts(db, level=level)
+    return {
+        "tags": [{"tag": tag, "count": count} for tag, count in facets.tags],
+        "levels": [{"level": name, "count": count} for name, count in facets.levels],
+        "level": level
     }
 
 
@@ -94,6 +169,9 @@ async def get_file(
     if not file:
         return JSONResponse({"error": "File not found"}, status_code=404)
     
+    from app.core.counters import download_counter
+    pending_downloads = await download_counter.get_pending([file.id])
+    
     return {
         "id": file.id,
         "title": file.title,
@@ -101,7 +179,7 @@ async def get_file(
         "tags": file.tags,
         "description": file.description,
         "file_type": file.file_type,
-        "downloads_count": file.downloads_count,
+        "downloads_count": (file.downloads_count or 0) + pending_downloads.get(file.id, 0),
         "created_at": file.created_at.isoformat()
     }
 
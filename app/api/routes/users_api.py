@@ -29,16 +29,30 @@ async def get_users(
     skip: int = 0,
     limit: int = 50,
     search: str = None,
+    cursor: str = None,
     db: AsyncSession = Depends(get_db),
     token: dict = Depends(verify_token)
 ):
-    """Get users list with optional search"""
+    """
+    Get users list with optional search
+    
+    Without search, pass cursor (empty for the first page, then
+    next_cursor) for keyset pagination; skip is kept for older clients.
+    """
     from app.models.permissions import parse_permissions
-    from app.models.crud import search_users
+    from app.models.crud import search_users, get_all_users_page
     
+    next_cursor = None
     if search:
         users = await search_users(db, query=search, skip=skip, limit=limit)
         total = await get_users_count(db, query=search)
+    elif cursor is not None:
+        try:
+            page = await get_all_users_page(db, cursor=cursor or None, limit=limit, primary_admin_id=settings.ADMIN_ID)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        users, next_cursor = page.items, page.next_cursor
+        total = await get_users_count(db)
     else:
         users = await get_all_users(db, skip=skip, limit=limit, primary_admin_id=settings.ADMIN_ID)
         total = await get_users_count(db)
@@ -62,7 +76,70 @@ async def get_users(
         "total": total,
         "skip": skip,
         "limit": limit,
-        "search": search
+        "search": search,
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/api/users/{user_id}/downloads")
+async def get_user_downloads_route(
+    user_id: int,
+    cursor: str = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """Get user's download history, newest first (pass next_cursor for the next page)"""
+    from app.models.crud import get_user_downloads_page
+    
+    try:
+        page = await get_user_downloads_page(db, user_id, cursor=cursor or None, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "downloads": [
+            {
+                "id": d.id,
+                "file_id": d.file_id,
+                "title": d.file.title if d.file else None,
+                "downloaded_at": d.downloaded_at.isoformat() if d.downloaded_at else None
+            }
+            for d in page.items
+        ],
+        "limit": limit,
+        "next_cursor": page.next_cursor
+    }
+
+
+@router.get("/api/users/{user_id}/saved")
+async def get_user_saved_route(
+    user_id: int,
+    cursor: str = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """Get user's saved files, newest first (pass next_cursor for the next page)"""
+    from app.models.crud import get_user_saved_files_page
+    
+    try:
+        page = await get_user_saved_files_page(db, user_id, cursor=cursor or None, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "saved": [
+            {
+                "id": s.id,
+                "file_id": s.file_id,
+                "title": s.file.title if s.file else None,
+                "saved_at": s.saved_at.isoformat() if s.saved_at else None
+            }
+            for s in page.items
+        ],
+        "limit": limit,
+        "next_cursor": page.next_cursor
     }
 
 
@@ -144,6 +221,10 @@ async def update_permissions_route(
         await db.commit()
         await db.refresh(user)
         
+        # Drop cached snapshot so the bot sees new permissions immediately
+        from app.models.cache import publish_user_change
+        await publish_user_change(user.telegram_id)
+        
         return {"success": True, "message": "Permissions updated successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,6 +1,8 @@
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from app.core.config import settings
+from app.bot.middlewares.throttling import ThrottlingMiddleware
+from app.bot.middlewares.db_session import DbSessionMiddleware
 from app.bot.middlewares.user_check import UserCheckMiddleware
 from app.bot.middlewares.language import LanguageMiddleware
 from app.bot.middlewares.admin_check import AdminCheckMiddleware
@@ -19,7 +21,7 @@ except ImportError:
     logger.warning("Redis storage not available - install redis package for FSM persistence")
 
 # Import handlers
-from app.bot.handlers import start, search, downloads, saved_list, help, default, stats
+from app.bot.handlers import start, search, inline_search, browse, downloads, saved_list, help, default, stats, chat_member
 from app.bot.handlers.admin import upload, delete, stats as admin_stats, users, broadcast, settings as admin_settings, fsub
 
 
@@ -42,17 +44,34 @@ dp = None  # Will be initialized in init_bot()
 
 def setup_middlewares():
     """Setup middlewares"""
-    # User check middleware (must be first)
+    # Per-user rate limiting (first, so rejected updates cost nothing)
+    throttling = ThrottlingMiddleware()
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
+    
+    # Lazy per-update DB session shared by all middlewares and the handler
+    # (before anything that reads data["db"])
+    dp.message.middleware(DbSessionMiddleware())
+    dp.callback_query.middleware(DbSessionMiddleware())
+    dp.chat_member.middleware(DbSessionMiddleware())
+    dp.inline_query.middleware(DbSessionMiddleware())
+    dp.chosen_inline_result.middleware(DbSessionMiddleware())
+    
+    # User check middleware (must run before the others below)
     dp.message.middleware(UserCheckMiddleware())
     dp.callback_query.middleware(UserCheckMiddleware())
+    dp.inline_query.middleware(UserCheckMiddleware())
+    dp.chosen_inline_result.middleware(UserCheckMiddleware())
     
     # Language middleware
     dp.message.middleware(LanguageMiddleware())
     dp.callback_query.middleware(LanguageMiddleware())
+    dp.inline_query.middleware(LanguageMiddleware())
     
     # Force subscribe check middleware (after user check, before admin check)
     dp.message.middleware(FSubCheckMiddleware())
     dp.callback_query.middleware(FSubCheckMiddleware())
+    dp.inline_query.middleware(FSubCheckMiddleware())
 
 
 def setup_routers():
@@ -60,10 +79,13 @@ def setup_routers():
     # User handlers
     dp.include_router(start.router)
     dp.include_router(search.router)
+    dp.include_router(inline_search.router)  # @bot query inline mode
+    dp.include_router(browse.router)
     dp.include_router(downloads.router)
     dp.include_router(saved_list.router)
     dp.include_router(help.router)
     dp.include_router(stats.router)  # Stats command available to all users
+    dp.include_router(chat_member.router)  # Join/leave events for force subscribe channels
     
     # Admin handlers (with admin check middleware and specific permissions)
     # These must be registered BEFORE the default handler so state handlers work correctly
@@ -71,6 +93,7 @@ def setup_routers():
     delete.router.message.middleware(AdminCheckMiddleware(required_permission="delete"))
     admin_stats.router.message.middleware(AdminCheckMiddleware(required_permission="stats"))
     users.router.message.middleware(AdminCheckMiddleware(required_permission="users"))
+    users.router.callback_query.middleware(AdminCheckMiddleware(required_permission="users"))
     broadcast.router.message.middleware(AdminCheckMiddleware(required_permission="broadcast"))
     admin_settings.router.message.middleware(AdminCheckMiddleware(required_permission="settings"))
     fsub.router.message.middleware(AdminCheckMiddleware(required_permission="fsub"))
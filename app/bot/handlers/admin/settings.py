@@ -6,6 +6,8 @@ from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.bot.translations import get_text
 from app.models.crud import set_setting, delete_setting
+from app.bot.thumbnails import get_thumbnail
+import html
 import logging
 
 logger = logging.getLogger(__name__)
@@ -52,10 +54,19 @@ async def receive_default_thumbnail(message: Message, state: FSMContext, db: Asy
         await message.answer("🚫 Could not extract thumbnail. Please send a photo or image file.")
         return
     
+    # Download and normalize once, so processing never fetches it again
+    try:
+        await get_thumbnail(message.bot, thumbnail_id)
+    except Exception as e:
+        logger.error(f"Could not prepare thumbnail {thumbnail_id}: {e}", exc_info=True)
+        await message.answer("🚫 Could not process this image. Please send a photo or image file.")
+        return
+    
     # Save to settings
     await set_setting(db, "default_thumbnail_id", thumbnail_id)
     
     await message.answer(get_text("default_thumbnail_set", lang))
+    await message.answer("ℹ️ Existing files keep the old thumbnail until reprocessed: /reprocess all")
     await state.clear()
 
 
@@ -72,3 +83,59 @@ async def cancel_settings(message: Message, state: FSMContext, lang: str):
     """Cancel settings operation"""
     await state.clear()
     await message.answer(get_text("upload_cancelled", lang))
+
+
+def _format_reprocess_status(status: dict) -> str:
+    """Format reprocessing job progress for the admin"""
+    if status["status"] == "idle":
+        return "ℹ️ Reprocessing has not been run yet."
+    
+    text = (
+        f"🔄 <b>Reprocessing ({status['mode']})</b>: {status['status']}\n"
+        f"Progress: {status['processed'] + status['failed']}/{status['total']} ({status['percent']}%)\n"
+        f"✅ Processed: {status['processed']}\n"
+        f"❌ Failed: {status['failed']}\n"
+        f"Checkpoint: file ID {status['last_id']}"
+    )
+    if status.get("last_error"):
+        text += f"\nLast error: {html.escape(status['last_error'])}"
+    return text
+
+
+@router.message(Command("reprocess"))
+async def cmd_reprocess(message: Message):
+    """Start catalog reprocessing: /reprocess [missing|all|resume]"""
+    from app.tasks.reprocess import reprocess_job
+    
+    parts = message.text.split(maxsplit=1)
+    mode = parts[1].strip().lower() if len(parts) > 1 else "missing"
+    try:
+        status = await reprocess_job.start(mode)
+    except ValueError as e:
+        await message.answer(f"🚫 {e}\n\nUsage: /reprocess [missing|all|resume]")
+        return
+    
+    await message.answer(
+        _format_reprocess_status(status) + "\n\nCheck progress with /reprocess_status, stop with /reprocess_stop.",
+        parse_mode="HTML"
+    )
+
+
+@router.message(Command("reprocess_status"))
+async def cmd_reprocess_status(message: Message):
+    """Show catalog reprocessing progress"""
+    from app.tasks.reprocess import reprocess_job
+    
+    status = await reprocess_job.get_status()
+    await message.answer(_format_reprocess_status(status), parse_mode="HTML")
+
+
+@router.message(Command("reprocess_stop"))
+async def cmd_reprocess_stop(message: Message):
+    """Stop catalog reprocessing (resume later with /reprocess resume)"""
+    from app.tasks.reprocess import reprocess_job
+    
+    if await reprocess_job.stop():
+        await message.answer("⏹ Reprocessing will stop after the current uploads. Resume with /reprocess resume.")
+    else:
+        await message.answer("ℹ️ Reprocessing is not running.")
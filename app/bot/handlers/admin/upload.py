@@ -102,9 +102,6 @@ async def receive_tags(message: Message, state: FSMContext, lang: str, db: Async
         processed_file_id = None
         from app.models.crud import get_setting
         from app.bot.main import _bot_instance
-        from aiogram.types import FSInputFile
-        import tempfile
-        import os
         import logging
         
         logger = logging.getLogger(__name__)
@@ -117,39 +114,16 @@ async def receive_tags(message: Message, state: FSMContext, lang: str, db: Async
             processing_msg = await message.answer("⏳ Processing file (adding thumbnail and renaming)...")
             
             try:
-                # Get document file from Telegram
-                doc_file = await _bot_instance.get_file(data["file_id"])
-                
-                # Create temporary file for document
-                original_filename = data.get("file_name") or data["title"]
-                file_ext = os.path.splitext(original_filename)[1] or '.pdf'
-                with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_doc:
-                    doc_path = tmp_doc.name
-                    await _bot_instance.download_file(doc_file.file_path, doc_path)
-                
-                # Get thumbnail file from Telegram
-                thumb_file = await _bot_instance.get_file(global_thumbnail)
-                
-                # Create temporary file for thumbnail
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_thumb:
-                    thumb_path = tmp_thumb.name
-                    await _bot_instance.download_file(thumb_file.file_path, thumb_path)
-                
-                # Prepare filename with "- PrimeLingoBot" suffix
-                name_without_ext, ext = os.path.splitext(original_filename)
-                new_filename = f"{name_without_ext} - PrimeLingoBot{ext}"
-                
-                # Create InputFile objects
-                doc_input = FSInputFile(doc_path, filename=new_filename)
-                thumb_input = FSInputFile(thumb_path)
-                
-                # Upload processed document with thumbnail
-                # Send it to the admin's chat to get the processed file_id
-                sent_message = await _bot_instance.send_document(
+                # Re-upload with thumbnail to the admin's chat to get the processed file_id
+                from app.bot.reupload import send_processed_document
+                sent_message = await send_processed_document(
+                    _bot_instance,
                     chat_id=message.from_user.id,
-                    document=doc_input,
-                    caption=f"📚 {data['title']}",
-                    thumbnail=thumb_input
+                    telegram_file_id=data["file_id"],
+                    file_name=data.get("file_name"),
+                    title=data["title"],
+                    thumbnail_id=global_thumbnail,
+                    caption=f"📚 {data['title']}"
                 )
                 
                 # Get the processed file_id from the sent message
@@ -162,14 +136,6 @@ async def receive_tags(message: Message, state: FSMContext, lang: str, db: Async
                 except:
                     pass
                 
-                # Clean up temporary files
-                for path in [doc_path, thumb_path]:
-                    if path and os.path.exists(path):
-                        try:
-                            os.unlink(path)
-                        except Exception as cleanup_error:
-                            logger.warning(f"Error cleaning up temp file {path}: {cleanup_error}")
-                
                 # Delete processing message
                 try:
                     await processing_msg.delete()
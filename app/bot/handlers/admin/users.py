@@ -3,10 +3,14 @@ from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.bot.translations import get_text
-from app.bot.keyboards.inline import get_user_actions_keyboard, get_pagination_keyboard
-from app.models.crud import get_all_users, block_user, unblock_user
+from app.bot.helpers import safe_answer_callback
+from app.bot.keyboards.inline import get_user_actions_keyboard, get_cursor_pagination_keyboard
+from app.core.config import settings
+from app.models.crud import get_all_users_page, get_users_count, block_user, unblock_user
 import math
 
+USERS_PER_PAGE = 10
+
 
 router = Router()
 
@@ -14,18 +18,33 @@ router = Router()
 @router.message(Command("users"))
 async def cmd_users(message: Message, lang: str, db: AsyncSession):
     """Show users list"""
-    # Get users
-    users = await get_all_users(db, skip=0, limit=50)
+    # Send header
+    await message.answer("👥 <b>Users List</b>", parse_mode="HTML")
+    await show_users_page(message, db)
+
+
+@router.callback_query(F.data.startswith("users_next:"))
+async def handle_users_pagination(callback: CallbackQuery, db: AsyncSession):
+    """Show the next users page (keyset cursor from the previous page)"""
+    _, page, cursor = callback.data.split(":", 2)
+    await safe_answer_callback(callback)
+    try:
+        await callback.message.delete()
+    except Exception:
+        pass
+    await show_users_page(callback.message, db, page=int(page), cursor=cursor)
+
+
+async def show_users_page(message: Message, db: AsyncSession, page: int = 0, cursor: str = None):
+    """Send one page of users, each with block/unblock buttons"""
+    result = await get_all_users_page(db, cursor=cursor, limit=USERS_PER_PAGE, primary_admin_id=settings.ADMIN_ID)
+    users = result.items
     
     if not users:
         await message.answer("🚫 No users found")
         return
     
-    # Send header
-    await message.answer("👥 <b>Users List</b>", parse_mode="HTML")
-    
-    # Send each user (first 10)
-    for user in users[:10]:
+    for user in users:
         user_text = f"""
 👤 <b>{user.full_name or 'Unknown'}</b>
 🆔 ID: {user.telegram_id}
@@ -38,12 +57,12 @@ async def cmd_users(message: Message, lang: str, db: AsyncSession):
         keyboard = get_user_actions_keyboard(user.id, user.is_blocked)
         await message.answer(user_text, reply_markup=keyboard, parse_mode="HTML")
     
-    # Show pagination if more than 10
-    if len(users) > 10:
-        total_pages = math.ceil(len(users) / 10)
-        pagination_kb = get_pagination_keyboard(0, total_pages, "users", lang)
+    # Show pagination if there are more users
+    if result.next_cursor:
+        total_pages = math.ceil(await get_users_count(db) / USERS_PER_PAGE)
+        pagination_kb = get_cursor_pagination_keyboard(page, total_pages, "users", next_cursor=result.next_cursor)
         await message.answer(
-            f"Page 1/{total_pages}",
+            f"Page {page + 1}/{total_pages}",
             reply_markup=pagination_kb
         )
 
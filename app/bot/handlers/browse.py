@@ -0,0 +1,140 @@
+"""
+Browse the catalog by level and tag
+
+/browse lists levels and the most used tags with their file counts
+(cached facet counts, see get_facet_counts); picking one pages through
+its files newest first with keyset cursors. Tags are matched through the
+file_tags index, levels by equality - no text matching is involved.
+
+Level and tag names may not fit in callback data, so buttons carry a
+short key derived from the name (facet_key) and the name is looked up
+again among the current facets.
+"""
+import hashlib
+import math
+from typing import Optional
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.bot.translations import get_text
+from app.bot.helpers import safe_answer_callback
+from app.bot.keyboards.inline import get_browse_menu_keyboard, get_browse_files_keyboard
+from app.bot.handlers.search import get_file_sizes
+from app.models.crud import get_facet_counts, get_all_files_page
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Files per page
+PAGE_SIZE = 10
+
+# Most used tags shown in the menu
+MENU_TAGS = 20
+
+
+def facet_key(name: str) -> str:
+    """Short stable key for a level or tag name (8 hex chars)"""
+    return hashlib.blake2s(name.encode(), digest_size=4).hexdigest()
+
+
+async def _resolve(db: AsyncSession, kind: str, key: str) -> Optional[tuple]:
+    """(name, file count) of the level ("l") or tag ("t") with this key, None if gone"""
+    facets = await get_facet_counts(db)
+    for name, count in (facets.levels if kind == "l" else facets.tags):
+        if facet_key(name) == key:
+            return name, count
+    return None
+
+
+@router.message(Command("browse"))
+async def cmd_browse(message: Message, lang: str, db: AsyncSession):
+    """Show levels and tags to browse"""
+    text, keyboard = await _menu(db, lang)
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+@router.callback_query(F.data == "browse")
+async def handle_browse_menu(callback: CallbackQuery, lang: str, db: AsyncSession):
+    """Back to the browse menu"""
+    await safe_answer_callback(callback)
+    text, keyboard = await _menu(db, lang)
+    try:
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    except Exception:
+        pass
+
+
+async def _menu(db: AsyncSession, lang: str):
+    """Browse menu text and keyboard"""
+    facets = await get_facet_counts(db)
+    if not facets.levels and not facets.tags:
+        return get_text("browse_empty", lang), None
+    
+    keyboard = get_browse_menu_keyboard(
+        [(name, facet_key(name), count) for name, count in facets.levels],
+        [(name, facet_key(name), count) for name, count in facets.tags[:MENU_TAGS]],
+        lang
+    )
+    return f"<b>{get_text('browse_title', lang)}</b>", keyboard
+
+
+@router.callback_query(F.data.startswith("browse_l:") | F.data.startswith("browse_t:"),
+                       flags={"throttle": "expensive"})
+async def handle_browse_category(callback: CallbackQuery, lang: str, db: AsyncSession):
+    """Show the first page of a level or tag"""
+    await safe_answer_callback(callback)
+    action, key = callback.data.split(":", 1)
+    await show_category_page(callback, lang, db, action[-1], key)
+
+
+@router.callback_query(F.data.startswith("browse_n:") | F.data.startswith("browse_p:"),
+                       flags={"throttle": "expensive"})
+async def handle_browse_pagination(callback: CallbackQuery, lang: str, db: AsyncSession):
+    """Show the next/previous page of a level or tag (keyset cursor from the current page)"""
+    await safe_answer_callback(callback)
+    try:
+        action, kind, key, page, cursor = callback.data.split(":", 4)
+        page = int(page)
+    except ValueError:
+        return
+    await show_category_page(callback, lang, db, kind, key, page=page, cursor=cursor,
+                             backward=action == "browse_p")
+
+
+async def show_category_page(callback: CallbackQuery, lang: str, db: AsyncSession, kind: str, key: str,
+                             page: int = 0, cursor: str = None, backward: bool = False):
+    """Edit the message to show one page of a level's or tag's files"""
+    facet = await _resolve(db, kind, key)
+    if facet is None:
+        await callback.message.answer(get_text("no_results", lang))
+        return
+    name, count = facet
+    
+    try:
+        filters = {"level": name} if kind == "l" else {"tag": name}
+        result = await get_all_files_page(db, cursor=cursor, limit=PAGE_SIZE, backward=backward, **filters)
+    except ValueError:
+        # Cursor from an outdated button
+        result = await get_all_files_page(db, limit=PAGE_SIZE, **filters)
+        page = 0
+    
+    if not result.items:
+        await callback.message.answer(get_text("no_results", lang))
+        return
+    
+    icon = "📊" if kind == "l" else "🏷"
+    keyboard = get_browse_files_keyboard(
+        result.items, kind, key, page, math.ceil(count / PAGE_SIZE),
+        result.prev_cursor, result.next_cursor, lang, get_file_sizes(result.items)
+    )
+    try:
+        await callback.message.edit_text(
+            f"<b>{icon} {name}</b> ({count})",
+            reply_markup=keyboard,
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.debug(f"Could not edit browse message: {e}")
@@ -0,0 +1,29 @@
+from aiogram import Router
+from aiogram.enums import ChatMemberStatus
+from aiogram.types import ChatMemberUpdated
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.bot.membership import record_membership
+from app.models.crud import get_force_subscribe_channels
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+
+@router.chat_member()
+async def on_chat_member_updated(event: ChatMemberUpdated, db: AsyncSession):
+    """
+    Record join/leave events in force subscribe channels
+    
+    Telegram only sends chat_member updates to chats where the bot is admin,
+    which is already required for force subscribe checks.
+    """
+    channels = await get_force_subscribe_channels(db)
+    if not any(channel.get("channel_id") == event.chat.id for channel in channels):
+        return
+    
+    user_id = event.new_chat_member.user.id
+    is_member = event.new_chat_member.status not in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]
+    await record_membership(user_id, event.chat.id, is_member)
+    logger.debug(f"Recorded fsub membership: user {user_id} in {event.chat.id} -> {is_member}")
@@ -1,22 +1,87 @@
+from typing import Optional
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.bot.translations import get_text
 from app.bot.helpers import safe_answer_callback
 from app.bot.keyboards.inline import get_file_actions_keyboard, get_pagination_keyboard
-from app.models.crud import (
-    get_file_by_id, create_download, increment_download_count
-)
+from app.bot.reupload import send_processed_document
+from app.core.admission import QueueFull, processing_scheduler
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.singleflight import SingleFlight
+from app.models.crud import get_file_snapshot, update_file_processed_id
+from app.tasks.download_events import download_events
 import math
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# File ID -> in-flight on-the-fly processing
+_processing_flights = SingleFlight()
+
+
+async def _process_and_send(bot, message: Message, file, thumbnail_id: str) -> Optional[str]:
+    """
+    Re-upload document with thumbnail to the user's chat and store the new
+    Telegram file_id as processed_file_id
+    
+    Returns:
+        New processed_file_id (None if Telegram returned no document)
+    """
+    sent_message = await send_processed_document(
+        bot,
+        chat_id=message.chat.id,
+        telegram_file_id=file.file_id,
+        file_name=file.file_name,
+        title=file.title,
+        thumbnail_id=thumbnail_id,
+        caption=f"<b>{file.title}</b>\n\n🤖 <b>@PRIMELINGOBOT</b>",
+        parse_mode="HTML"
+    )
+    
+    processed_file_id = sent_message.document.file_id if sent_message.document else None
+    if processed_file_id:
+        # Own session - the shared task may outlive the handler that started it
+        try:
+            async with AsyncSessionLocal() as session:
+                await update_file_processed_id(session, file.id, processed_file_id)
+            logger.info(f"Stored processed_file_id for file {file.id} after on-the-fly processing")
+        except Exception as e:
+            logger.error(f"Could not store processed_file_id for file {file.id}: {e}")
+    
+    return processed_file_id
+
+
+async def _process_queued(bot, message: Message, file, thumbnail_id: str,
+                          user_id: int, status_msg: Message, lang: str) -> Optional[str]:
+    """
+    Run _process_and_send once a processing slot is free
+    
+    While waiting, the user's "downloading" message shows their queue position.
+    Raises QueueFull if the user can't be queued.
+    """
+    queued = False
+    
+    async def show_position(position: int) -> None:
+        nonlocal queued
+        queued = True
+        await status_msg.edit_text(get_text("processing_queued", lang, position=position))
+    
+    async with processing_scheduler.slot(user_id, on_position=show_position):
+        if queued:
+            try:
+                await status_msg.edit_text(get_text("downloading", lang))
+            except Exception:
+                pass
+        return await _process_and_send(bot, message, file, thumbnail_id)
+
+
 router = Router()
 
 
-@router.callback_query(F.data.startswith("download:"))
+@router.callback_query(F.data.startswith("download:"), flags={"throttle": "expensive"})
 async def handle_download(callback: CallbackQuery, lang: str, db: AsyncSession, db_user):
     """Handle download button press"""
     # Answer callback IMMEDIATELY to prevent expiration
@@ -29,8 +94,8 @@ async def handle_download(callback: CallbackQuery, lang: str, db: AsyncSession,
         await callback.message.answer(get_text("delete_not_found", lang))
         return
     
-    # Get file (this may take time, but callback is already answered)
-    file = await get_file_by_id(db, file_id)
+    # Get file (cached snapshot, callback is already answered)
+    file = await get_file_snapshot(db, file_id)
     
     if not file:
         # Query already answered, just send error message
@@ -55,51 +120,43 @@ async def handle_download(callback: CallbackQuery, lang: str, db: AsyncSession,
         else:
             logger.warning(f"File {file.id} has no processed_file_id, falling back to on-the-fly processing")
             # Fallback: process on-the-fly (for old files or if processing failed during upload)
+            # The first re-upload is stored as processed_file_id; concurrent downloads
+            # of the same file wait for it instead of processing it again
             from app.models.crud import get_setting
             from app.bot.main import _bot_instance
-            from aiogram.types import FSInputFile
-            import tempfile
-            import os
             
             global_thumbnail = await get_setting(db, "default_thumbnail_id")
             
             if global_thumbnail and _bot_instance:
-                # Download and re-upload document with thumbnail
-                doc_path = None
-                thumb_path = None
-                
                 try:
-                    # Get document file from Telegram
-                    doc_file = await _bot_instance.get_file(file.file_id)
-                    
-                    # Create temporary file for document
-                    file_ext = os.path.splitext(file.file_name or 'file')[1] or '.pdf'
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_doc:
-                        doc_path = tmp_doc.name
-                        await _bot_instance.download_file(doc_file.file_path, doc_path)
-                    
-                    # Get thumbnail file from Telegram
-                    thumb_file = await _bot_instance.get_file(global_thumbnail)
-                    
-                    # Create temporary file for thumbnail
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_thumb:
-                        thumb_path = tmp_thumb.name
-                        await _bot_instance.download_file(thumb_file.file_path, thumb_path)
-                    
-                    # Prepare filename with "- PrimeLingoBot" suffix
-                    original_filename = file.file_name or file.title
-                    name_without_ext, ext = os.path.splitext(original_filename)
-                    new_filename = f"{name_without_ext} - PrimeLingoBot{ext}"
+                    processed_file_id, shared = await _processing_flights.do(
+                        file.id,
+                        lambda: _process_queued(
+                            _bot_instance, callback.message, file, global_thumbnail,
+                            db_user.id, downloading_msg, lang
+                        )
+                    )
+                    if shared:
+                        # Processed by a concurrent download - send by file_id
+                        await callback.message.answer_document(
+                            document=processed_file_id or file.file_id,
+                            caption=f"<b>{file.title}</b>\n\n🤖 <b>@PRIMELINGOBOT</b>",
+                            parse_mode="HTML"
+                        )
                     
-                    # Create InputFile objects
-                    doc_input = FSInputFile(doc_path, filename=new_filename)
-                    thumb_input = FSInputFile(thumb_path)
+                except QueueFull:
+                    if settings.PROCESSING_QUEUE_FULL_FALLBACK == "reject":
+                        try:
+                            await downloading_msg.edit_text(get_text("processing_busy", lang))
+                        except Exception:
+                            pass
+                        return
                     
-                    # Send document with thumbnail
+                    # Original document needs no re-upload
+                    logger.warning(f"Processing queue full, sending original file {file.id}")
                     await callback.message.answer_document(
-                        document=doc_input,
+                        document=file.file_id,
                         caption=f"<b>{file.title}</b>\n\n🤖 <b>@PRIMELINGOBOT</b>",
-                        thumbnail=thumb_input,
                         parse_mode="HTML"
                     )
                     
@@ -111,14 +168,6 @@ async def handle_download(callback: CallbackQuery, lang: str, db: AsyncSession,
                         caption=f"<b>{file.title}</b>\n\n🤖 <b>@PRIMELINGOBOT</b>",
                         parse_mode="HTML"
                     )
-                finally:
-                    # Clean up temporary files
-                    for path in [doc_path, thumb_path]:
-                        if path and os.path.exists(path):
-                            try:
-                                os.unlink(path)
-                            except Exception as cleanup_error:
-                                logger.warning(f"Error cleaning up temp file {path}: {cleanup_error}")
             else:
                 # No thumbnail set, send file normally
                 await callback.message.answer_document(
@@ -127,9 +176,8 @@ async def handle_download(callback: CallbackQuery, lang: str, db: AsyncSession,
                     parse_mode="HTML"
                 )
         
-        # Record download
-        await create_download(db, db_user.id, file.id)
-        await increment_download_count(db, file.id)
+        # Record download (buffered, written in batches)
+        download_events.record(db_user.id, file.id)
         
         # Delete downloading message after successful download
         try:
@@ -152,9 +200,8 @@ async def handle_download(callback: CallbackQuery, lang: str, db: AsyncSession,
                 caption=f"<b>{file.title}</b>\n\n🤖 <b>@PRIMELINGOBOT</b>",
                 parse_mode="HTML"
             )
-            # Record download
-            await create_download(db, db_user.id, file.id)
-            await increment_download_count(db, file.id)
+            # Record download (buffered, written in batches)
+            download_events.record(db_user.id, file.id)
             # Delete downloading message after successful download
             try:
                 await downloading_msg.delete()
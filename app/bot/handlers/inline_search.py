@@ -0,0 +1,179 @@
+"""
+Inline-mode catalog search (@bot query)
+
+Results are sent as cached Telegram files (processed_file_id when the
+file has been processed, otherwise the original file_id), so a user gets
+a file in one interaction from any chat.
+
+Each distinct query is searched once (in-memory index, then database
+search) and its results are kept in a process-wide cache for
+INLINE_SEARCH_CACHE_TTL seconds, or until any file changes. Further pages
+(next_offset) and repeated queries are answered from that cache; Telegram
+additionally caches each answer for INLINE_SEARCH_CACHE_TIME seconds.
+
+Inline mode must be enabled for the bot in @BotFather; with inline
+feedback enabled, chosen results are recorded as downloads.
+"""
+from dataclasses import dataclass
+from typing import List, Tuple
+from aiogram import Router
+from aiogram.types import (
+    InlineQuery, ChosenInlineResult,
+    InlineQueryResultCachedDocument, InlineQueryResultCachedAudio, InlineQueryResultCachedVideo
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.bot.helpers import format_file_size
+from app.bot.translations import get_text
+from app.core import invalidation
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.cache import FILE_TOPIC, FILE_SIZE_TOPIC
+from app.models.catalog_index import catalog_index
+from app.models.crud import search_files, get_files_by_ids, get_force_subscribe_channels
+from app.tasks.download_events import download_events
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Telegram accepts at most 50 results per answer
+RESULTS_PER_PAGE = 50
+
+
+@dataclass(frozen=True, slots=True)
+class InlineResult:
+    """File fields needed to build an inline result"""
+    id: int
+    title: str
+    description: str
+    media_type: str  # document, audio or video
+    telegram_file_id: str
+
+
+# (normalized query, language) -> tuple of InlineResult, best first
+_results_cache = TTLCache(maxsize=settings.INLINE_SEARCH_CACHE_SIZE, ttl=settings.INLINE_SEARCH_CACHE_TTL)
+
+
+def _on_file_change(payload: str = "") -> None:
+    # Any edit can add or remove a file from any query's results
+    _results_cache.clear()
+
+
+invalidation.subscribe(FILE_TOPIC, _on_file_change)
+# Results show file sizes
+invalidation.subscribe(FILE_SIZE_TOPIC, _on_file_change)
+
+
+def _to_result(file, lang: str) -> InlineResult:
+    """Build a cache entry from a File row"""
+    details = []
+    if file.level:
+        details.append(f"{get_text('level', lang)}: {file.level}")
+    if file.file_size:
+        details.append(format_file_size(file.file_size))
+    
+    if file.processed_file_id:
+        # Processed files are always re-uploaded as documents
+        media_type, telegram_file_id = "document", file.processed_file_id
+    else:
+        media_type, telegram_file_id = file.type or "document", file.file_id
+    
+    return InlineResult(
+        id=file.id,
+        title=file.title,
+        description=" · ".join(details),
+        media_type=media_type,
+        telegram_file_id=telegram_file_id,
+    )
+
+
+async def _search(db: AsyncSession, query: str, lang: str) -> Tuple[InlineResult, ...]:
+    """Search results for a normalized query, from the cache when possible"""
+    key = (query, lang)
+    results = _results_cache.get(key)
+    if results is not None:
+        return results
+    
+    limit = settings.INLINE_SEARCH_MAX_RESULTS
+    files = None
+    if catalog_index.is_loaded:
+        # Index entries don't carry the Telegram fields, read them by ID
+        matches = catalog_index.search(query, limit=limit)
+        if matches:
+            files = await get_files_by_ids(db, [match.id for match in matches])
+    if not files:
+        files = await search_files(db, query, file_type=None, skip=0, limit=limit)
+    
+    results = tuple(_to_result(file, lang) for file in files)
+    _results_cache.set(key, results)
+    return results
+
+
+def _build_answer(results: Tuple[InlineResult, ...]) -> List:
+    """Telegram inline result objects for one page of results"""
+    answer = []
+    for result in results:
+        common = dict(
+            id=str(result.id),
+            caption=f"<b>{result.title}</b>\n\n🤖 <b>@PRIMELINGOBOT</b>",
+            parse_mode="HTML",
+        )
+        if result.media_type == "audio":
+            answer.append(InlineQueryResultCachedAudio(audio_file_id=result.telegram_file_id, **common))
+        elif result.media_type == "video":
+            answer.append(InlineQueryResultCachedVideo(
+                video_file_id=result.telegram_file_id, title=result.title,
+                description=result.description or None, **common
+            ))
+        else:
+            answer.append(InlineQueryResultCachedDocument(
+                document_file_id=result.telegram_file_id, title=result.title,
+                description=result.description or None, **common
+            ))
+    return answer
+
+
+@router.inline_query()
+async def handle_inline_search(inline_query: InlineQuery, lang: str, db: AsyncSession):
+    """Answer @bot queries with matching catalog files"""
+    query = " ".join(inline_query.query.lower().split())
+    try:
+        offset = max(int(inline_query.offset or 0), 0)
+    except ValueError:
+        offset = 0
+    
+    results: Tuple[InlineResult, ...] = ()
+    if query:
+        try:
+            results = await _search(db, query, lang)
+        except Exception as e:
+            logger.error(f"Inline search failed for {query!r}: {e}", exc_info=True)
+    
+    page = results[offset:offset + RESULTS_PER_PAGE]
+    next_offset = str(offset + RESULTS_PER_PAGE) if offset + RESULTS_PER_PAGE < len(results) else ""
+    
+    # With force subscribe channels, answers depend on the user's membership
+    # and must not be shared through Telegram's cache
+    is_personal = bool(await get_force_subscribe_channels(db))
+    
+    try:
+        await inline_query.answer(
+            _build_answer(page),
+            cache_time=settings.INLINE_SEARCH_CACHE_TIME,
+            is_personal=is_personal,
+            next_offset=next_offset
+        )
+    except Exception as e:
+        # E.g. query expired while searching
+        logger.warning(f"Could not answer inline query: {e}")
+
+
+@router.chosen_inline_result()
+async def handle_inline_result_chosen(chosen: ChosenInlineResult, db_user):
+    """Record a file sent through inline mode as a download (needs inline feedback)"""
+    try:
+        file_id = int(chosen.result_id)
+    except ValueError:
+        return
+    download_events.record(db_user.id, file_id)
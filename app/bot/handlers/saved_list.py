@@ -3,14 +3,17 @@ from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.bot.translations import get_text
-from app.bot.keyboards.inline import get_file_actions_keyboard, get_pagination_keyboard
+from app.bot.keyboards.inline import get_file_actions_keyboard, get_cursor_pagination_keyboard
 from app.bot.helpers import safe_answer_callback
 from app.models.crud import (
     add_to_saved_list, remove_from_saved_list, get_user_saved_files,
-    get_file_by_id
+    get_user_saved_files_page, get_user_saved_count, get_file_snapshot
 )
+from app.models.pagination import Page, encode_cursor
 import math
 
+ITEMS_PER_PAGE = 10
+
 
 router = Router()
 
@@ -24,6 +27,11 @@ async def handle_save_to_list(callback: CallbackQuery, lang: str, db: AsyncSessi
         await safe_answer_callback(callback, get_text("delete_not_found", lang), show_alert=True)
         return
     
+    # Deleted files can't be saved (cached, including misses)
+    if not await get_file_snapshot(db, file_id):
+        await safe_answer_callback(callback, get_text("delete_not_found", lang), show_alert=True)
+        return
+    
     # Add to saved list (quick operation, should complete before callback expires)
     saved = await add_to_saved_list(db, db_user.id, file_id)
     
@@ -71,32 +79,44 @@ async def show_my_list(message: Message, lang: str, db: AsyncSession, db_user):
     await show_saved_list_page(message, lang, db, db_user.id, page=0)
 
 
-@router.callback_query(F.data.startswith("saved_page:"))
+@router.callback_query(F.data.startswith("saved_next:") | F.data.startswith("saved_prev:"),
+                       flags={"throttle": "expensive"})
+async def handle_saved_cursor_pagination(callback: CallbackQuery, lang: str, db: AsyncSession, db_user):
+    """Handle saved list pagination (keyset cursor from the previous page)"""
+    action, page, cursor = callback.data.split(":", 2)
+    await show_saved_list_page(
+        callback.message, lang, db, db_user.id, page=int(page), is_edit=True,
+        cursor=cursor, backward=action == "saved_prev"
+    )
+
+
+@router.callback_query(F.data.startswith("saved_page:"), flags={"throttle": "expensive"})
 async def handle_saved_pagination(callback: CallbackQuery, lang: str, db: AsyncSession, db_user):
-    """Handle saved list pagination"""
+    """Handle saved list pagination by page number (buttons sent before cursor pagination)"""
     page = int(callback.data.split(":")[1])
     await show_saved_list_page(callback.message, lang, db, db_user.id, page=page, is_edit=True)
 
 
-async def show_saved_list_page(message: Message, lang: str, db: AsyncSession, user_id: int, page: int = 0, is_edit: bool = False):
+async def show_saved_list_page(message: Message, lang: str, db: AsyncSession, user_id: int, page: int = 0,
+                               is_edit: bool = False, cursor: str = None, backward: bool = False):
     """Show specific page of saved list"""
-    ITEMS_PER_PAGE = 10
-    
     # Get user saved files
-    saved_files = await get_user_saved_files(db, user_id, skip=page * ITEMS_PER_PAGE, limit=ITEMS_PER_PAGE)
+    if cursor or page == 0:
+        result = await get_user_saved_files_page(db, user_id, cursor=cursor, limit=ITEMS_PER_PAGE, backward=backward)
+    else:
+        # Page number from an old message: OFFSET, then continue with cursors
+        saved = await get_user_saved_files(db, user_id, skip=page * ITEMS_PER_PAGE, limit=ITEMS_PER_PAGE)
+        result = Page(items=list(saved))
+        if saved:
+            result.prev_cursor = encode_cursor([saved[0].saved_at, saved[0].id])
+            result.next_cursor = encode_cursor([saved[-1].saved_at, saved[-1].id])
+    saved_files = result.items
     
     # Get total count for pagination
-    # We need a count function in crud, but for now we can fetch all (inefficient but works for small lists)
-    # Or better, let's just fetch a large number to check if there are more
-    # Ideally we should add get_user_saved_count to crud.py
-    # For now, let's assume if we got ITEMS_PER_PAGE, there might be more. 
-    # But to do proper numbered pagination we need total count.
-    # Let's add a simple count query here or in crud.
-    
-    # Quick fix: get all saved files to count (temporary, should be optimized)
-    all_saved = await get_user_saved_files(db, user_id, skip=0, limit=1000)
-    total_items = len(all_saved)
+    total_items = await get_user_saved_count(db, user_id)
     total_pages = math.ceil(total_items / ITEMS_PER_PAGE)
+    if not cursor and page >= total_pages - 1:
+        result.next_cursor = None
     
     if not saved_files and page == 0:
         if is_edit:
@@ -113,7 +133,9 @@ async def show_saved_list_page(message: Message, lang: str, db: AsyncSession, us
     # Pagination keyboard
     keyboard = None
     if total_pages > 1:
-        keyboard = get_pagination_keyboard(page, total_pages, "saved", lang)
+        keyboard = get_cursor_pagination_keyboard(
+            page, total_pages, "saved", result.prev_cursor, result.next_cursor
+        )
     
     if is_edit:
         # If editing, update the header message
@@ -140,11 +162,11 @@ async def show_saved_list_page(message: Message, lang: str, db: AsyncSession, us
         await message.answer(text, reply_markup=file_keyboard, parse_mode="HTML")
 
 
-@router.message(F.text.regexp(r"^/get_(\d+)$"))
+@router.message(F.text.regexp(r"^/get_(\d+)$"), flags={"throttle": "expensive"})
 async def handle_get_file_command(message: Message, lang: str, db: AsyncSession):
     """Handle /get_ID command"""
     file_id = int(message.text.split("_")[1])
-    file = await get_file_by_id(db, file_id)
+    file = await get_file_snapshot(db, file_id)
     
     if not file:
         await message.answer(get_text("delete_not_found", lang))
@@ -7,8 +7,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.bot.translations import get_text
 from app.bot.keyboards.inline import get_file_actions_keyboard, get_pagination_keyboard, get_search_results_keyboard
 from app.bot.helpers import safe_answer_callback
-from app.models.crud import search_files, get_file_by_id
-import math
+from app.bot.search_sessions import PAGE_SIZE, SearchSession, save_search_session, get_search_session
+from app.models.crud import search_file_ids, get_file_snapshot, get_files_by_ids
+from app.models.catalog_index import catalog_index
 import time
 import logging
 
@@ -21,10 +22,6 @@ class SearchStates(StatesGroup):
     waiting_for_query = State()
 
 
-# Store search results temporarily
-search_cache = {}
-
-
 @router.message(Command("search"))
 @router.message(F.text.in_([
     "🔍 Qidiruv", "🔍 Search", "🔍 Поиск"
@@ -35,7 +32,7 @@ async def start_search(message: Message, state: FSMContext, lang: str):
     await state.set_state(SearchStates.waiting_for_query)
 
 
-@router.message(SearchStates.waiting_for_query, F.text)
+@router.message(SearchStates.waiting_for_query, F.text, flags={"throttle": "expensive"})
 async def process_search(message: Message, state: FSMContext, lang: str, db: AsyncSession):
     """Process search query"""
     # Skip if this is a command
@@ -66,8 +63,16 @@ async def process_search(message: Message, state: FSMContext, lang: str, db: Asy
     searching_msg = await message.answer(get_text("searching", lang), parse_mode="HTML")
     start_time = time.time()
     
-    # Search files - get all results (no limit for pagination)
-    files = await search_files(db, query, file_type=None, skip=0, limit=1000)
+    # Search files - get all result IDs (pages are loaded on demand)
+    # In-memory index first; database search also covers descriptions and typos
+    files = None
+    if catalog_index.is_loaded:
+        files = catalog_index.search(query, limit=1000)
+    if files:
+        file_ids = [file.id for file in files]
+    else:
+        file_ids = await search_file_ids(db, query, limit=1000)
+        files = await get_files_by_ids(db, file_ids[:PAGE_SIZE])
     
     # Calculate time spent
     time_spent = round(time.time() - start_time, 2)
@@ -78,43 +83,22 @@ async def process_search(message: Message, state: FSMContext, lang: str, db: Asy
     except Exception:
         pass
     
-    if not files:
+    if not file_ids:
         await message.answer(get_text("no_results", lang))
         # Keep state active so user can search again without clicking button
         # Don't clear state - user can send another search query
         return
     
-    # Get file sizes from Telegram
-    file_sizes = {}
-    try:
-        from app.bot.main import _bot_instance
-        if _bot_instance:
-            for file in files:
-                try:
-                    file_info = await _bot_instance.get_file(file.file_id)
-                    file_sizes[file.id] = file_info.file_size or 0
-                except Exception as e:
-                    logger.warning(f"Could not get file size for file {file.id}: {e}")
-                    file_sizes[file.id] = 0
-    except Exception as e:
-        logger.warning(f"Could not get bot instance for file sizes: {e}")
-    
-    # Store search results in cache
-    user_id = message.from_user.id
-    search_cache[user_id] = {
-        "query": query,
-        "files": files,
-        "file_sizes": file_sizes,
-        "page": 0,
-        "time_spent": time_spent
-    }
+    # Keep only result IDs; pages are re-read on pagination
+    session = SearchSession(query=query, file_ids=file_ids, time_spent=time_spent)
+    await save_search_session(message.from_user.id, session)
     
     # Send results as inline buttons
-    await send_search_results(message, files, 0, query, time_spent, lang, db, file_sizes)
+    await send_search_results(message, session, files[:PAGE_SIZE], lang)
     await state.clear()
 
 
-@router.callback_query(F.data.startswith("search_file:"))
+@router.callback_query(F.data.startswith("search_file:"), flags={"throttle": "expensive"})
 async def handle_search_file(callback: CallbackQuery, lang: str, db: AsyncSession):
     """Handle when user clicks on a search result file"""
     # Answer callback IMMEDIATELY to prevent expiration
@@ -128,8 +112,8 @@ async def handle_search_file(callback: CallbackQuery, lang: str, db: AsyncSessio
         await callback.message.answer(get_text("delete_not_found", lang))
         return
     
-    # Get file (this may take time, but callback is already answered)
-    file = await get_file_by_id(db, file_id)
+    # Get file (cached snapshot, callback is already answered)
+    file = await get_file_snapshot(db, file_id)
     
     if not file:
         # Query already answered, just send error message
@@ -167,38 +151,27 @@ async def handle_search_pagination(callback: CallbackQuery, lang: str, db: Async
         # Query already answered, just return
         return
     
-    # Get search cache
-    user_id = callback.from_user.id
-    if user_id not in search_cache:
+    # Get search session (expired or from before a restart -> no results)
+    session = await get_search_session(callback.from_user.id)
+    if session is None:
         # Query already answered, show alert via message instead
         await callback.message.answer(get_text("no_results", lang))
         return
     
-    cache_data = search_cache[user_id]
-    files = cache_data["files"]
-    file_sizes = cache_data.get("file_sizes", {})
-    query = cache_data["query"]
-    time_spent = cache_data.get("time_spent", 0)
-    
-    # Update page in cache
-    search_cache[user_id]["page"] = page
-    
     # Send updated results
     try:
-        # Edit the message with new results
-        total_pages = math.ceil(len(files) / 10)
-        start_idx = page * 10
-        end_idx = start_idx + 10
-        page_files = files[start_idx:end_idx]
+        # Load only the files on this page
+        page_files = await get_files_by_ids(db, session.page_ids(page))
+        file_sizes = get_file_sizes(page_files)
         
         # Build header with search info
         header_text = (
-            f"<b>{get_text('search_result_for', lang, query=query)}</b>\n\n"
-            f"<b>{get_text('result_shown_in', lang, time=time_spent)}</b>\n\n"
+            f"<b>{get_text('search_result_for', lang, query=session.query)}</b>\n\n"
+            f"<b>{get_text('result_shown_in', lang, time=session.time_spent)}</b>\n\n"
         )
         
         # Create keyboard with file buttons
-        keyboard = get_search_results_keyboard(page_files, page, total_pages, lang, file_sizes)
+        keyboard = get_search_results_keyboard(page_files, page, session.total_pages, lang, file_sizes)
         
         await callback.message.edit_text(
             header_text,
@@ -218,26 +191,27 @@ async def handle_search_page_info(callback: CallbackQuery):
     await safe_answer_callback(callback)
 
 
-async def send_search_results(message: Message, files: list, page: int, 
-                              query: str, time_spent: float, lang: str, db: AsyncSession, 
-                              file_sizes: dict = None):
-    """Send search results as inline buttons with pagination"""
-    if file_sizes is None:
-        file_sizes = {}
-    
-    total_pages = math.ceil(len(files) / 10)  # Show 10 results per page
-    start_idx = page * 10
-    end_idx = start_idx + 10
-    page_files = files[start_idx:end_idx]
+def get_file_sizes(files: list) -> dict:
+    """Stored sizes of the listed files (file.id -> bytes)"""
+    if any(file.file_size is None for file in files):
+        # Not recorded yet - filled in the background for next time
+        from app.tasks.file_sizes import file_size_backfill
+        file_size_backfill.trigger()
+    return {file.id: file.file_size or 0 for file in files}
+
+
+async def send_search_results(message: Message, session: SearchSession, page_files: list, lang: str):
+    """Send the first page of search results as inline buttons with pagination"""
+    file_sizes = get_file_sizes(page_files)
     
     # Build header with search info
     header_text = (
-        f"<b>{get_text('search_result_for', lang, query=query)}</b>\n\n"
-        f"<b>{get_text('result_shown_in', lang, time=time_spent)}</b>\n\n"
+        f"<b>{get_text('search_result_for', lang, query=session.query)}</b>\n\n"
+        f"<b>{get_text('result_shown_in', lang, time=session.time_spent)}</b>\n\n"
     )
     
     # Create keyboard with file buttons
-    keyboard = get_search_results_keyboard(page_files, page, total_pages, lang, file_sizes)
+    keyboard = get_search_results_keyboard(page_files, 0, session.total_pages, lang, file_sizes)
     
     # Send results as single message with inline buttons
     await message.answer(
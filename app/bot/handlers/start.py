@@ -2,10 +2,13 @@ from aiogram import Router, F
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from app.bot.translations import get_text
 from app.bot.keyboards.reply import get_language_keyboard, get_main_menu_keyboard
 from app.models.crud import update_user_language, get_force_subscribe_channels
+from app.bot.membership import (
+    check_memberships, format_channel_display,
+    LEFT, NOT_FOUND, NO_RIGHTS, ERROR, STATUS_SUFFIXES
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
@@ -19,12 +22,10 @@ async def cmd_start(message: Message, db_user, lang: str, db: AsyncSession):
     """Handle /start command"""
     # Set commands for this user based on their admin status
     from app.bot.main import update_user_commands
-    from app.core.config import settings
-    from app.models.crud import is_user_admin
     
     try:
-        # Check if user is admin
-        user_is_admin = await is_user_admin(db, message.from_user.id, settings.ADMIN_ID)
+        # Check if user is admin (from cached snapshot)
+        user_is_admin = db_user.has_admin_access
         # Update commands for this user
         await update_user_commands(message.from_user.id, user_is_admin)
     except Exception as e:
@@ -89,66 +90,22 @@ async def handle_fsub_confirm(callback: CallbackQuery, lang: str, db: AsyncSessi
         await callback.answer(get_text("fsub_no_channels", lang), show_alert=True)
         return
     
-    # Check if user is member of all channels
+    # Re-check membership in all channels, bypassing cached verdicts
     bot = callback.bot
     user = callback.from_user
+    statuses = await check_memberships(bot, user.id, channels, force_refresh=True)
+    
     missing_channels = []
     cannot_verify_count = 0
     
     for channel in channels:
-        channel_id = channel.get("channel_id")
-        channel_username = channel.get("channel_username", "")
-        channel_title = channel.get("channel_title", "")
-        
-        try:
-            # Check if user is member of the channel
-            member = await bot.get_chat_member(chat_id=channel_id, user_id=user.id)
-            
-            # Valid member statuses: "member", "administrator", "creator", "restricted"
-            # Invalid statuses: "left", "kicked"
-            from aiogram.enums import ChatMemberStatus
-            member_status = member.status
-            
-            if member_status in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]:
-                # User is not a member
-                if channel_username:
-                    missing_channels.append(f"@{channel_username}")
-                elif channel_title:
-                    missing_channels.append(channel_title)
-                else:
-                    missing_channels.append(f"Channel {channel_id}")
-            # If user is a member (status is member, administrator, creator, restricted), continue
-                    
-        except TelegramForbiddenError:
-            # Bot doesn't have access - cannot verify
-            logger.warning(f"Bot cannot check membership for channel {channel_id} - bot needs admin rights. Cannot verify, but allowing access.")
-            cannot_verify_count += 1
-            continue
-        except TelegramBadRequest as e:
-            error_msg = str(e).lower()
-            if "member list is inaccessible" in error_msg:
-                # Can't access member list - cannot verify
-                logger.warning(f"Cannot access member list for channel {channel_id} - bot needs admin rights. Cannot verify, but allowing access.")
-                cannot_verify_count += 1
-                continue
-            elif "chat not found" in error_msg or "user not found" in error_msg:
-                logger.error(f"Channel {channel_id} not found: {e}")
-                # If channel doesn't exist, block access
-                if channel_username:
-                    missing_channels.append(f"@{channel_username} (Not found)")
-                elif channel_title:
-                    missing_channels.append(f"{channel_title} (Not found)")
-                else:
-                    missing_channels.append(f"Channel {channel_id} (Not found)")
-                continue
-            else:
-                logger.warning(f"Error checking channel {channel_id}: {e} - cannot verify, but allowing access.")
-                cannot_verify_count += 1
-                continue
-        except Exception as e:
-            logger.warning(f"Unexpected error checking channel {channel_id}: {e} - cannot verify, but allowing access.")
+        status = statuses.get(channel.get("channel_id"))
+        if status in (LEFT, NOT_FOUND):
+            # User is not a member, or channel doesn't exist - block access
+            missing_channels.append(format_channel_display(channel) + STATUS_SUFFIXES.get(status, ""))
+        elif status in (NO_RIGHTS, ERROR):
+            # Bot can't check membership - cannot verify
             cannot_verify_count += 1
-            continue
     
     # If user is missing any channels that we CAN verify, block access
     if missing_channels:
@@ -87,6 +87,44 @@ def get_pagination_keyboard(current_page: int, total_pages: int,
     return builder.as_markup()
 
 
+def get_cursor_pagination_keyboard(current_page: int, total_pages: int, prefix: str,
+                                   prev_cursor: str = None, next_cursor: str = None) -> InlineKeyboardMarkup:
+    """
+    Get previous/next pagination keyboard for keyset-paginated lists
+    
+    Callback data is "{prefix}_prev:{page}:{cursor}" / "{prefix}_next:{page}:{cursor}"
+    with the target page number (0-indexed, for display) and the cursor
+    of the first/last item shown.
+    
+    Args:
+        current_page: Current page number (0-indexed)
+        total_pages: Total number of pages (0 if unknown)
+        prefix: Callback data prefix (e.g., "saved", "users")
+        prev_cursor: Cursor to page back from (None on first page)
+        next_cursor: Cursor to page forward from (None on last page)
+    """
+    builder = InlineKeyboardBuilder()
+    buttons = []
+    
+    if prev_cursor:
+        buttons.append(InlineKeyboardButton(
+            text="◀️",
+            callback_data=f"{prefix}_prev:{current_page - 1}:{prev_cursor}"
+        ))
+    
+    page_text = f"· {current_page + 1}/{total_pages} ·" if total_pages else f"· {current_page + 1} ·"
+    buttons.append(InlineKeyboardButton(text=page_text, callback_data="noop"))
+    
+    if next_cursor:
+        buttons.append(InlineKeyboardButton(
+            text="▶️",
+            callback_data=f"{prefix}_next:{current_page + 1}:{next_cursor}"
+        ))
+    
+    builder.row(*buttons)
+    return builder.as_markup()
+
+
 def get_user_actions_keyboard(user_id: int, is_blocked: bool) -> InlineKeyboardMarkup:
     """Get admin actions keyboard for user management"""
     builder = InlineKeyboardBuilder()
@@ -260,6 +298,19 @@ def get_fsub_channels_keyboard(channels: List[dict], lang: str = "uz") -> Inline
     return builder.as_markup()
 
 
+def _file_button_text(title: str, size_str: str) -> str:
+    """Format: [file size] file name, within Telegram's 64 character button limit"""
+    # Truncate title if too long (max 40 chars for button to leave space for size)
+    short_title = title[:40] + "..." if len(title) > 40 else title
+    button_text = f"[{size_str}] {short_title}"
+    
+    if len(button_text) > 64:
+        # Adjust title length to fit
+        max_title_len = 64 - len(f"[{size_str}] ") - 3  # 3 for "..."
+        button_text = f"[{size_str}] {title[:max_title_len]}..."
+    return button_text
+
+
 def get_search_results_keyboard(files: List, current_page: int = 0, 
                                 total_pages: int = 1, lang: str = "uz",
                                 file_sizes: dict = None) -> InlineKeyboardMarkup:
@@ -283,25 +334,8 @@ def get_search_results_keyboard(files: List, current_page: int = 0,
     
     # Add file buttons - each file as a button
     for file in files:
-        # Get file size
-        size_bytes = file_sizes.get(file.id, 0)
-        size_str = format_file_size(size_bytes)
-        
-        # Truncate title if too long (max 40 chars for button to leave space for size)
-        title = file.title[:40] + "..." if len(file.title) > 40 else file.title
-        
-        # Format: [file size] file name
-        button_text = f"[{size_str}] {title}"
-        
-        # Telegram button text limit is 64 characters
-        if len(button_text) > 64:
-            # Adjust title length to fit
-            max_title_len = 64 - len(f"[{size_str}] ") - 3  # 3 for "..."
-            title = file.title[:max_title_len] + "..."
-            button_text = f"[{size_str}] {title}"
-        
         builder.button(
-            text=button_text,
+            text=_file_button_text(file.title, format_file_size(file_sizes.get(file.id, 0))),
             callback_data=f"search_file:{file.id}"
         )
     
@@ -331,4 +365,81 @@ def get_search_results_keyboard(files: List, current_page: int = 0,
         # Using row() ensures they are side by side horizontally
         builder.row(prev_button, page_info_button, next_button)
     
-    return builder.as_markup()
\ No newline at end of file
+    return builder.as_markup()
+
+
+def get_browse_menu_keyboard(levels: List, tags: List, lang: str = "uz") -> InlineKeyboardMarkup:
+    """
+    Get browse menu keyboard: one button per level and per tag, with file counts
+    
+    Args:
+        levels: (level, key, count) tuples
+        tags: (tag, key, count) tuples
+    
+    Callback data is "browse_l:{key}" / "browse_t:{key}", where key is the
+    short facet key from app/bot/handlers/browse.py (names may not fit in
+    64 bytes of callback data).
+    """
+    builder = InlineKeyboardBuilder()
+    
+    level_buttons = [
+        InlineKeyboardButton(text=f"📊 {name} ({count})", callback_data=f"browse_l:{key}")
+        for name, key, count in levels
+    ]
+    for i in range(0, len(level_buttons), 3):
+        builder.row(*level_buttons[i:i + 3])
+    
+    tag_buttons = [
+        InlineKeyboardButton(text=f"🏷 {name[:40]} ({count})", callback_data=f"browse_t:{key}")
+        for name, key, count in tags
+    ]
+    for i in range(0, len(tag_buttons), 2):
+        builder.row(*tag_buttons[i:i + 2])
+    
+    return builder.as_markup()
+
+
+def get_browse_files_keyboard(files: List, kind: str, key: str, current_page: int, total_pages: int,
+                              prev_cursor: str = None, next_cursor: str = None,
+                              lang: str = "uz", file_sizes: dict = None) -> InlineKeyboardMarkup:
+    """
+    Get keyboard for one page of a browsed category
+    
+    File buttons open the file like search results; navigation callbacks are
+    "browse_p:{kind}:{key}:{page}:{cursor}" / "browse_n:..." with the target
+    page number and the cursor of the first/last file shown.
+    
+    Args:
+        files: Files on this page
+        kind: "l" (level) or "t" (tag)
+        key: Facet key of the level or tag
+        current_page: Current page number (0-indexed)
+        total_pages: Total pages
+        file_sizes: Dictionary mapping file.id to file size in bytes
+    """
+    from app.bot.helpers import format_file_size
+    
+    file_sizes = file_sizes or {}
+    builder = InlineKeyboardBuilder()
+    
+    for file in files:
+        builder.row(InlineKeyboardButton(
+            text=_file_button_text(file.title, format_file_size(file_sizes.get(file.id, 0))),
+            callback_data=f"search_file:{file.id}"
+        ))
+    
+    if total_pages > 1:
+        builder.row(
+            InlineKeyboardButton(
+                text="⬅️" if prev_cursor else " ",
+                callback_data=f"browse_p:{kind}:{key}:{current_page - 1}:{prev_cursor}" if prev_cursor else "noop"
+            ),
+            InlineKeyboardButton(text=f"{current_page + 1}/{total_pages}", callback_data="noop"),
+            InlineKeyboardButton(
+                text="➡️" if next_cursor else " ",
+                callback_data=f"browse_n:{kind}:{key}:{current_page + 1}:{next_cursor}" if next_cursor else "noop"
+            )
+        )
+    
+    builder.row(InlineKeyboardButton(text=get_text("btn_browse_back", lang), callback_data="browse"))
+    return builder.as_markup()
@@ -21,6 +21,7 @@ async def set_bot_commands(bot: Bot):
         BotCommand(command="start", description="Start bot"),
         BotCommand(command="help", description="Get help"),
         BotCommand(command="search", description="Search files"),
+        BotCommand(command="browse", description="Browse files by level and tag"),
         BotCommand(command="saved", description="View saved files"),
     ]
     
@@ -41,6 +42,30 @@ async def on_startup(bot: Bot):
     except Exception as e:
         logger.warning(f"Could not upgrade storage: {e}")
     
+    # Receive cache invalidations from the admin panel
+    from app.core.invalidation import start_listener
+    await start_listener()
+    
+    # Load in-memory search index (kept current by file change events)
+    if settings.SEARCH_MEMORY_INDEX_ENABLED:
+        from app.models.catalog_index import catalog_index
+        try:
+            await catalog_index.load()
+        except Exception as e:
+            logger.error(f"Could not load catalog search index, using database search: {e}")
+    
+    # Start download event flusher
+    from app.tasks.download_events import download_events
+    download_events.start()
+    
+    # Continue catalog reprocessing interrupted by the last shutdown
+    from app.tasks.reprocess import reprocess_job
+    reprocess_job.resume_interrupted()
+    
+    # Fill in sizes of files uploaded without one
+    from app.tasks.file_sizes import file_size_backfill
+    file_size_backfill.trigger()
+    
     logger.info("Setting bot commands...")
     await set_bot_commands(bot)
     
@@ -50,6 +75,17 @@ async def on_startup(bot: Bot):
 async def on_shutdown(bot: Bot):
     """On shutdown callback"""
     logger.info("Bot shutting down...")
+    from app.tasks.reprocess import reprocess_job
+    await reprocess_job.shutdown()
+    
+    from app.tasks.file_sizes import file_size_backfill
+    await file_size_backfill.shutdown()
+    
+    from app.tasks.download_events import download_events
+    await download_events.stop()
+    
+    from app.core.invalidation import stop_listener
+    await stop_listener()
     await bot.session.close()
 
 
@@ -75,6 +111,7 @@ async def update_user_commands(telegram_id: int, is_admin: bool):
         BotCommand(command="start", description="Start bot"),
         BotCommand(command="help", description="Get help"),
         BotCommand(command="search", description="Search files"),
+        BotCommand(command="browse", description="Browse files by level and tag"),
         BotCommand(command="saved", description="View saved files"),
         BotCommand(command="stats", description="View bot statistics"),
     ]
@@ -89,6 +126,8 @@ async def update_user_commands(telegram_id: int, is_admin: bool):
         BotCommand(command="add_fsub", description="Add force subscribe channel"),
         BotCommand(command="set_thumb", description="Set thumbnail"),
         BotCommand(command="del_thumb", description="Delete thumbnail"),
+        BotCommand(command="reprocess", description="Reprocess files with thumbnail"),
+        BotCommand(command="reprocess_status", description="Reprocessing progress"),
         BotCommand(command="cancel", description="Cancel operation"),
     ]
     
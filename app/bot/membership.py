@@ -0,0 +1,214 @@
+"""
+Force subscribe membership verification
+
+Membership is resolved in three tiers:
+1. Recorded state pushed by chat_member updates (see handlers/chat_member.py)
+2. Cached verdicts from earlier get_chat_member polls
+3. get_chat_member poll, for users with no recorded state
+
+Checks for all required channels run concurrently. State and verdicts
+are kept per (user_id, channel_id) in process memory or in Redis.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional
+from aiogram import Bot
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis_client import get_optional_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Membership statuses returned by the checks
+MEMBER = "member"
+LEFT = "left"
+NOT_FOUND = "not_found"  # Channel (or user) not found
+NO_RIGHTS = "no_rights"  # Bot is not admin in the channel
+ERROR = "error"  # Any other failure
+
+# Display suffix shown next to the channel name for non-member statuses
+STATUS_SUFFIXES = {
+    NOT_FOUND: " (Not found)",
+    NO_RIGHTS: " (Bot needs admin rights)",
+    ERROR: " (Error)",
+}
+
+REDIS_KEY_PREFIX = "fsub:verdict"
+REDIS_STATE_PREFIX = "fsub:state"
+
+# (user_id, channel_id) -> True (member) / False (left)
+_verdict_cache = TTLCache(maxsize=settings.FSUB_CACHE_SIZE, ttl=settings.FSUB_MEMBER_CACHE_TTL)
+_state_cache = TTLCache(maxsize=settings.FSUB_CACHE_SIZE, ttl=settings.FSUB_STATE_TTL)
+
+
+def format_channel_display(channel: Dict[str, Any]) -> str:
+    """Format channel name for display (@username, title or ID)"""
+    channel_username = channel.get("channel_username", "")
+    channel_title = channel.get("channel_title", "")
+    if channel_username:
+        return f"@{channel_username}"
+    if channel_title:
+        return channel_title
+    return f"Channel {channel.get('channel_id')}"
+
+
+async def _get_redis():
+    """Get Redis client if configured as verdict backend"""
+    if settings.FSUB_CACHE_BACKEND != "redis":
+        return None
+    return await get_optional_redis_client()
+
+
+async def get_cached_verdict(user_id: int, channel_id: int) -> Optional[bool]:
+    """Get cached membership verdict (True/False), or None if unknown"""
+    redis = await _get_redis()
+    if redis is not None:
+        try:
+            value = await redis.get(f"{REDIS_KEY_PREFIX}:{channel_id}:{user_id}")
+            if value is not None:
+                return value == "1"
+            return None
+        except Exception as e:
+            logger.warning(f"Redis error reading fsub verdict: {e}")
+    
+    return _verdict_cache.get((user_id, channel_id))
+
+
+async def set_cached_verdict(user_id: int, channel_id: int, is_member: bool) -> None:
+    """Cache membership verdict with positive or negative TTL"""
+    ttl = settings.FSUB_MEMBER_CACHE_TTL if is_member else settings.FSUB_LEFT_CACHE_TTL
+    
+    redis = await _get_redis()
+    if redis is not None:
+        try:
+            await redis.set(
+                f"{REDIS_KEY_PREFIX}:{channel_id}:{user_id}",
+                "1" if is_member else "0",
+                ex=max(1, int(ttl))
+            )
+            return
+        except Exception as e:
+            logger.warning(f"Redis error writing fsub verdict: {e}")
+    
+    _verdict_cache.set((user_id, channel_id), is_member, ttl=ttl)
+
+
+async def get_recorded_state(user_id: int, channel_id: int) -> Optional[bool]:
+    """Get membership recorded from chat_member updates, or None if never seen"""
+    redis = await _get_redis()
+    if redis is not None:
+        try:
+            value = await redis.get(f"{REDIS_STATE_PREFIX}:{channel_id}:{user_id}")
+            if value is not None:
+                return value == "1"
+            return None
+        except Exception as e:
+            logger.warning(f"Redis error reading fsub state: {e}")
+    
+    return _state_cache.get((user_id, channel_id))
+
+
+async def record_membership(user_id: int, channel_id: int, is_member: bool) -> None:
+    """
+    Record membership state (from a chat_member update or a forced re-check)
+    
+    Recorded state takes priority over polled verdicts. It expires after
+    FSUB_STATE_TTL only as a safety net against missed updates.
+    """
+    redis = await _get_redis()
+    if redis is not None:
+        try:
+            await redis.set(
+                f"{REDIS_STATE_PREFIX}:{channel_id}:{user_id}",
+                "1" if is_member else "0",
+                ex=max(1, int(settings.FSUB_STATE_TTL))
+            )
+            await redis.delete(f"{REDIS_KEY_PREFIX}:{channel_id}:{user_id}")
+            return
+        except Exception as e:
+            logger.warning(f"Redis error writing fsub state: {e}")
+    
+    _state_cache.set((user_id, channel_id), is_member)
+    _verdict_cache.pop((user_id, channel_id))
+
+
+async def fetch_membership_status(bot: Bot, user_id: int, channel_id: int) -> str:
+    """Ask Telegram whether user is a member of the channel (no caching)"""
+    try:
+        member = await bot.get_chat_member(chat_id=channel_id, user_id=user_id)
+        # Valid member statuses: "member", "administrator", "creator", "restricted"
+        # Invalid statuses: "left", "kicked"
+        if member.status in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]:
+            return LEFT
+        return MEMBER
+    
+    except TelegramBadRequest as e:
+        error_msg = str(e).lower()
+        if "chat not found" in error_msg or "user not found" in error_msg:
+            logger.error(f"Channel {channel_id} not found or user {user_id} not accessible: {e}")
+            return NOT_FOUND
+        if "member list is inaccessible" in error_msg:
+            # Bot can't access member list - bot is NOT admin or doesn't have rights
+            logger.error(f"Cannot access member list for channel {channel_id} - bot MUST be admin in the channel to enforce fsub!")
+            return NO_RIGHTS
+        logger.warning(f"Bad request checking channel {channel_id}: {e}")
+        return ERROR
+    except TelegramForbiddenError:
+        # Bot doesn't have access to check membership - bot is NOT admin
+        logger.error(f"Bot cannot check membership for channel {channel_id} - bot MUST be admin in the channel to enforce fsub!")
+        return NO_RIGHTS
+    except Exception as e:
+        logger.error(f"Unexpected error checking channel {channel_id}: {e}")
+        return ERROR
+
+
+async def get_membership_status(bot: Bot, user_id: int, channel_id: int,
+                                force_refresh: bool = False) -> str:
+    """
+    Get membership status for one channel
+    
+    Recorded state is used first, then cached verdicts, and Telegram is
+    only polled when neither is known. Only definite answers (member / left)
+    are cached; errors are always re-checked on the next update.
+    A forced re-check overwrites the recorded state.
+    """
+    if not force_refresh:
+        state = await get_recorded_state(user_id, channel_id)
+        if state is not None:
+            return MEMBER if state else LEFT
+        
+        verdict = await get_cached_verdict(user_id, channel_id)
+        if verdict is not None:
+            return MEMBER if verdict else LEFT
+    
+    status = await fetch_membership_status(bot, user_id, channel_id)
+    if status in (MEMBER, LEFT):
+        if force_refresh:
+            await record_membership(user_id, channel_id, status == MEMBER)
+        else:
+            await set_cached_verdict(user_id, channel_id, status == MEMBER)
+    return status
+
+
+async def check_memberships(bot: Bot, user_id: int, channels: List[Dict[str, Any]],
+                            force_refresh: bool = False) -> Dict[int, str]:
+    """
+    Check membership in all channels concurrently
+    
+    Args:
+        bot: Bot instance
+        user_id: Telegram user ID
+        channels: Force subscribe channel dicts (with channel_id)
+        force_refresh: Skip cached verdicts and ask Telegram again
+    
+    Returns:
+        Mapping of channel_id to membership status
+    """
+    channel_ids = [channel.get("channel_id") for channel in channels]
+    statuses = await asyncio.gather(*[
+        get_membership_status(bot, user_id, channel_id, force_refresh=force_refresh)
+        for channel_id in channel_ids
+    ])
+    return dict(zip(channel_ids, statuses))
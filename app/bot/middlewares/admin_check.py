@@ -3,14 +3,13 @@ from aiogram import BaseMiddleware
 from aiogram.types import Message
 from app.core.config import settings
 from app.bot.translations import get_text
-from app.models.crud import is_user_admin, user_has_permission
-from app.core.database import AsyncSession, get_db
 
 
 class AdminCheckMiddleware(BaseMiddleware):
     """
     Middleware to check if user is admin with optional permission check
-    Checks database for is_admin field or primary ADMIN_ID
+    Uses the user snapshot loaded by UserCheckMiddleware (is_admin field or
+    primary ADMIN_ID, permissions as a precomputed bitmask) - no DB queries
     Can also check for specific permissions
     """
     
@@ -28,36 +27,28 @@ class AdminCheckMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         user = event.from_user
+        lang = data.get("lang", "uz")
         
         if not user:
-            lang = data.get("lang", "uz")
             await event.answer(get_text("admin_only", lang))
             return
         
-        # Get database session
-        db: AsyncSession = data.get("db")
-        if not db:
-            # Fallback to primary admin ID if no database
+        db_user = data.get("db_user")
+        if not db_user:
+            # Fallback to primary admin ID if user snapshot is not available
             if user.id != settings.ADMIN_ID:
-                lang = data.get("lang", "uz")
                 await event.answer(get_text("admin_only", lang))
                 return
         else:
             # Check if user is admin in database or primary admin
-            is_admin = await is_user_admin(db, user.id, settings.ADMIN_ID)
-            if not is_admin:
-                lang = data.get("lang", "uz")
+            if not db_user.has_admin_access:
                 await event.answer(get_text("admin_only", lang))
                 return
             
             # If specific permission is required, check it
-            if self.required_permission:
-                has_perm = await user_has_permission(db, user.id, settings.ADMIN_ID, self.required_permission)
-                if not has_perm:
-                    lang = data.get("lang", "uz")
-                    await event.answer(get_text("admin_only", lang))
-                    return
+            if self.required_permission and not db_user.has_permission(self.required_permission):
+                await event.answer(get_text("admin_only", lang))
+                return
         
         data["is_admin"] = True
         return await handler(event, data)
-
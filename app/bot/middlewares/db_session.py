@@ -0,0 +1,75 @@
+from typing import Callable, Dict, Any, Awaitable, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.database import AsyncSessionLocal
+
+
+class LazySession:
+    """
+    Proxy for AsyncSession that is only created on first use
+    
+    Attribute access is forwarded to the real session, so handlers and
+    CRUD functions can use it exactly like an AsyncSession.
+    """
+    
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+        self._closed = False
+    
+    @property
+    def session(self) -> AsyncSession:
+        """
+        Get underlying session, creating it if needed
+        
+        Raises:
+            RuntimeError: If used after close() (would leak a new session)
+        """
+        if self._closed:
+            raise RuntimeError("LazySession used after close()")
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+    
+    @property
+    def is_opened(self) -> bool:
+        """Whether the underlying session has been created"""
+        return self._session is not None
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+    
+    async def close(self) -> None:
+        """Close underlying session (if any) and release its connection"""
+        self._closed = True
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Middleware to provide one lazy database session per update
+    
+    Must be registered before any middleware that uses data["db"].
+    The same session is shared by all middlewares and the handler, and
+    is closed as soon as the handler returns.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Session already provided by an outer middleware
+        if data.get("db") is not None:
+            return await handler(event, data)
+        
+        db = LazySession()
+        data["db"] = db
+        try:
+            return await handler(event, data)
+        finally:
+            await db.close()
@@ -0,0 +1,118 @@
+from typing import Callable, Dict, Any, Awaitable, Optional
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message, CallbackQuery
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis_client import get_optional_redis_client
+from app.bot.translations import get_text
+from app.models.cache import get_cached_user
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "throttle"
+
+# Refill and take tokens atomically; returns 1 if allowed, 0 if over limit
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Per-user token bucket rate limiting
+    
+    Each user has a bucket of THROTTLE_BURST tokens refilled at THROTTLE_RATE
+    tokens per second. Handlers cost THROTTLE_CHEAP_COST by default, or
+    THROTTLE_EXPENSIVE_COST when marked with flags={"throttle": "expensive"}.
+    Over-limit callbacks get a short alert, over-limit messages are dropped.
+    Must be registered first so rejected updates never touch the DB.
+    """
+    
+    def __init__(self):
+        # user_id -> (tokens, last_refill); idle buckets expire once fully refilled
+        self._buckets = TTLCache(
+            maxsize=settings.USER_CACHE_SIZE,
+            ttl=settings.THROTTLE_BURST / settings.THROTTLE_RATE
+        )
+    
+    def _get_cost(self, data: Dict[str, Any]) -> float:
+        """Token cost of the matched handler"""
+        if get_flag(data, "throttle") == "expensive":
+            return settings.THROTTLE_EXPENSIVE_COST
+        return settings.THROTTLE_CHEAP_COST
+    
+    def _consume_memory(self, user_id: int, cost: float) -> bool:
+        """Take tokens from in-process bucket"""
+        now = time.monotonic()
+        tokens, last_refill = self._buckets.get(user_id, (settings.THROTTLE_BURST, now))
+        tokens = min(settings.THROTTLE_BURST, tokens + (now - last_refill) * settings.THROTTLE_RATE)
+        
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets.set(user_id, (tokens, now))
+        return allowed
+    
+    async def _consume_redis(self, redis, user_id: int, cost: float) -> Optional[bool]:
+        """Take tokens from bucket shared by all workers (None on Redis error)"""
+        try:
+            allowed = await redis.eval(
+                TOKEN_BUCKET_SCRIPT, 1, f"{REDIS_KEY_PREFIX}:{user_id}",
+                settings.THROTTLE_RATE, settings.THROTTLE_BURST, cost, time.time()
+            )
+            return bool(int(allowed))
+        except Exception as e:
+            logger.warning(f"Redis error in throttling, using in-memory bucket: {e}")
+            return None
+    
+    async def consume(self, user_id: int, cost: float) -> bool:
+        """Take tokens for one update; False if user is over the limit"""
+        if settings.THROTTLE_BACKEND == "redis":
+            redis = await get_optional_redis_client()
+            if redis is not None:
+                allowed = await self._consume_redis(redis, user_id, cost)
+                if allowed is not None:
+                    return allowed
+        return self._consume_memory(user_id, cost)
+    
+    async def __call__(
+        self,
+        handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = event.from_user
+        if not settings.THROTTLE_ENABLED or not user or user.id == settings.ADMIN_ID:
+            return await handler(event, data)
+        
+        if await self.consume(user.id, self._get_cost(data)):
+            return await handler(event, data)
+        
+        logger.debug(f"Throttled update from user {user.id}")
+        if isinstance(event, CallbackQuery):
+            # Language from cached snapshot only - no DB access for rejected updates
+            cached = get_cached_user(user.id)
+            lang = cached.language if cached else "uz"
+            try:
+                await event.answer(get_text("too_many_requests", lang))
+            except Exception:
+                pass
+        return None
@@ -1,15 +1,22 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineQuery
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import AsyncSessionLocal
-from app.models.crud import get_user_by_telegram_id, create_user
+from app.models.crud import get_user_snapshot, create_user, get_admin_contact
+from app.models.cache import UserSnapshot, blocked_notice_cache
 
 
 class UserCheckMiddleware(BaseMiddleware):
     """
     Middleware to check if user exists and create if not
     Also checks if user is blocked
+    
+    Blocked users get one notice per BLOCKED_NOTICE_WINDOW; further updates
+    in the window are dropped without any database access.
+    
+    Users are resolved through the snapshot cache, so repeat visitors
+    cost no database round trip (the lazy session is never opened).
+    Requires DbSessionMiddleware to provide data["db"].
     """
     
     async def __call__(
@@ -23,63 +30,44 @@ class UserCheckMiddleware(BaseMiddleware):
         if not user:
             return await handler(event, data)
         
-        # Get database session
-        async with AsyncSessionLocal() as db:
-            # Check if user exists
-            db_user = await get_user_by_telegram_id(db, user.id)
-            
-            if not db_user:
-                # Create new user
-                db_user = await create_user(
-                    db,
-                    telegram_id=user.id,
-                    username=user.username,
-                    full_name=user.full_name or user.first_name,
-                    language="uz"  # Default language
-                )
-            
-            # Check if user is blocked
-            if db_user.is_blocked:
-                from app.bot.translations import get_text
-                from app.models.crud import get_setting
-                
-                # Get admin display username from settings
-                admin_username = "admin"  # Default fallback
-                try:
-                    # First try to get custom display username from settings
-                    display_username = await get_setting(db, "admin_display_username")
-                    if display_username:
-                        admin_username = display_username
-                    else:
-                        # Fallback to Telegram username
-                        from app.core.config import settings
-                        from sqlalchemy import select
-                        from app.models.base import User
-                        
-                        # Try to get primary admin user
-                        admin_user = await get_user_by_telegram_id(db, settings.ADMIN_ID)
-                        if admin_user and admin_user.username:
-                            admin_username = admin_user.username
-                        else:
-                            # Try to get any admin user
-                            result = await db.execute(
-                                select(User).where(User.is_admin == True).limit(1)
-                            )
-                            admin_user = result.scalar_one_or_none()
-                            if admin_user and admin_user.username:
-                                admin_username = admin_user.username
-                except Exception:
-                    pass  # Use default if can't get admin username
-                
-                blocked_text = get_text("you_are_blocked", db_user.language, admin_username=admin_username)
-                if isinstance(event, Message):
-                    await event.answer(blocked_text)
-                elif isinstance(event, CallbackQuery):
-                    await event.answer(blocked_text, show_alert=True)
-                return
+        # Blocked user already notified recently - drop before touching the DB
+        if user.id in blocked_notice_cache:
+            return
+        
+        # Shared per-update session (see DbSessionMiddleware)
+        db: AsyncSession = data["db"]
+        
+        # Check if user exists (cached snapshot, DB on miss)
+        db_user = await get_user_snapshot(db, user.id)
+        
+        if not db_user:
+            # Create new user
+            created = await create_user(
+                db,
+                telegram_id=user.id,
+                username=user.username,
+                full_name=user.full_name or user.first_name,
+                language="uz"  # Default language
+            )
+            db_user = UserSnapshot.from_user(created)
+        
+        # Check if user is blocked
+        if db_user.is_blocked:
+            from app.bot.translations import get_text
             
-            # Add user to data
-            data["db_user"] = db_user
-            data["db"] = db
+            # Reply at most once per window, then stay silent
+            blocked_notice_cache.set(user.id, True)
+            admin_username = await get_admin_contact(db)
+            blocked_text = get_text("you_are_blocked", db_user.language, admin_username=admin_username)
+            if isinstance(event, Message):
+                await event.answer(blocked_text)
+            elif isinstance(event, CallbackQuery):
+                await event.answer(blocked_text, show_alert=True)
+            elif isinstance(event, InlineQuery):
+                await event.answer([], cache_time=0, is_personal=True)
+            return
         
-            return await handler(event, data)
+        # Add user to data
+        data["db_user"] = db_user
+        
+        return await handler(event, data)
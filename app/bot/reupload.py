@@ -0,0 +1,145 @@
+"""
+Document re-upload without temporary files
+
+Used to add the default thumbnail and the " - PrimeLingoBot" filename
+suffix to a document already stored on Telegram. Small documents are
+downloaded into memory and sent as BufferedInputFile; larger ones are
+streamed from the Bot API file server straight into the multipart upload
+through a bounded in-memory spool.
+"""
+import asyncio
+import io
+import logging
+import os
+from typing import AsyncGenerator, Optional
+from aiogram import Bot
+from aiogram.types import BufferedInputFile, InputFile, Message
+from app.bot.thumbnails import get_thumbnail_input
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+_END = object()
+
+
+class TelegramStreamInputFile(InputFile):
+    """
+    Streams a Telegram-hosted file into an upload
+    
+    Download and upload run concurrently; at most spool_chunks chunks are
+    held in memory between them. Each read() starts a fresh download, so
+    retried requests work.
+    """
+    
+    def __init__(self, file_path: str, filename: str, spool_chunks: int,
+                 chunk_size: int = CHUNK_SIZE, timeout: int = 300):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file_path = file_path
+        self.spool_chunks = spool_chunks
+        self.timeout = timeout
+    
+    def _open_stream(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        if bot.session.api.is_local:
+            local_path = str(bot.session.api.wrap_local_file.to_local(self.file_path))
+            return self._read_local(local_path)
+        return bot.session.stream_content(
+            url=bot.session.api.file_url(bot.token, self.file_path),
+            timeout=self.timeout,
+            chunk_size=self.chunk_size,
+            raise_for_status=True,
+        )
+    
+    async def _read_local(self, path: str) -> AsyncGenerator[bytes, None]:
+        import aiofiles
+        async with aiofiles.open(path, "rb") as f:
+            while chunk := await f.read(self.chunk_size):
+                yield chunk
+    
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        spool: asyncio.Queue = asyncio.Queue(maxsize=self.spool_chunks)
+        
+        async def produce() -> None:
+            try:
+                async for chunk in self._open_stream(bot):
+                    await spool.put(chunk)
+                await spool.put(_END)
+            except Exception as e:
+                await spool.put(e)
+        
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await spool.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+def processed_filename(original_filename: str) -> str:
+    """Add " - PrimeLingoBot" suffix before the extension"""
+    name_without_ext, ext = os.path.splitext(original_filename)
+    return f"{name_without_ext} - PrimeLingoBot{ext}"
+
+
+async def build_document_input(bot: Bot, telegram_file_id: str, filename: str) -> InputFile:
+    """
+    Get upload input for a Telegram-hosted document
+    
+    In memory for files up to REUPLOAD_BUFFER_MAX_BYTES, streamed otherwise.
+    """
+    tg_file = await bot.get_file(telegram_file_id)
+    
+    if tg_file.file_size and tg_file.file_size <= settings.REUPLOAD_BUFFER_MAX_BYTES:
+        buffer = io.BytesIO()
+        await bot.download_file(tg_file.file_path, buffer, timeout=settings.FILE_DOWNLOAD_TIMEOUT)
+        return BufferedInputFile(buffer.getvalue(), filename=filename)
+    
+    logger.debug(f"Streaming document re-upload ({tg_file.file_size or 'unknown'} bytes)")
+    return TelegramStreamInputFile(
+        tg_file.file_path,
+        filename=filename,
+        spool_chunks=settings.REUPLOAD_SPOOL_CHUNKS,
+        timeout=settings.FILE_DOWNLOAD_TIMEOUT,
+    )
+
+
+async def send_processed_document(bot: Bot, chat_id: int, telegram_file_id: str,
+                                  file_name: Optional[str], title: str, thumbnail_id: str,
+                                  caption: str, parse_mode: Optional[str] = None) -> Message:
+    """
+    Re-upload a document with the default thumbnail and suffixed filename
+    
+    Args:
+        bot: Bot instance
+        chat_id: Chat to send the processed document to
+        telegram_file_id: Original document file_id
+        file_name: Original filename (title is used if missing)
+        title: File title
+        thumbnail_id: Default thumbnail file_id (served from local cache)
+        caption: Message caption
+        parse_mode: Caption parse mode
+    
+    Returns:
+        Sent message (its document.file_id is the processed file_id)
+    """
+    doc_input = await build_document_input(bot, telegram_file_id, processed_filename(file_name or title))
+    thumb_input = await get_thumbnail_input(bot, thumbnail_id)
+    
+    return await bot.send_document(
+        chat_id=chat_id,
+        document=doc_input,
+        caption=caption,
+        thumbnail=thumb_input,
+        parse_mode=parse_mode,
+        request_timeout=settings.FILE_DOWNLOAD_TIMEOUT,
+    )
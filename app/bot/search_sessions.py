@@ -0,0 +1,86 @@
+"""
+Search result sessions
+
+A session holds a user's last search: the query, ordered result file IDs
+and search time. Pagination re-reads only the rows on the requested page,
+so deleted or edited files show up correctly and no ORM objects are kept
+between updates.
+
+Sessions live in process memory (bounded LRU) or in Redis, shared by all
+workers, and expire SEARCH_SESSION_TTL seconds after the last search.
+"""
+import json
+import logging
+import math
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis_client import get_optional_redis_client
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "search:session"
+
+# Results per page
+PAGE_SIZE = 10
+
+# user_id -> SearchSession
+_sessions = TTLCache(maxsize=settings.SEARCH_SESSION_CACHE_SIZE, ttl=settings.SEARCH_SESSION_TTL)
+
+
+@dataclass(frozen=True)
+class SearchSession:
+    """A user's last search results (file IDs, best first)"""
+    query: str
+    file_ids: List[int]
+    time_spent: float = 0.0
+    
+    @property
+    def total_pages(self) -> int:
+        return math.ceil(len(self.file_ids) / PAGE_SIZE)
+    
+    def page_ids(self, page: int) -> List[int]:
+        """File IDs shown on a page (0-based)"""
+        start = page * PAGE_SIZE
+        return self.file_ids[start:start + PAGE_SIZE]
+
+
+async def _get_redis():
+    """Get Redis client if configured as session backend"""
+    if settings.SEARCH_SESSION_BACKEND != "redis":
+        return None
+    return await get_optional_redis_client()
+
+
+async def save_search_session(user_id: int, session: SearchSession) -> None:
+    """Store a user's search, replacing the previous one"""
+    redis = await _get_redis()
+    if redis is not None:
+        try:
+            await redis.set(
+                f"{REDIS_KEY_PREFIX}:{user_id}",
+                json.dumps(asdict(session)),
+                ex=max(1, int(settings.SEARCH_SESSION_TTL))
+            )
+            _sessions.pop(user_id)
+            return
+        except Exception as e:
+            logger.warning(f"Redis error saving search session: {e}")
+    
+    _sessions.set(user_id, session)
+
+
+async def get_search_session(user_id: int) -> Optional[SearchSession]:
+    """Get a user's last search, or None if expired"""
+    redis = await _get_redis()
+    if redis is not None:
+        try:
+            value = await redis.get(f"{REDIS_KEY_PREFIX}:{user_id}")
+            if value is not None:
+                return SearchSession(**json.loads(value))
+        except Exception as e:
+            logger.warning(f"Redis error reading search session: {e}")
+    
+    # Memory backend, or saved while Redis was down
+    return _sessions.get(user_id)
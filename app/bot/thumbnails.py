@@ -0,0 +1,141 @@
+"""
+Default thumbnail asset pipeline
+
+The thumbnail is downloaded from Telegram once (when /set_thumb runs, or on
+first use), normalized with Pillow to Telegram's thumbnail limits and kept
+in a content-addressed cache:
+
+    {THUMBNAIL_CACHE_DIR}/blobs/<sha256 of JPEG>.jpg
+    {THUMBNAIL_CACHE_DIR}/refs/<sha256 of file_id>   -> blob digest
+
+Processing paths get the JPEG bytes from memory or disk instead of calling
+get_file + download_file for every document.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from typing import Optional
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Telegram thumbnail limits
+MAX_SIDE = 320
+MAX_BYTES = 200 * 1024
+
+# thumbnail file_id -> normalized JPEG bytes
+_memory_cache = TTLCache(maxsize=8, ttl=None)
+_fetches = SingleFlight()
+
+
+def normalize_thumbnail(raw: bytes) -> bytes:
+    """Convert image to RGB JPEG at most 320px per side and under 200 KB"""
+    from PIL import Image
+    
+    with Image.open(io.BytesIO(raw)) as image:
+        image.load()
+        if image.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto white background
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        
+        image.thumbnail((MAX_SIDE, MAX_SIDE))
+        
+        data = b""
+        for quality in (90, 80, 70, 60, 50, 40, 30):
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            data = buffer.getvalue()
+            if len(data) < MAX_BYTES:
+                break
+        return data
+
+
+def _ref_path(file_id: str) -> str:
+    digest = hashlib.sha256(file_id.encode()).hexdigest()
+    return os.path.join(settings.THUMBNAIL_CACHE_DIR, "refs", digest)
+
+
+def _blob_path(digest: str) -> str:
+    return os.path.join(settings.THUMBNAIL_CACHE_DIR, "blobs", f"{digest}.jpg")
+
+
+def _read_from_disk(file_id: str) -> Optional[bytes]:
+    """Load normalized thumbnail for file_id from disk cache"""
+    try:
+        with open(_ref_path(file_id), "r") as ref:
+            digest = ref.read().strip()
+        with open(_blob_path(digest), "rb") as blob:
+            return blob.read()
+    except (OSError, ValueError):
+        return None
+
+
+def _write_to_disk(file_id: str, data: bytes) -> None:
+    """Store normalized thumbnail blob and its file_id reference"""
+    digest = hashlib.sha256(data).hexdigest()
+    blob_path = _blob_path(digest)
+    ref_path = _ref_path(file_id)
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+    
+    # Write to temp name and rename, so readers never see partial files
+    if not os.path.exists(blob_path):
+        with open(f"{blob_path}.tmp", "wb") as blob:
+            blob.write(data)
+        os.replace(f"{blob_path}.tmp", blob_path)
+    with open(f"{ref_path}.tmp", "w") as ref:
+        ref.write(digest)
+    os.replace(f"{ref_path}.tmp", ref_path)
+
+
+async def _fetch_and_store(bot: Bot, file_id: str) -> bytes:
+    """Download thumbnail from Telegram, normalize and cache it"""
+    buffer = io.BytesIO()
+    await bot.download(file_id, destination=buffer)
+    data = await asyncio.to_thread(normalize_thumbnail, buffer.getvalue())
+    
+    try:
+        await asyncio.to_thread(_write_to_disk, file_id, data)
+    except OSError as e:
+        logger.warning(f"Could not write thumbnail to disk cache: {e}")
+    
+    _memory_cache.set(file_id, data)
+    logger.info(f"Cached normalized thumbnail ({len(data)} bytes)")
+    return data
+
+
+async def get_thumbnail(bot: Bot, file_id: str) -> bytes:
+    """
+    Get normalized thumbnail JPEG bytes for a Telegram file_id
+    
+    Served from memory, then disk; downloaded from Telegram only once.
+    Raises on download/decoding errors.
+    """
+    data = _memory_cache.get(file_id)
+    if data is not None:
+        return data
+    
+    data = await asyncio.to_thread(_read_from_disk, file_id)
+    if data is not None:
+        _memory_cache.set(file_id, data)
+        return data
+    
+    data, _ = await _fetches.do(file_id, lambda: _fetch_and_store(bot, file_id))
+    return data
+
+
+async def get_thumbnail_input(bot: Bot, file_id: str) -> BufferedInputFile:
+    """Get normalized thumbnail ready to pass as thumbnail= to send_document"""
+    data = await get_thumbnail(bot, file_id)
+    return BufferedInputFile(data, filename="thumbnail.jpg")
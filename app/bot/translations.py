@@ -77,6 +77,21 @@ TRANSLATIONS = {
         "en": "🚫 No results found. Try searching with different keywords.",
         "ru": "🚫 Ничего не найдено. Попробуйте другие ключевые слова."
     },
+    "browse_title": {
+        "uz": "📂 Daraja yoki teg bo'yicha fayllarni tanlang:",
+        "en": "📂 Browse files by level or tag:",
+        "ru": "📂 Выберите файлы по уровню или тегу:"
+    },
+    "browse_empty": {
+        "uz": "🚫 Hozircha daraja yoki teglar yo'q.",
+        "en": "🚫 No levels or tags yet.",
+        "ru": "🚫 Пока нет уровней или тегов."
+    },
+    "btn_browse_back": {
+        "uz": "⬅️ Orqaga",
+        "en": "⬅️ Back",
+        "ru": "⬅️ Назад"
+    },
     "select_menu_option": {
         "uz": "Quyidagi menular birini tanlang:",
         "en": "Please select one of the following menu options:",
@@ -388,10 +403,30 @@ PrimeLingoBot - бот для поиска и загрузки книг и ма
         "en": "<b>🚫 You haven't joined the channel(s) yet:</b>\n\nPlease join all channels and try again.",
         "ru": "<b>🚫 Вы еще не подписались на следующие каналы:</b>\n\nПожалуйста, подпишитесь на все каналы и попробуйте снова."
     },
+    "inline_join_required": {
+        "uz": "⚠️ Qidirish uchun kanallarga a'zo bo'ling",
+        "en": "⚠️ Join the channels to search",
+        "ru": "⚠️ Подпишитесь на каналы для поиска"
+    },
     "fsub_no_channels": {
         "uz": "ℹ️ Hozircha force join kanallar yo'q.",
         "en": "ℹ️ No force join channels at the moment.",
         "ru": "ℹ️ Нет каналов для обязательной подписки в данный момент."
+    },
+    "too_many_requests": {
+        "uz": "⏳ Juda ko'p so'rov. Iltimos, biroz kuting.",
+        "en": "⏳ Too many requests. Please wait a moment.",
+        "ru": "⏳ Слишком много запросов. Пожалуйста, подождите."
+    },
+    "processing_queued": {
+        "uz": "⏳ Fayl tayyorlanmoqda. Navbatdagi o'rningiz: {position}",
+        "en": "⏳ Preparing your file. Your place in queue: {position}",
+        "ru": "⏳ Готовим ваш файл. Ваше место в очереди: {position}"
+    },
+    "processing_busy": {
+        "uz": "⏳ Hozir so'rovlar juda ko'p. Iltimos, birozdan so'ng qayta urinib ko'ring.",
+        "en": "⏳ The bot is busy right now. Please try again in a few minutes.",
+        "ru": "⏳ Бот сейчас перегружен. Пожалуйста, попробуйте через несколько минут."
     }
 }
 
@@ -72,7 +72,8 @@ async def setup_webhook(bot: Bot, webhook_url: str, webhook_path: str = "/webhoo
         
         await bot.set_webhook(
             url=full_url,
-            allowed_updates=None,  # All updates
+            # Explicit list - chat_member updates are only sent when requested
+            allowed_updates=_dp.resolve_used_update_types() if _dp else None,
             drop_pending_updates=False,
             secret_token=None  # Optional: add for security
         )
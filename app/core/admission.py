@@ -0,0 +1,163 @@
+"""
+Admission control for heavy work
+
+FairScheduler limits how many heavy jobs (document download + re-upload)
+run at once. Callers over the limit wait in a bounded queue and are
+admitted round-robin across keys (users), so one user starting many
+downloads can't hold everyone else back. Waiting callers can be told
+their queue position.
+"""
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Wait queue is full (globally or for this key)"""
+
+
+class FairScheduler:
+    """Concurrency limit with a bounded, per-key round-robin wait queue"""
+    
+    def __init__(self, max_concurrency: int, max_queue: int, max_queued_per_key: int,
+                 position_update_interval: float = 5.0):
+        """
+        Args:
+            max_concurrency: Jobs running at once
+            max_queue: Waiting callers in total
+            max_queued_per_key: Waiting callers per key
+            position_update_interval: Seconds between queue position checks
+        """
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self.max_queued_per_key = max_queued_per_key
+        self.position_update_interval = position_update_interval
+        self._active = 0
+        self._queued = 0
+        # Key -> FIFO of waiters; dict order is the round-robin order
+        self._queues: Dict[Hashable, Deque[asyncio.Future]] = {}
+    
+    @property
+    def active(self) -> int:
+        return self._active
+    
+    @property
+    def queued(self) -> int:
+        return self._queued
+    
+    def position(self, key: Hashable, waiter: asyncio.Future) -> int:
+        """1-based place of a waiter in admission order (0 if not queued)"""
+        queue = self._queues.get(key)
+        if not queue or waiter not in queue:
+            return 0
+        
+        index = queue.index(waiter)
+        position = index + 1
+        before = True
+        for other_key, other in self._queues.items():
+            if other_key == key:
+                before = False
+                continue
+            # Keys ahead in the rotation get one more turn before ours
+            position += min(len(other), index + 1 if before else index)
+        return position
+    
+    def _remove(self, key: Hashable, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[key]
+    
+    async def acquire(self, key: Hashable,
+                      on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+                      limit_queue: bool = True) -> None:
+        """
+        Wait for a slot
+        
+        Args:
+            key: Fairness key (user ID)
+            on_position: Called with the queue position when it changes
+            limit_queue: False for internal work that must not be rejected
+        
+        Raises:
+            QueueFull: If the caller can't be queued
+        """
+        if self._active < self.max_concurrency and not self._queues:
+            self._active += 1
+            return
+        
+        if limit_queue:
+            if self._queued >= self.max_queue:
+                raise QueueFull("Processing queue is full")
+            if len(self._queues.get(key, ())) >= self.max_queued_per_key:
+                raise QueueFull("Too many queued jobs for this user")
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(waiter)
+        self._queued += 1
+        
+        try:
+            last_position = None
+            while True:
+                position = self.position(key, waiter)
+                if on_position and position and position != last_position:
+                    last_position = position
+                    try:
+                        await on_position(position)
+                    except Exception as e:
+                        logger.debug(f"Could not report queue position: {e}")
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), timeout=self.position_update_interval)
+                    return
+                except asyncio.TimeoutError:
+                    continue
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we gave up - pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._remove(key, waiter)
+            raise
+    
+    def release(self) -> None:
+        """Free a slot, handing it to the next waiter in round-robin order"""
+        while self._queues:
+            key = next(iter(self._queues))
+            queue = self._queues.pop(key)
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                # Back of the rotation
+                self._queues[key] = queue
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+    
+    @asynccontextmanager
+    async def slot(self, key: Hashable,
+                   on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+                   limit_queue: bool = True) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block (see acquire)"""
+        await self.acquire(key, on_position=on_position, limit_queue=limit_queue)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+# Document download + re-upload (on-the-fly processing and reprocessing job)
+processing_scheduler = FairScheduler(
+    max_concurrency=settings.PROCESSING_MAX_CONCURRENCY,
+    max_queue=settings.PROCESSING_MAX_QUEUE,
+    max_queued_per_key=settings.PROCESSING_MAX_QUEUED_PER_USER,
+    position_update_interval=settings.PROCESSING_POSITION_UPDATE_INTERVAL,
+)
@@ -43,6 +43,7 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
     REDIS_URL: Optional[str] = None  # Override with full Redis URL if needed
+    REDIS_RETRY_INTERVAL: float = 30.0  # Seconds before retrying Redis after a failed connection
     
     # Task Queue (RQ - Redis Queue)
     RQ_REDIS_URL: Optional[str] = None  # Uses REDIS_URL if not set
@@ -93,12 +94,79 @@ class Settings(BaseSettings):
     # Timeouts and Retries
     REQUEST_TIMEOUT: int = 30  # seconds
     FILE_DOWNLOAD_TIMEOUT: int = 300  # 5 minutes for large files
+    THUMBNAIL_CACHE_DIR: str = "./data/thumbnails"  # Normalized default thumbnail cache
+    REUPLOAD_BUFFER_MAX_BYTES: int = 5 * 1024 * 1024  # Documents up to this size are re-uploaded from memory
+    REUPLOAD_SPOOL_CHUNKS: int = 16  # 64 KB chunks buffered between download and upload when streaming
     MAX_RETRIES: int = 3
     RETRY_BACKOFF_BASE: float = 2.0  # Exponential backoff base
     
     # Broadcast Settings
     BROADCAST_BATCH_SIZE: int = 30  # Messages per batch (Telegram limit is ~30/sec)
     BROADCAST_DELAY: float = 0.05  # Delay between batches in seconds
+    
+    # Download event write-behind buffer
+    DOWNLOAD_FLUSH_BATCH_SIZE: int = 100  # Flush after this many buffered downloads
+    DOWNLOAD_FLUSH_INTERVAL_MS: int = 2000  # ...or at least this often (milliseconds)
+    DOWNLOAD_BUFFER_MAX_PENDING: int = 50000  # Oldest events are dropped beyond this while the DB is unavailable
+    DOWNLOAD_COUNTER_RECONCILE_INTERVAL: float = 60.0  # Seconds between writing hot download counters into files table
+    
+    # Catalog reprocessing job (thumbnail + filename suffix for existing files)
+    REPROCESS_BATCH_SIZE: int = 50  # Files fetched from DB per batch
+    REPROCESS_WORKERS: int = 3  # Concurrent downloads/uploads
+    REPROCESS_UPLOADS_PER_MINUTE: int = 20  # Upload rate to the admin chat (Telegram flood limits)
+    REPROCESS_CHECKPOINT_INTERVAL: float = 10.0  # Seconds between progress checkpoints
+    
+    # File size backfill (files stored without file_size)
+    FILE_SIZE_BACKFILL_BATCH_SIZE: int = 100  # Files read and updated per batch
+    FILE_SIZE_BACKFILL_WORKERS: int = 5  # Concurrent get_file calls
+    FILE_SIZE_BACKFILL_PER_MINUTE: int = 600  # get_file calls per minute
+    
+    # Admission control for document re-uploads (on-the-fly processing, reprocessing job)
+    PROCESSING_MAX_CONCURRENCY: int = 4  # Re-uploads running at once
+    PROCESSING_MAX_QUEUE: int = 100  # Downloads waiting for a slot
+    PROCESSING_MAX_QUEUED_PER_USER: int = 2  # Waiting downloads per user
+    PROCESSING_POSITION_UPDATE_INTERVAL: float = 5.0  # Seconds between queue position updates shown to the user
+    PROCESSING_QUEUE_FULL_FALLBACK: str = "original"  # original (send unprocessed file) or reject (ask to retry later)
+    
+    # Catalog search
+    SEARCH_FUZZY_ENABLED: bool = True  # Trigram matching when full-text search finds nothing (typos)
+    SEARCH_FUZZY_THRESHOLD: float = 0.5  # Min share of query trigrams found in a title (0-1)
+    SEARCH_FUZZY_MAX_RESULTS: int = 1000  # Max fuzzy matches considered (SQLite in-process index)
+    SEARCH_MEMORY_INDEX_ENABLED: bool = False  # Answer bot searches from an in-memory title/tag index
+    SEARCH_MEMORY_INDEX_MAX_AGE: float = 300.0  # Seconds before the index is reloaded when other processes' changes aren't received (no Redis)
+    SEARCH_SESSION_BACKEND: str = "memory"  # memory or redis (falls back to memory if Redis is down)
+    SEARCH_SESSION_TTL: float = 1800.0  # Seconds search results stay pageable
+    SEARCH_SESSION_CACHE_SIZE: int = 10000  # Max users' search sessions kept in memory
+    INLINE_SEARCH_CACHE_TIME: int = 300  # Seconds Telegram may cache an inline answer (cache_time)
+    INLINE_SEARCH_CACHE_TTL: float = 300.0  # Seconds inline query results are cached in process
+    INLINE_SEARCH_CACHE_SIZE: int = 1000  # Max inline queries' results kept in memory
+    INLINE_SEARCH_MAX_RESULTS: int = 200  # Max results per inline query (paged 50 at a time)
+
+    # In-process caches
+    USER_CACHE_SIZE: int = 10000  # Max user snapshots kept in memory
+    USER_CACHE_TTL: float = 300.0  # Seconds before a user snapshot is re-read from DB
+    ADMIN_CONTACT_CACHE_TTL: float = 3600.0  # Seconds to keep the admin contact shown to users
+    BLOCKED_NOTICE_WINDOW: float = 60.0  # Blocked users get the "you are blocked" reply at most once per window
+    FILE_CACHE_SIZE: int = 5000  # Max file snapshots kept in memory
+    FILE_CACHE_TTL: float = 600.0  # Seconds before a file snapshot is re-read from DB
+    FILE_NEGATIVE_CACHE_TTL: float = 30.0  # Seconds to remember that a file ID doesn't exist
+    FACET_CACHE_TTL: float = 3600.0  # Seconds to keep per-tag/level file counts (dropped on any file change)
+    
+    # Force subscribe membership verdict cache
+    FSUB_CACHE_BACKEND: str = "memory"  # memory or redis (falls back to memory if Redis is down)
+    FSUB_CACHE_SIZE: int = 50000  # Max (user, channel) verdicts kept in memory
+    FSUB_MEMBER_CACHE_TTL: float = 300.0  # Seconds to trust a positive membership check
+    FSUB_LEFT_CACHE_TTL: float = 30.0  # Seconds to trust a "left"/"kicked" result
+    FSUB_STATE_TTL: float = 86400.0  # Seconds to trust state pushed by chat_member updates
+    FSUB_CHANNELS_CACHE_TTL: float = 30.0  # Channel list cache TTL when cross-process invalidation is unavailable
+    
+    # Per-user throttling (token bucket)
+    THROTTLE_ENABLED: bool = True
+    THROTTLE_BACKEND: str = "memory"  # memory or redis (shared by all workers)
+    THROTTLE_RATE: float = 1.0  # Tokens refilled per second
+    THROTTLE_BURST: float = 10.0  # Bucket capacity
+    THROTTLE_CHEAP_COST: float = 1.0  # Cost of a regular update
+    THROTTLE_EXPENSIVE_COST: float = 4.0  # Cost of handlers flagged {"throttle": "expensive"} (downloads, searches)
 
     model_config = SettingsConfigDict(
         env_file=".env", 
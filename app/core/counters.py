@@ -0,0 +1,153 @@
+"""
+Hot counters with periodic reconciliation
+
+Increments go to a Redis hash (HINCRBY) instead of contended DB rows and
+are periodically drained into the database. When Redis is unavailable,
+increments are kept in process memory until the next reconciliation.
+Readers add pending deltas to the stored value to get the merged count.
+
+Each drained hash gets a batch ID that the database write records in
+its own transaction, so a batch retried after its hash could not be
+deleted is not counted twice.
+"""
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from app.core.redis_client import get_optional_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Lock lifetime, so a crashed reconciler doesn't block others forever
+RECONCILE_LOCK_TTL = 60
+
+
+class HotCounter:
+    """Integer counters keyed by row ID"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.key = f"counters:{name}"
+        self.reconciling_key = f"counters:{name}:reconciling"
+        self.batch_key = f"counters:{name}:batch"
+        self.lock_key = f"counters:{name}:lock"
+        self._local: Dict[int, int] = {}
+    
+    def _add_local(self, counts: Dict[int, int]) -> None:
+        for row_id, delta in counts.items():
+            self._local[row_id] = self._local.get(row_id, 0) + delta
+    
+    async def incr_many(self, counts: Dict[int, int]) -> None:
+        """Increment several counters at once"""
+        if not counts:
+            return
+        
+        redis = await get_optional_redis_client()
+        if redis is not None:
+            try:
+                pipe = redis.pipeline(transaction=False)
+                for row_id, delta in counts.items():
+                    pipe.hincrby(self.key, str(row_id), delta)
+                await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Redis error incrementing {self.name} counters, keeping in memory: {e}")
+        
+        self._add_local(counts)
+    
+    async def get_pending(self, row_ids: Iterable[int] = None) -> Dict[int, int]:
+        """
+        Get increments not yet written to the database
+        
+        Args:
+            row_ids: Only these rows (None = all pending rows)
+        """
+        pending: Dict[int, int] = {}
+        ids = list(row_ids) if row_ids is not None else None
+        
+        redis = await get_optional_redis_client()
+        if redis is not None and ids != []:
+            try:
+                # Current increments plus a batch being reconciled
+                for key in (self.key, self.reconciling_key):
+                    if ids is None:
+                        values = (await redis.hgetall(key)).items()
+                    else:
+                        values = zip(ids, await redis.hmget(key, [str(row_id) for row_id in ids]))
+                    for row_id, delta in values:
+                        if delta:
+                            pending[int(row_id)] = pending.get(int(row_id), 0) + int(delta)
+            except Exception as e:
+                logger.warning(f"Redis error reading {self.name} counters: {e}")
+        
+        for row_id, delta in self._local.items():
+            if ids is None or row_id in ids:
+                pending[row_id] = pending.get(row_id, 0) + delta
+        return pending
+    
+    async def reconcile(self, apply: Callable[[Dict[int, int], Optional[str]], Awaitable[None]]) -> int:
+        """
+        Drain pending increments into the database
+        
+        Args:
+            apply: Coroutine writing {row_id: delta} to the database. Gets
+                the batch ID (None for in-memory increments) and must skip
+                a batch it has already written, recording the ID in the
+                same transaction as the counts
+        
+        Returns:
+            Number of rows reconciled
+        """
+        reconciled = 0
+        
+        # In-memory fallback increments
+        if self._local:
+            local, self._local = self._local, {}
+            try:
+                await apply(local, None)
+                reconciled += len(local)
+            except Exception as e:
+                self._add_local(local)
+                logger.error(f"Error reconciling {self.name} counters: {e}", exc_info=True)
+        
+        redis = await get_optional_redis_client()
+        if redis is None:
+            return reconciled
+        
+        try:
+            # Only one worker reconciles at a time
+            if not await redis.set(self.lock_key, "1", nx=True, ex=RECONCILE_LOCK_TTL):
+                return reconciled
+            
+            try:
+                # Leftover from an interrupted run goes first (with its
+                # batch ID); otherwise atomically move current increments aside
+                batch = await redis.get(self.batch_key)
+                if not await redis.exists(self.reconciling_key):
+                    if not await redis.exists(self.key):
+                        return reconciled
+                    batch = uuid.uuid4().hex
+                    pipe = redis.pipeline(transaction=True)
+                    pipe.rename(self.key, self.reconciling_key)
+                    pipe.set(self.batch_key, batch)
+                    await pipe.execute()
+                elif batch is None:
+                    batch = uuid.uuid4().hex
+                    await redis.set(self.batch_key, batch)
+                
+                values = await redis.hgetall(self.reconciling_key)
+                counts = {int(row_id): int(delta) for row_id, delta in values.items() if int(delta)}
+                if counts:
+                    await apply(counts, batch)
+                    reconciled += len(counts)
+                await redis.delete(self.reconciling_key, self.batch_key)
+            finally:
+                await redis.delete(self.lock_key)
+        except Exception as e:
+            # Increments stay in the reconciling hash and are retried next run
+            logger.error(f"Error reconciling {self.name} counters from Redis: {e}", exc_info=True)
+        
+        return reconciled
+
+
+# files.downloads_count increments
+download_counter = HotCounter("file_downloads")
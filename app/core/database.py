@@ -1,3 +1,4 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import NullPool, QueuePool
 from app.core.config import settings
@@ -73,8 +74,32 @@ async def get_db():
         finally:
             await session.close()
 
+def _add_missing_columns(sync_conn) -> None:
+    # create_all skips columns added to tables that already exist
+    columns = {column["name"] for column in inspect(sync_conn).get_columns("files")}
+    if "search_key" not in columns:
+        sync_conn.execute(text("ALTER TABLE files ADD COLUMN search_key VARCHAR"))
+        logger.info("Added files.search_key column")
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def init_db():
     """Initialize database - create all tables"""
+    from app.models.search import ensure_search_index
+    from app.models.tags import ensure_file_tags
+    from app.models.search_key import ensure_search_keys
+    
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        # create_all skips indexes added to tables that already exist
+        await conn.run_sync(_create_missing_indexes)
+        await ensure_search_index(conn)
+        await ensure_file_tags(conn)
+        await ensure_search_keys(conn)
     logger.info("Database initialized successfully")
@@ -0,0 +1,134 @@
+"""
+Cross-process cache invalidation
+
+Caches register a handler for a topic with subscribe(). publish() runs the
+local handlers right away and broadcasts the event over Redis pub/sub, so
+other processes (bot, admin API) drop their copies too.
+Without Redis, events stay local and caches rely on their own TTL.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.redis_client import create_pubsub_client, get_optional_redis_client
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = "cache:invalidate"
+
+# Seconds between PINGs on an idle subscription (finds dead connections)
+HEALTH_CHECK_INTERVAL = 30
+
+# Identifies this process so it ignores its own broadcasts
+_origin = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_handlers: Dict[str, List[Callable[[str], None]]] = {}
+_listener_task: Optional[asyncio.Task] = None
+_connected = False
+
+
+def subscribe(topic: str, handler: Callable[[str], None]) -> None:
+    """
+    Register handler(payload) for invalidation events on a topic
+    
+    An empty payload means "invalidate everything for this topic".
+    """
+    _handlers.setdefault(topic, []).append(handler)
+
+
+def is_listening() -> bool:
+    """Whether events from other processes are currently being received"""
+    return _connected
+
+
+def _dispatch(topic: str, payload: str) -> None:
+    """Run local handlers for a topic"""
+    for handler in _handlers.get(topic, []):
+        try:
+            handler(payload)
+        except Exception as e:
+            logger.error(f"Error in invalidation handler for {topic}: {e}", exc_info=True)
+
+
+async def publish(topic: str, payload: str = "") -> None:
+    """Invalidate locally and notify other processes"""
+    _dispatch(topic, payload)
+    
+    redis = await get_optional_redis_client()
+    if redis is None:
+        return
+    
+    try:
+        message = json.dumps({"topic": topic, "payload": payload, "origin": _origin})
+        await redis.publish(REDIS_CHANNEL, message)
+    except Exception as e:
+        logger.warning(f"Could not publish invalidation for {topic}: {e}")
+
+
+async def _listen() -> None:
+    """Receive invalidation events from Redis, reconnecting on errors"""
+    global _connected
+    while True:
+        if await get_optional_redis_client() is None:
+            await asyncio.sleep(settings.REDIS_RETRY_INTERVAL)
+            continue
+        
+        # Own connection: any drop must end up in the reconnect branch below
+        redis = create_pubsub_client(HEALTH_CHECK_INTERVAL)
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(REDIS_CHANNEL)
+            _connected = True
+            logger.info("Listening for cache invalidation events")
+            # Events may have been missed while disconnected - drop everything
+            for topic in list(_handlers):
+                _dispatch(topic, "")
+            while True:
+                # Wakes up at least every interval to send the health check
+                message = await pubsub.get_message(timeout=HEALTH_CHECK_INTERVAL)
+                if message is None or message.get("type") != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                if event.get("origin") == _origin:
+                    continue
+                _dispatch(event.get("topic", ""), event.get("payload", ""))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Invalidation listener error, reconnecting: {e}")
+            await asyncio.sleep(settings.REDIS_RETRY_INTERVAL)
+        finally:
+            _connected = False
+            try:
+                await pubsub.close()
+                await redis.close()
+            except Exception:
+                pass
+
+
+async def start_listener() -> None:
+    """Start background listener (safe to call more than once)"""
+    global _listener_task
+    if _listener_task is not None and not _listener_task.done():
+        return
+    _listener_task = asyncio.create_task(_listen(), name="cache-invalidation")
+
+
+async def stop_listener() -> None:
+    """Stop background listener"""
+    global _listener_task
+    if _listener_task is None:
+        return
+    
+    task, _listener_task = _listener_task, None
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,32 @@
+"""
+Rate limiting for outgoing Telegram API calls
+
+RateLimiter spaces calls evenly instead of letting them burst, and can
+hold everything back for a flood wait reported by Telegram. Used by
+background jobs (reprocessing uploads, file size lookups) that share
+the bot's API quota with user traffic.
+"""
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Spaces calls evenly to at most per_minute per minute"""
+    
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / max(per_minute, 1)
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def wait(self) -> None:
+        """Wait for the next call slot"""
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def pause(self, seconds: float) -> None:
+        """Hold back all calls (Telegram flood wait)"""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
@@ -1,10 +1,12 @@
 """Redis client for FSM storage and caching"""
 from app.core.config import settings
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 _redis_client = None
+_redis_unavailable_until = 0.0  # monotonic time until which we don't retry connecting
 
 # Try to import Redis, but make it optional
 try:
@@ -53,6 +55,55 @@ async def get_redis_client():
     return _redis_client
 
 
+async def get_optional_redis_client():
+    """
+    Get Redis client, or None if Redis is not installed or unreachable
+    
+    Used by caches that can fall back to process memory. After a failed
+    connection attempt Redis is not retried for REDIS_RETRY_INTERVAL seconds,
+    so callers on hot paths don't pay the connect timeout on every call.
+    """
+    global _redis_client, _redis_unavailable_until
+    
+    if not REDIS_AVAILABLE:
+        return None
+    
+    if time.monotonic() < _redis_unavailable_until:
+        return None
+    
+    try:
+        return await get_redis_client()
+    except Exception as e:
+        # Drop the half-initialized client so the next attempt reconnects
+        _redis_client = None
+        _redis_unavailable_until = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+        logger.warning(f"Redis unavailable, using in-memory fallback for {settings.REDIS_RETRY_INTERVAL:.0f}s: {e}")
+        return None
+
+
+def create_pubsub_client(health_check_interval: int):
+    """
+    New Redis client for one long-lived pub/sub subscription
+    
+    Unlike the shared client it has no socket timeout and doesn't retry
+    on timeouts: an idle subscription would otherwise time out and be
+    silently re-subscribed, losing events published in between. Dead
+    connections are found by a PING every health_check_interval seconds
+    and raise ConnectionError instead. Caller closes the client.
+    """
+    if not REDIS_AVAILABLE:
+        raise ImportError("Redis package not installed. Install with: pip install redis aioredis")
+    return aioredis.from_url(
+        get_redis_url(),
+        encoding="utf-8",
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=None,
+        socket_keepalive=True,
+        health_check_interval=health_check_interval,
+    )
+
+
 async def close_redis():
     """Close Redis connection"""
     global _redis_client
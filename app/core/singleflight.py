@@ -0,0 +1,42 @@
+"""
+Single-flight execution
+
+Concurrent callers asking for the same key share one in-flight task
+instead of each doing the same expensive work.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls by key"""
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+    
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+    
+    def is_running(self, key: Hashable) -> bool:
+        """Whether work for key is currently in flight"""
+        return key in self._inflight
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run func() once per key at a time
+        
+        Returns:
+            (result, shared) - shared is True for callers that joined a task
+            started by someone else. Exceptions are raised to every caller.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        
+        # Shield so one caller being cancelled doesn't cancel the others
+        return await asyncio.shield(task), shared
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, BigInteger, Text, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, BigInteger, Text, Enum, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 import enum
@@ -59,6 +59,12 @@ class AdminLog(Base):
     # Relationships
     admin = relationship("AdminUser", back_populates="logs")
 
+    # Keyset pagination (see models/pagination.py)
+    __table_args__ = (
+        Index("ix_admin_logs_created_at_id", "created_at", "id"),
+        Index("ix_admin_logs_admin_id_created_at_id", "admin_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<AdminLog {self.action_type} by admin_id={self.admin_id}>"
 
@@ -83,6 +89,10 @@ class User(Base):
     downloads = relationship("Download", back_populates="user")
     saved_files = relationship("SavedList", back_populates="user")
 
+    __table_args__ = (
+        Index("ix_users_joined_at_id", "joined_at", "id"),
+    )
+
 class File(Base):
     __tablename__ = "files"
 
@@ -98,12 +108,28 @@ class File(Base):
     thumbnail_id = Column(String, nullable=True) # Telegram file_id for thumbnail
     processed_file_id = Column(String, nullable=True) # Pre-processed file with thumbnail and renamed
     file_size = Column(BigInteger, nullable=True)  # File size in bytes
+    search_key = Column(String, nullable=True)  # Normalized, transliterated title (see models/search_key.py)
     created_at = Column(DateTime, default=datetime.utcnow)
     downloads_count = Column(Integer, default=0)
 
     downloads = relationship("Download", back_populates="file")
     saved_in = relationship("SavedList", back_populates="file")
 
+    __table_args__ = (
+        Index("ix_files_created_at_id", "created_at", "id"),
+        Index("ix_files_file_type_created_at_id", "file_type", "created_at", "id"),
+        Index("ix_files_level_created_at_id", "level", "created_at", "id"),
+        Index("ix_files_search_key", "search_key", postgresql_ops={"search_key": "text_pattern_ops"}),
+    )
+
+class FileTag(Base):
+    """Normalized tag of a file (one row per tag, see app/models/tags.py)"""
+    __tablename__ = "file_tags"
+
+    # (tag, file_id) primary key doubles as the browse-by-tag index
+    tag = Column(String(64), primary_key=True)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), primary_key=True, index=True)
+
 class Download(Base):
     __tablename__ = "downloads"
 
@@ -115,6 +141,10 @@ class Download(Base):
     user = relationship("User", back_populates="downloads")
     file = relationship("File", back_populates="downloads")
 
+    __table_args__ = (
+        Index("ix_downloads_user_id_downloaded_at_id", "user_id", "downloaded_at", "id"),
+    )
+
 class SavedList(Base):
     __tablename__ = "saved_list"
 
@@ -125,3 +155,7 @@ class SavedList(Base):
 
     user = relationship("User", back_populates="saved_files")
     file = relationship("File", back_populates="saved_in")
+
+    __table_args__ = (
+        Index("ix_saved_list_user_id_saved_at_id", "user_id", "saved_at", "id"),
+    )
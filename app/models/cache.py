@@ -0,0 +1,309 @@
+"""
+Read-through caches for hot model data
+
+Snapshots are small immutable copies of ORM rows, safe to keep across
+sessions and share between concurrent updates.
+"""
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple
+from app.core import invalidation
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.permissions import resolve_permission_mask, mask_has_permission
+
+USER_TOPIC = "user"
+ADMIN_CONTACT_TOPIC = "admin_contact"
+FSUB_CHANNELS_TOPIC = "fsub_channels"
+FILE_TOPIC = "file"
+# Only files.file_size changed (payload: comma-separated file IDs)
+FILE_SIZE_TOPIC = "file_size"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Immutable view of the User fields needed on every update"""
+    id: int
+    telegram_id: int
+    language: str
+    is_blocked: bool
+    is_admin: bool
+    admin_permissions: Optional[str]
+    permissions_mask: int = 0  # Effective permissions, see models/permissions.py
+
+    @property
+    def has_admin_access(self) -> bool:
+        """Admin in database or primary admin (ADMIN_ID)"""
+        return self.is_admin or self.telegram_id == settings.ADMIN_ID
+
+    def has_permission(self, permission: str) -> bool:
+        """Check admin permission without parsing JSON"""
+        return mask_has_permission(self.permissions_mask, permission)
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        """Build snapshot from a User ORM instance"""
+        return cls(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            language=user.language or "uz",
+            is_blocked=bool(user.is_blocked),
+            is_admin=bool(user.is_admin),
+            admin_permissions=user.admin_permissions,
+            permissions_mask=resolve_permission_mask(
+                user.telegram_id, bool(user.is_admin), user.admin_permissions, settings.ADMIN_ID
+            ),
+        )
+
+
+# telegram_id -> UserSnapshot
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+
+def get_cached_user(telegram_id: int) -> Optional[UserSnapshot]:
+    """Get cached user snapshot by Telegram ID"""
+    return user_cache.get(telegram_id)
+
+
+def cache_user(user) -> UserSnapshot:
+    """Store a fresh snapshot of the given User and return it"""
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(snapshot.telegram_id, snapshot)
+    return snapshot
+
+
+# telegram_id -> True while a blocked user's notice is suppressed
+blocked_notice_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.BLOCKED_NOTICE_WINDOW)
+
+
+def invalidate_user(telegram_id: int) -> None:
+    """Drop cached snapshot (and blocked notice suppression) for a user"""
+    user_cache.pop(telegram_id)
+    blocked_notice_cache.pop(telegram_id)
+
+
+async def publish_user_change(telegram_id: int) -> None:
+    """Drop cached snapshot for a user in this and all other processes"""
+    await invalidation.publish(USER_TOPIC, str(telegram_id))
+
+
+def _on_user_invalidated(payload: str) -> None:
+    if not payload:
+        user_cache.clear()
+        blocked_notice_cache.clear()
+        return
+    try:
+        invalidate_user(int(payload))
+    except ValueError:
+        pass
+
+
+invalidation.subscribe(USER_TOPIC, _on_user_invalidated)
+
+
+# "contact" -> admin username shown in help / blocked messages
+_admin_contact_cache = TTLCache(maxsize=1, ttl=settings.ADMIN_CONTACT_CACHE_TTL)
+
+
+def get_cached_admin_contact() -> Optional[str]:
+    """Get cached admin contact string"""
+    return _admin_contact_cache.get("contact")
+
+
+def cache_admin_contact(contact: str) -> None:
+    """Cache admin contact string"""
+    _admin_contact_cache.set("contact", contact)
+
+
+def invalidate_admin_contact(payload: str = "") -> None:
+    """Drop cached admin contact"""
+    _admin_contact_cache.pop("contact")
+
+
+async def publish_admin_contact_change() -> None:
+    """Drop cached admin contact in this and all other processes"""
+    await invalidation.publish(ADMIN_CONTACT_TOPIC)
+
+
+invalidation.subscribe(ADMIN_CONTACT_TOPIC, invalidate_admin_contact)
+
+
+# "channels" -> (version, channels)
+_fsub_channels_cache = TTLCache(maxsize=1, ttl=settings.FSUB_CHANNELS_CACHE_TTL)
+
+
+def get_cached_fsub_channels() -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    """Get (version, channels) of the cached force subscribe list, or None"""
+    entry = _fsub_channels_cache.get("channels")
+    if entry is None:
+        return None
+    version, channels = entry
+    # Hand out copies so callers can't mutate the shared list
+    return version, [dict(channel) for channel in channels]
+
+
+def cache_fsub_channels(version: int, channels: List[Dict[str, Any]]) -> None:
+    """
+    Cache parsed force subscribe list
+    
+    While cross-process invalidation is active the copy is kept until a
+    newer version is announced; otherwise it expires after
+    FSUB_CHANNELS_CACHE_TTL so changes made by other processes show up.
+    """
+    ttl = None if invalidation.is_listening() else settings.FSUB_CHANNELS_CACHE_TTL
+    entry = (version, tuple(dict(channel) for channel in channels))
+    _fsub_channels_cache.set("channels", entry, ttl=ttl)
+
+
+def invalidate_fsub_channels(version: str = "") -> None:
+    """Drop cached force subscribe list unless it already has the given version"""
+    entry = _fsub_channels_cache.get("channels")
+    if entry is not None and version and str(entry[0]) == version:
+        return
+    _fsub_channels_cache.pop("channels")
+
+
+invalidation.subscribe(FSUB_CHANNELS_TOPIC, invalidate_fsub_channels)
+
+
+@dataclass(frozen=True)
+class FileSnapshot:
+    """Immutable view of the File fields used by search, download and saved-list handlers"""
+    id: int
+    file_id: str
+    file_name: Optional[str]
+    title: str
+    level: Optional[str]
+    description: Optional[str]
+    processed_file_id: Optional[str]
+    file_size: Optional[int]
+
+    @classmethod
+    def from_file(cls, file) -> "FileSnapshot":
+        """Build snapshot from a File ORM instance"""
+        return cls(
+            id=file.id,
+            file_id=file.file_id,
+            file_name=file.file_name,
+            title=file.title,
+            level=file.level,
+            description=file.description,
+            processed_file_id=file.processed_file_id,
+            file_size=file.file_size,
+        )
+
+
+# Cached "no such file" marker (deleted or never existing IDs)
+FILE_NOT_FOUND = object()
+
+# file ID -> FileSnapshot or FILE_NOT_FOUND
+file_cache = TTLCache(maxsize=settings.FILE_CACHE_SIZE, ttl=settings.FILE_CACHE_TTL)
+
+# Bumped on every invalidation, so a read that started before a change
+# doesn't put the old row back into the cache
+_file_generation = 0
+
+
+def file_cache_generation() -> int:
+    """Current invalidation generation (pass to cache_file)"""
+    return _file_generation
+
+
+def get_cached_file(file_id: int) -> Any:
+    """Get cached FileSnapshot, FILE_NOT_FOUND, or None if not cached"""
+    return file_cache.get(file_id)
+
+
+def cache_file(file_id: int, file, generation: int) -> Optional[FileSnapshot]:
+    """
+    Cache a snapshot of the given File (or a short-lived miss if None)
+    
+    Nothing is stored if the file cache was invalidated since generation.
+    """
+    snapshot = FileSnapshot.from_file(file) if file is not None else None
+    if generation == _file_generation:
+        if snapshot is not None:
+            file_cache.set(file_id, snapshot)
+        else:
+            file_cache.set(file_id, FILE_NOT_FOUND, ttl=settings.FILE_NEGATIVE_CACHE_TTL)
+    return snapshot
+
+
+@dataclass(frozen=True)
+class FacetCounts:
+    """Number of files per tag and per level, most files first"""
+    tags: Tuple[Tuple[str, int], ...]
+    levels: Tuple[Tuple[str, int], ...]
+
+
+# Level filter of the tag counts ("" = all files) -> FacetCounts
+facet_cache = TTLCache(maxsize=256, ttl=settings.FACET_CACHE_TTL)
+
+
+def get_cached_facets(level: Optional[str] = None) -> Optional[FacetCounts]:
+    """Get cached facet counts, or None if not cached"""
+    return facet_cache.get(level or "")
+
+
+def cache_facets(level: Optional[str], facets: FacetCounts, generation: int) -> None:
+    """Cache facet counts unless any file changed since generation"""
+    if generation == _file_generation:
+        facet_cache.set(level or "", facets)
+
+
+def invalidate_file(file_id: Optional[int] = None) -> None:
+    """Drop cached snapshot for a file (all files if file_id is None)"""
+    global _file_generation
+    _file_generation += 1
+    if file_id is None:
+        file_cache.clear()
+    else:
+        file_cache.pop(file_id)
+    # Any change can move counts between tags and levels
+    facet_cache.clear()
+
+
+async def publish_file_change(file_id: int) -> None:
+    """Drop cached snapshot for a file in this and all other processes"""
+    await invalidation.publish(FILE_TOPIC, str(file_id))
+
+
+async def publish_file_sizes_change(file_ids: List[int]) -> None:
+    """Drop cached snapshots of files whose size was stored, with one event"""
+    if file_ids:
+        await invalidation.publish(FILE_SIZE_TOPIC, ",".join(str(file_id) for file_id in file_ids))
+
+
+def parse_file_ids(payload: str) -> List[int]:
+    """File IDs of a comma-separated event payload (invalid entries skipped)"""
+    file_ids = []
+    for part in payload.split(","):
+        try:
+            file_ids.append(int(part))
+        except ValueError:
+            pass
+    return file_ids
+
+
+def _on_file_sizes_changed(payload: str) -> None:
+    # Sizes don't move facet counts, so only the snapshots are dropped
+    global _file_generation
+    _file_generation += 1
+    if not payload:
+        file_cache.clear()
+        return
+    for file_id in parse_file_ids(payload):
+        file_cache.pop(file_id)
+
+
+def _on_file_invalidated(payload: str) -> None:
+    if not payload:
+        invalidate_file()
+        return
+    try:
+        invalidate_file(int(payload))
+    except ValueError:
+        pass
+
+
+invalidation.subscribe(FILE_TOPIC, _on_file_invalidated)
+invalidation.subscribe(FILE_SIZE_TOPIC, _on_file_sizes_changed)
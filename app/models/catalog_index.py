@@ -0,0 +1,278 @@
+"""
+In-process inverted index for bot search
+
+Optional (SEARCH_MEMORY_INDEX_ENABLED). Title and tag tokens of the whole
+catalog are kept in memory, so /search is answered without a database
+round trip:
+
+    - loaded once on bot startup (load())
+    - kept current by file change events, which create_file, update_file
+      and delete_file publish on the invalidation bus - locally and, with
+      Redis, to other processes (admin panel uploads and edits)
+    - reloaded when older than SEARCH_MEMORY_INDEX_MAX_AGE while events
+      from other processes aren't received (no Redis), so admin panel
+      changes show up after at most that long
+
+Changed files are re-read by a background task, so searches never wait on
+the database. Queries with no match here fall back to search_files()
+(full-text and fuzzy matching in the database).
+
+Tokens are words of the search key (search_key(): lowercase, Latin
+script, no apostrophes), so Latin and Cyrillic spellings match each
+other; query words are prefix-matched and AND-ed. Results rank title
+matches over tag matches, newest first within the same score.
+"""
+import asyncio
+import logging
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import select
+from app.core import invalidation
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.base import File
+from app.models.cache import FILE_TOPIC, FILE_SIZE_TOPIC, parse_file_ids
+from app.models.search import TITLE_WEIGHT, TAGS_WEIGHT, query_terms
+from app.models.search_key import search_key
+
+logger = logging.getLogger(__name__)
+
+# Columns needed to index a file and render it in search results
+INDEXED_COLUMNS = (File.id, File.file_id, File.title, File.tags, File.file_type, File.file_size, File.created_at)
+
+
+@dataclass(frozen=True, slots=True)
+class IndexedFile:
+    """File fields shown in search results"""
+    id: int
+    file_id: str
+    title: str
+    file_type: Optional[str]
+    file_size: Optional[int]
+    created_at: float  # Unix timestamp, for ordering
+
+
+def _tokens(value: Optional[str]) -> Tuple[str, ...]:
+    """Distinct normalized tokens of a title or tag string"""
+    return tuple(dict.fromkeys(query_terms(search_key(value), limit=None)))
+
+
+class CatalogIndex:
+    """Token -> file IDs postings over titles and tags, with prefix lookup"""
+    
+    def __init__(self):
+        self._files: Dict[int, IndexedFile] = {}
+        # File ID -> (title tokens, tag tokens), for scoring and removal
+        self._tokens: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        # Sorted tokens for prefix ranges; rebuilt lazily after changes
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._loaded = False
+        self._loaded_at = 0.0
+        # File IDs changed since the last refresh (empty payload -> reload all)
+        self._dirty: Set[int] = set()
+        self._reload_all = False
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._files)
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+    
+    def add(self, row) -> None:
+        """Index or re-index a file (row with INDEXED_COLUMNS)"""
+        file_id, telegram_file_id, title, tags, file_type, file_size, created_at = row
+        self.remove(file_id)
+        
+        self._files[file_id] = IndexedFile(
+            id=file_id,
+            file_id=telegram_file_id,
+            title=title,
+            file_type=file_type,
+            file_size=file_size,
+            created_at=created_at.timestamp() if created_at else 0.0,
+        )
+        title_tokens, tag_tokens = _tokens(title), _tokens(tags)
+        self._tokens[file_id] = (title_tokens, tag_tokens)
+        for token in set(title_tokens + tag_tokens):
+            posting = self._postings.get(token)
+            if posting is None:
+                self._postings[token] = posting = set()
+                self._vocabulary_dirty = True
+            posting.add(file_id)
+    
+    def remove(self, file_id: int) -> None:
+        """Drop a file from the index"""
+        self._files.pop(file_id, None)
+        title_tokens, tag_tokens = self._tokens.pop(file_id, ((), ()))
+        for token in set(title_tokens + tag_tokens):
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.discard(file_id)
+                if not posting:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+    
+    async def load(self) -> None:
+        """Read the whole catalog (call on startup)"""
+        self._dirty.clear()
+        self._reload_all = False
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(*INDEXED_COLUMNS))).all()
+        
+        self._files, self._tokens, self._postings = {}, {}, {}
+        self._vocabulary_dirty = True
+        for row in rows:
+            self.add(row)
+        self._loaded = True
+        self._loaded_at = time.monotonic()
+        
+        usage = self.memory_usage()
+        logger.info(
+            f"Loaded catalog search index: {usage['files']} files, {usage['tokens']} tokens, "
+            f"{usage['bytes'] / 1024 / 1024:.1f} MB "
+            f"({usage['bytes_per_10k_files'] / 1024 / 1024:.1f} MB per 10k files)"
+        )
+    
+    def mark_dirty(self, payload: str = "") -> None:
+        """File change event: re-read the files (comma-separated IDs, or everything) in the background"""
+        if not self._loaded:
+            return
+        if not payload:
+            self._reload_all = True
+        else:
+            file_ids = parse_file_ids(payload)
+            if not file_ids:
+                return
+            self._dirty.update(file_ids)
+        
+        if self._refresh_task is None or self._refresh_task.done():
+            try:
+                self._refresh_task = asyncio.get_running_loop().create_task(
+                    self._refresh(), name="catalog-index-refresh"
+                )
+            except RuntimeError:
+                # No event loop (sync context) - picked up by the next event
+                pass
+    
+    def _reload_if_stale(self) -> None:
+        """Reload in the background past max age, unless other processes' changes are received"""
+        if not self._loaded or invalidation.is_listening():
+            return
+        if time.monotonic() - self._loaded_at < settings.SEARCH_MEMORY_INDEX_MAX_AGE:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self.mark_dirty()
+    
+    async def _refresh(self) -> None:
+        # Changes arriving while we read are handled in the next round
+        while self._reload_all or self._dirty:
+            try:
+                if self._reload_all:
+                    await self.load()
+                    continue
+                
+                dirty, self._dirty = self._dirty, set()
+                async with AsyncSessionLocal() as db:
+                    rows = {row[0]: row for row in (await db.execute(
+                        select(*INDEXED_COLUMNS).where(File.id.in_(dirty))
+                    )).all()}
+                for file_id in dirty:
+                    if file_id in rows:
+                        self.add(rows[file_id])
+                    else:
+                        self.remove(file_id)
+            except Exception as e:
+                logger.error(f"Could not refresh catalog search index: {e}", exc_info=True)
+                # Serve stale entries until a full reload on the next event
+                self._reload_all = True
+                return
+    
+    def _prefix_matches(self, term: str) -> Set[int]:
+        """IDs of files with a token starting with term"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        
+        vocabulary = self._vocabulary
+        matches: Set[int] = set()
+        index = bisect_left(vocabulary, term)
+        while index < len(vocabulary) and vocabulary[index].startswith(term):
+            matches |= self._postings[vocabulary[index]]
+            index += 1
+        return matches
+    
+    def search(self, query: str, file_type: Optional[str] = None, limit: int = 100) -> List[IndexedFile]:
+        """
+        Find files whose titles or tags contain every query word (as a prefix)
+        
+        Returns:
+            Matching files, best first
+        """
+        self._reload_if_stale()
+        terms = list(dict.fromkeys(query_terms(search_key(query))))
+        if not terms:
+            return []
+        
+        # Intersect rarest-first to keep sets small
+        candidates: Optional[Set[int]] = None
+        for matches in sorted((self._prefix_matches(term) for term in terms), key=len):
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+        
+        scored = []
+        for file_id in candidates:
+            file = self._files[file_id]
+            if file_type and file.file_type != file_type:
+                continue
+            title_tokens, tag_tokens = self._tokens[file_id]
+            score = 0.0
+            for term in terms:
+                if any(token.startswith(term) for token in title_tokens):
+                    score += TITLE_WEIGHT
+                else:
+                    score += TAGS_WEIGHT
+            scored.append((score, file.created_at, file_id))
+        
+        scored.sort(reverse=True)
+        return [self._files[file_id] for _, _, file_id in scored[:limit]]
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Approximate memory held by the index
+        
+        Counts containers, tokens, strings and result records (shared
+        small ints and interned strings are over-counted slightly).
+        """
+        size = sys.getsizeof
+        total = size(self._files) + size(self._tokens) + size(self._postings) + size(self._vocabulary)
+        
+        for file in self._files.values():
+            total += size(file) + size(file.title) + size(file.file_id) + size(file.created_at)
+            if file.file_size is not None:
+                total += size(file.file_size)
+        for title_tokens, tag_tokens in self._tokens.values():
+            total += size(title_tokens) + size(tag_tokens)
+        for token, posting in self._postings.items():
+            total += size(token) + size(posting)
+        
+        files = len(self._files)
+        return {
+            "files": files,
+            "tokens": len(self._postings),
+            "bytes": total,
+            "bytes_per_10k_files": round(total * 10000 / files) if files else 0,
+        }
+
+
+catalog_index = CatalogIndex()
+invalidation.subscribe(FILE_TOPIC, catalog_index.mark_dirty)
+# Sizes are shown in results; re-reading only touches the listed files
+invalidation.subscribe(FILE_SIZE_TOPIC, catalog_index.mark_dirty)
@@ -1,10 +1,22 @@
-from typing import Optional, List, Dict, Any
-from sqlalchemy import select, func, desc, or_, and_, text, cast, Date, String
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import select, func, desc, or_, and_, text, cast, Date, String, insert, update, case
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
-from app.models.base import User, File, Download, SavedList, AdminUser, AdminLog, AdminRole
+from app.models.base import User, File, FileTag, Download, SavedList, AdminUser, AdminLog, AdminRole
 from app.models.settings import Settings
+from app.models.cache import (
+    UserSnapshot, get_cached_user, cache_user, publish_user_change,
+    get_cached_admin_contact, cache_admin_contact, publish_admin_contact_change,
+    FSUB_CHANNELS_TOPIC, get_cached_fsub_channels, cache_fsub_channels,
+    FileSnapshot, FILE_NOT_FOUND, get_cached_file, cache_file, file_cache_generation,
+    publish_file_change, publish_file_sizes_change, FacetCounts, get_cached_facets, cache_facets
+)
+from app.models.pagination import Page, paginate, encode_cursor, decode_cursor
+from app.models.tags import normalize_tags, sync_file_tags
+from app.models.search_key import search_key, search_key_match
+from app.core import invalidation
+from app.core.counters import download_counter
 import json
 
 try:
@@ -125,6 +137,27 @@ async def get_admin_logs(
     return result.scalars().all()
 
 
+async def get_admin_logs_page(
+    db: AsyncSession,
+    cursor: str = None,
+    limit: int = 100,
+    admin_id: int = None,
+    action_type: str = None,
+    backward: bool = False
+) -> Page:
+    """Get admin logs newest first, continuing after cursor (keyset variant of get_admin_logs)"""
+    query = select(AdminLog)
+    
+    if admin_id:
+        query = query.where(AdminLog.admin_id == admin_id)
+    
+    if action_type:
+        query = query.where(AdminLog.action_type == action_type)
+    
+    keys = [(AdminLog.created_at, True), (AdminLog.id, True)]
+    return await paginate(db, query, keys, cursor=cursor, limit=limit, backward=backward)
+
+
 async def get_admin_logs_count(db: AsyncSession) -> int:
     """Get total count of admin logs"""
     result = await db.execute(select(func.count(AdminLog.id)))
@@ -138,6 +171,18 @@ async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optiona
     return result.scalar_one_or_none()
 
 
+async def get_user_snapshot(db: AsyncSession, telegram_id: int) -> Optional[UserSnapshot]:
+    """Get cached user snapshot by Telegram ID, reading through to the database on miss"""
+    snapshot = get_cached_user(telegram_id)
+    if snapshot is not None:
+        return snapshot
+    
+    user = await get_user_by_telegram_id(db, telegram_id)
+    if not user:
+        return None
+    return cache_user(user)
+
+
 async def create_user(db: AsyncSession, telegram_id: int, username: str = None, 
                      full_name: str = None, language: str = "uz") -> User:
     """Create new user"""
@@ -150,6 +195,12 @@ async def create_user(db: AsyncSession, telegram_id: int, username: str = None,
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    cache_user(user)
+    
+    # Primary admin's username may become the admin contact
+    from app.core.config import settings as app_settings
+    if telegram_id == app_settings.ADMIN_ID:
+        await publish_admin_contact_change()
     return user
 
 
@@ -160,6 +211,7 @@ async def update_user_language(db: AsyncSession, user_id: int, language: str) ->
     user.language = language
     await db.commit()
     await db.refresh(user)
+    await publish_user_change(user.telegram_id)
     return user
 
 
@@ -190,6 +242,70 @@ async def get_all_users(db: AsyncSession, skip: int = 0, limit: int = 50,
     return result.scalars().all()
 
 
+async def get_all_users_page(db: AsyncSession, cursor: str = None, limit: int = 50,
+                             blocked_only: bool = False, primary_admin_id: int = None) -> Page:
+    """
+    Get users in get_all_users order (admins first, then newest), continuing after cursor
+    
+    Admins are few and ordered in memory; regular users are paged by
+    (joined_at, id) so deep pages use the index instead of OFFSET.
+    """
+    query = select(User)
+    if blocked_only:
+        query = query.where(User.is_blocked == True)
+    
+    # Same groups as get_all_users: 0 primary admin, 1 other admins, 2 regular users
+    priority = case(
+        (User.telegram_id == primary_admin_id, 0),
+        (User.is_admin == True, 1),
+        else_=2
+    ) if primary_admin_id else case((User.is_admin == True, 1), else_=2)
+    is_regular = User.is_admin.isnot(True)
+    if primary_admin_id:
+        is_regular = and_(is_regular, User.telegram_id != primary_admin_id)
+    
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None and len(after) != 3:
+        raise ValueError("Invalid cursor: wrong number of sort keys")
+    
+    page = Page()
+    last_key = None
+    if after is None or after[0] < 2:
+        rows = (await db.execute(
+            query.where(~is_regular).add_columns(priority, User.joined_at, User.id)
+            .order_by(priority, desc(User.joined_at), desc(User.id))
+        )).all()
+        if after is not None:
+            after_key = (after[1] or datetime.min, after[2])
+            rows = [
+                row for row in rows
+                if row[1] > after[0] or (row[1] == after[0] and (row[2] or datetime.min, row[3]) < after_key)
+            ]
+        for row in rows[:limit]:
+            page.items.append(row[0])
+            last_key = list(row[1:])
+        if len(rows) > limit:
+            page.next_cursor = encode_cursor(last_key)
+            return page
+    
+    remaining = limit - len(page.items)
+    regular_cursor = encode_cursor(after[1:]) if after is not None and after[0] == 2 else None
+    if remaining <= 0:
+        # Page filled by admins; continue with regular users if there are any
+        if (await db.execute(query.where(is_regular).limit(1))).first():
+            page.next_cursor = encode_cursor(last_key)
+        return page
+    
+    regular = await paginate(
+        db, query.where(is_regular), [(User.joined_at, True), (User.id, True)],
+        cursor=regular_cursor, limit=remaining
+    )
+    page.items.extend(regular.items)
+    if regular.next_cursor:
+        page.next_cursor = encode_cursor([2] + decode_cursor(regular.next_cursor))
+    return page
+
+
 async def search_users(db: AsyncSession, query: str, skip: int = 0, limit: int = 50) -> List[User]:
     """Search users by username, full name, or telegram_id"""
     search_filter = or_(
@@ -232,6 +348,7 @@ async def block_user(db: AsyncSession, user_id: int) -> User:
     user.blocked_at = datetime.utcnow()  # Set blocked timestamp
     await db.commit()
     await db.refresh(user)
+    await publish_user_change(user.telegram_id)
     return user
 
 
@@ -243,6 +360,7 @@ async def unblock_user(db: AsyncSession, user_id: int) -> User:
     user.blocked_at = None  # Clear blocked timestamp
     await db.commit()
     await db.refresh(user)
+    await publish_user_change(user.telegram_id)
     return user
 
 
@@ -276,6 +394,8 @@ async def toggle_admin_status(db: AsyncSession, user_id: int, is_admin: bool,
     
     await db.commit()
     await db.refresh(user)
+    await publish_user_change(user.telegram_id)
+    await publish_admin_contact_change()
     return user
 
 
@@ -332,6 +452,7 @@ async def update_file_processed_id(db: AsyncSession, file_id: int, processed_fil
         file.processed_file_id = processed_file_id
         await db.commit()
         await db.refresh(file)
+        await publish_file_change(file_id)
     return file
 
 
@@ -353,11 +474,16 @@ async def create_file(db: AsyncSession, file_id: str, title: str,
         thumbnail_id=thumbnail_id,
         file_name=file_name,
         processed_file_id=processed_file_id,
-        file_size=file_size
+        file_size=file_size,
+        search_key=search_key(title)
     )
     db.add(db_file)
+    await db.flush()
+    await sync_file_tags(db, db_file.id, tags)
     await db.commit()
     await db.refresh(db_file)
+    # The new ID may be cached as missing
+    await publish_file_change(db_file.id)
     return db_file
 
 
@@ -367,25 +493,206 @@ async def get_file_by_id(db: AsyncSession, file_id: int) -> Optional[File]:
     return result.scalar_one_or_none()
 
 
+async def get_file_snapshot(db: AsyncSession, file_id: int) -> Optional[FileSnapshot]:
+    """Get cached file snapshot by ID, reading through to the database on miss"""
+    cached = get_cached_file(file_id)
+    if cached is FILE_NOT_FOUND:
+        return None
+    if cached is not None:
+        return cached
+    
+    generation = file_cache_generation()
+    file = await get_file_by_id(db, file_id)
+    return cache_file(file_id, file, generation)
+
+
 async def get_file_by_telegram_file_id(db: AsyncSession, telegram_file_id: str) -> Optional[File]:
     """Get file by Telegram file_id"""
     result = await db.execute(select(File).where(File.file_id == telegram_file_id))
     return result.scalar_one_or_none()
 
 
+async def get_files_by_ids(db: AsyncSession, file_ids: List[int]) -> List[File]:
+    """Get files by ID in the given order, skipping deleted ones"""
+    if not file_ids:
+        return []
+    result = await db.execute(select(File).where(File.id.in_(file_ids)))
+    rows = {f.id: f for f in result.scalars().all()}
+    return [rows[file_id] for file_id in file_ids if file_id in rows]
+
+
+async def _search_match(db: AsyncSession, search_query, query: str) -> Optional[tuple]:
+    """
+    Restrict search_query to files matching query, with their sort keys
+    
+    One query covers full-text matches (ranked by relevance) and search
+    key matches (see models/search_key.py), the latter ranked after all
+    full-text matches. Without a full-text index, search key matches are
+    newest first.
+    
+    Returns:
+        (statement, keys) for paginate, or None if the query can't match
+    """
+    from app.models.search import is_search_index_available, fulltext_match
+    
+    key = search_key(query)
+    key_match = search_key_match(db.bind.dialect.name, key) if key else None
+    
+    if await is_search_index_available(db):
+        match = fulltext_match(search_query, db.bind.dialect.name, query, also=key_match)
+        if match is not None:
+            matched, score = match
+            return matched, [(score, True), (File.id, True)]
+    
+    if key_match is not None:
+        return search_query.where(key_match), [(File.created_at, True), (File.id, True)]
+    return None
+
+
 async def search_files(db: AsyncSession, query: str, file_type: str = None,
                       skip: int = 0, limit: int = 5) -> List[File]:
-    """Search files by title (case-insensitive)"""
-    conditions = [File.title.ilike(f"%{query}%")]
+    """
+    Search files by title, tags and description, most relevant first
     
+    Uses the full-text index (see models/search.py) together with the
+    search key, so titles written in the other script or with other
+    apostrophes are found too (see models/search_key.py). When nothing
+    matches, titles similar to the query are returned (typo-tolerant
+    trigram search).
+    """
+    search_query = select(File)
     if file_type:
-        conditions.append(File.file_type == file_type)
-        
-    search_query = select(File).where(and_(*conditions))\
-        .offset(skip).limit(limit).order_by(desc(File.created_at))
+        search_query = search_query.where(File.file_type == file_type)
     
-    result = await db.execute(search_query)
-    return result.scalars().all()
+    match = await _search_match(db, search_query, query)
+    if match is not None:
+        matched, keys = match
+        ranked = matched.order_by(*(column.desc() for column, _ in keys))
+        result = await db.execute(ranked.offset(skip).limit(limit))
+        files = result.scalars().all()
+        if files or (skip and (await db.execute(matched.limit(1))).first()):
+            return files
+    
+    return await _fuzzy_search_files(db, search_query, query, skip, limit, filtered=bool(file_type))
+
+
+async def _fuzzy_search_files(db: AsyncSession, search_query, query: str,
+                              skip: int, limit: int, filtered: bool) -> List[File]:
+    """Trigram title search, most similar first"""
+    from app.models.search import fuzzy_search_ids, apply_trigram_search
+    from app.core.config import settings as app_settings
+    
+    ids = await fuzzy_search_ids(db, query, app_settings.SEARCH_FUZZY_MAX_RESULTS)
+    if ids is None:
+        return []
+    
+    if db.bind.dialect.name == "postgresql":
+        fuzzy_query = await apply_trigram_search(db, search_query, query)
+        result = await db.execute(fuzzy_query.order_by(desc(File.created_at)).offset(skip).limit(limit))
+        return result.scalars().all()
+    
+    # In-process index ranks IDs; load only the rows needed (all, if filtering by type)
+    if not filtered:
+        ids, skip = ids[skip:skip + limit], 0
+    if not ids:
+        return []
+    result = await db.execute(search_query.where(File.id.in_(ids)))
+    rows = {f.id: f for f in result.scalars().all()}
+    return [rows[file_id] for file_id in ids if file_id in rows][skip:skip + limit]
+
+
+async def search_file_ids(db: AsyncSession, query: str, file_type: str = None,
+                          limit: int = 1000) -> List[int]:
+    """IDs of the files search_files finds, in the same order, without loading the rows"""
+    from app.models.search import fuzzy_search_ids, apply_trigram_search
+    from app.core.config import settings as app_settings
+    
+    search_query = select(File.id)
+    if file_type:
+        search_query = search_query.where(File.file_type == file_type)
+    
+    match = await _search_match(db, search_query, query)
+    if match is not None:
+        matched, keys = match
+        result = await db.execute(matched.order_by(*(column.desc() for column, _ in keys)).limit(limit))
+        file_ids = result.scalars().all()
+        if file_ids:
+            return file_ids
+    
+    # Similar titles
+    fuzzy_ids = await fuzzy_search_ids(db, query, app_settings.SEARCH_FUZZY_MAX_RESULTS)
+    if fuzzy_ids is None:
+        return []
+    if db.bind.dialect.name == "postgresql":
+        fuzzy_query = await apply_trigram_search(db, search_query, query)
+        result = await db.execute(fuzzy_query.order_by(desc(File.created_at)).limit(limit))
+        return result.scalars().all()
+    if file_type and fuzzy_ids:
+        result = await db.execute(search_query.where(File.id.in_(fuzzy_ids)))
+        kept = set(result.scalars().all())
+        fuzzy_ids = [file_id for file_id in fuzzy_ids if file_id in kept]
+    return fuzzy_ids[:limit]
+
+
+async def search_files_page(db: AsyncSession, query: str, file_type: str = None,
+                            cursor: str = None, limit: int = 5) -> Page:
+    """
+    Search files like search_files, continuing after cursor
+    
+    Pages are ordered by relevance, then newest ID first (keyset on
+    (score, id)). Falls back to similar titles when nothing matches.
+    """
+    search_query = select(File)
+    if file_type:
+        search_query = search_query.where(File.file_type == file_type)
+    
+    match = await _search_match(db, search_query, query)
+    if match is not None:
+        matched, keys = match
+        # Later pages stay on the matches if there are any
+        if not cursor or (await db.execute(matched.limit(1))).first():
+            page = await paginate(db, matched, keys, cursor=cursor, limit=limit)
+            if page.items or cursor:
+                return page
+    
+    return await _fuzzy_search_files_page(db, search_query, query, cursor, limit)
+
+
+async def _fuzzy_search_files_page(db: AsyncSession, search_query, query: str,
+                                   cursor: Optional[str], limit: int) -> Page:
+    """Trigram title search, most similar first, continuing after cursor"""
+    from app.models.search import fuzzy_search_scores, trigram_match
+    from app.core.config import settings as app_settings
+    
+    scores = await fuzzy_search_scores(db, query, app_settings.SEARCH_FUZZY_MAX_RESULTS)
+    if scores is None:
+        return Page()
+    
+    if db.bind.dialect.name == "postgresql":
+        matched, similarity = await trigram_match(db, search_query, query)
+        return await paginate(db, matched, [(similarity, True), (File.id, True)], cursor=cursor, limit=limit)
+    
+    # In-process index: apply the keyset to (score, id) in memory, load only page rows
+    ranked = sorted(((score, file_id) for file_id, score in scores), reverse=True)
+    if cursor:
+        after = tuple(decode_cursor(cursor))
+        ranked = [key for key in ranked if key < after]
+    
+    items, last_key = [], None
+    while ranked and len(items) < limit:
+        # Rows filtered out by file type are skipped, so read until the page is full
+        chunk, ranked = ranked[:limit], ranked[limit:]
+        result = await db.execute(search_query.where(File.id.in_([file_id for _, file_id in chunk])))
+        rows = {f.id: f for f in result.scalars().all()}
+        for position, key in enumerate(chunk):
+            if len(items) == limit:
+                ranked = chunk[position:] + ranked
+                break
+            if key[1] in rows:
+                items.append(rows[key[1]])
+                last_key = key
+    
+    return Page(items=items, next_cursor=encode_cursor(last_key) if ranked and last_key else None)
 
 
 async def get_all_files(db: AsyncSession, file_type: str = None,
@@ -401,6 +708,30 @@ async def get_all_files(db: AsyncSession, file_type: str = None,
     return result.scalars().all()
 
 
+async def get_all_files_page(db: AsyncSession, file_type: str = None, cursor: str = None,
+                             limit: int = 50, backward: bool = False,
+                             tag: str = None, level: str = None) -> Page:
+    """
+    Get files newest first, continuing after cursor (keyset variant of get_all_files)
+    
+    Args:
+        tag: Only files with this tag (matched normalized, through file_tags)
+        level: Only files with exactly this level
+    """
+    query = select(File)
+    
+    if file_type:
+        query = query.where(File.file_type == file_type)
+    if tag:
+        tag = next(iter(normalize_tags(tag)), "")
+        query = query.where(File.id.in_(select(FileTag.file_id).where(FileTag.tag == tag)))
+    if level:
+        query = query.where(File.level == level)
+    
+    keys = [(File.created_at, True), (File.id, True)]
+    return await paginate(db, query, keys, cursor=cursor, limit=limit, backward=backward)
+
+
 async def get_files_count(db: AsyncSession, file_type: str = None) -> int:
     """Get total files count"""
     query = select(func.count(File.id))
@@ -410,6 +741,101 @@ async def get_files_count(db: AsyncSession, file_type: str = None) -> int:
     return result.scalar()
 
 
+async def get_facet_counts(db: AsyncSession, level: str = None) -> FacetCounts:
+    """
+    Count files per tag and per level, most files first
+    
+    Args:
+        level: Count only tags of files with this level (level counts are always over all files)
+    
+    Cached until any file changes (here or in another process).
+    """
+    cached = get_cached_facets(level)
+    if cached is not None:
+        return cached
+    
+    generation = file_cache_generation()
+    
+    files = func.count(FileTag.file_id)
+    tags_query = select(FileTag.tag, files).group_by(FileTag.tag).order_by(desc(files), FileTag.tag)
+    if level:
+        tags_query = tags_query.join(File, File.id == FileTag.file_id).where(File.level == level)
+    
+    level_files = func.count(File.id)
+    levels_query = (
+        select(File.level, level_files)
+        .where(File.level.isnot(None), File.level != "")
+        .group_by(File.level)
+        .order_by(desc(level_files), File.level)
+    )
+    
+    facets = FacetCounts(
+        tags=tuple((tag, count) for tag, count in (await db.execute(tags_query)).all()),
+        levels=tuple((name, count) for name, count in (await db.execute(levels_query)).all()),
+    )
+    cache_facets(level, facets, generation)
+    return facets
+
+
+def _reprocess_query(query, after_id: int, only_missing: bool):
+    query = query.where(File.id > after_id)
+    if only_missing:
+        query = query.where(File.processed_file_id.is_(None))
+    return query
+
+
+async def get_files_to_reprocess(db: AsyncSession, after_id: int = 0, limit: int = 50,
+                                 only_missing: bool = True) -> List[Tuple[int, str, Optional[str], str]]:
+    """
+    Get next batch of files for reprocessing, ordered by ID (keyset pagination)
+    
+    Args:
+        after_id: Only files with a greater ID (checkpoint)
+        limit: Batch size
+        only_missing: Only files without processed_file_id
+    
+    Returns:
+        List of (id, file_id, file_name, title) tuples
+    """
+    query = _reprocess_query(
+        select(File.id, File.file_id, File.file_name, File.title), after_id, only_missing
+    ).order_by(File.id).limit(limit)
+    result = await db.execute(query)
+    return [tuple(row) for row in result.all()]
+
+
+async def count_files_to_reprocess(db: AsyncSession, after_id: int = 0,
+                                   only_missing: bool = True) -> int:
+    """Count files get_files_to_reprocess would return after the checkpoint"""
+    result = await db.execute(_reprocess_query(select(func.count(File.id)), after_id, only_missing))
+    return result.scalar()
+
+
+async def get_files_missing_size(db: AsyncSession, after_id: int = 0,
+                                 limit: int = 100) -> List[Tuple[int, str]]:
+    """Get next batch of files without file_size as (id, file_id), ordered by ID"""
+    result = await db.execute(
+        select(File.id, File.file_id)
+        .where(File.file_size.is_(None), File.id > after_id)
+        .order_by(File.id).limit(limit)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def set_file_sizes(db: AsyncSession, sizes: Dict[int, int]) -> None:
+    """Store {file_id: size_bytes} with one grouped UPDATE"""
+    if not sizes:
+        return
+    await db.execute(
+        update(File)
+        .where(File.id.in_(list(sizes)))
+        .values(file_size=case(sizes, value=File.id))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await publish_file_sizes_change(list(sizes))
+
+
 async def delete_file(db: AsyncSession, file_id: int) -> bool:
     """
     Delete file from database
@@ -428,8 +854,11 @@ async def delete_file(db: AsyncSession, file_id: int) -> bool:
     
     # Delete the file using SQLAlchemy delete statement
     # This will NOT cascade delete downloads (foreign key constraint allows NULL or we keep them)
+    # Tags are removed explicitly (SQLite doesn't enforce the cascade)
+    await db.execute(delete(FileTag).where(FileTag.file_id == file_id))
     await db.execute(delete(File).where(File.id == file_id))
     await db.commit()
+    await publish_file_change(file_id)
     
     return True
 
@@ -442,18 +871,19 @@ async def update_file(db: AsyncSession, file_id: int, **kwargs) -> Optional[File
         for key, value in kwargs.items():
             if hasattr(file, key):
                 setattr(file, key, value)
+        if "title" in kwargs:
+            file.search_key = search_key(file.title)
+        if "tags" in kwargs:
+            await sync_file_tags(db, file_id, file.tags)
         await db.commit()
         await db.refresh(file)
+        await publish_file_change(file_id)
     return file
 
 
 async def increment_download_count(db: AsyncSession, file_id: int) -> None:
-    """Increment file download count"""
-    result = await db.execute(select(File).where(File.id == file_id))
-    file = result.scalar_one_or_none()
-    if file:
-        file.downloads_count += 1
-        await db.commit()
+    """Increment file download count (hot counter, reconciled into files later)"""
+    await download_counter.incr_many({file_id: 1})
 
 
 # ==================== DOWNLOAD CRUD ====================
@@ -504,6 +934,84 @@ async def create_download(db: AsyncSession, user_id: int, file_id: int) -> Downl
             raise
 
 
+async def record_downloads_bulk(db: AsyncSession,
+                                events: List[Tuple[int, int, datetime]]) -> None:
+    """
+    Record a batch of downloads with one multi-row INSERT into downloads
+    
+    files.downloads_count is not touched here - increments go through the
+    hot counter and are written by apply_download_counts. Events for files
+    deleted in the meantime are dropped on retry.
+    
+    Args:
+        events: (user_id, file_id, downloaded_at) tuples
+    """
+    if not events:
+        return
+    
+    async def _write(batch: List[Tuple[int, int, datetime]]) -> None:
+        # Multi-row VALUES, chunked to stay below bind parameter limits
+        for start in range(0, len(batch), 1000):
+            await db.execute(
+                insert(Download).values([
+                    {"user_id": user_id, "file_id": file_id, "downloaded_at": downloaded_at}
+                    for user_id, file_id, downloaded_at in batch[start:start + 1000]
+                ])
+            )
+        await db.commit()
+    
+    try:
+        await _write(events)
+        return
+    except IntegrityError as e:
+        await db.rollback()
+        error_str = str(e).lower()
+        if "duplicate key" in error_str and "downloads_pkey" in error_str:
+            # Sequence issue after migrating from SQLite to PostgreSQL
+            result = await db.execute(text("SELECT COALESCE(MAX(id), 0) FROM downloads"))
+            max_id = result.scalar() or 0
+            await db.execute(text(f"SELECT setval('downloads_id_seq', {max_id + 1}, false)"))
+            await db.commit()
+        else:
+            # Most likely a file was deleted while its events were buffered
+            file_ids = {file_id for _, file_id, _ in events}
+            result = await db.execute(select(File.id).where(File.id.in_(file_ids)))
+            existing = set(result.scalars().all())
+            events = [event for event in events if event[1] in existing]
+            if not events:
+                return
+    
+    await _write(events)
+
+
+# Settings key holding the last applied download counter batch
+DOWNLOAD_COUNTS_BATCH_KEY = "download_counts_batch"
+
+
+async def apply_download_counts(db: AsyncSession, counts: Dict[int, int], batch: str = None) -> None:
+    """
+    Add {file_id: delta} to files.downloads_count with one grouped UPDATE
+    
+    Args:
+        batch: Counter batch ID (see core/counters.py). It is stored with
+            the counts, and a batch that was already applied is skipped.
+    """
+    if not counts:
+        return
+    if batch is not None:
+        if await get_setting(db, DOWNLOAD_COUNTS_BATCH_KEY) == batch:
+            # Applied, but the batch couldn't be removed from Redis afterwards
+            return
+        await db.merge(Settings(key=DOWNLOAD_COUNTS_BATCH_KEY, value=batch))
+    await db.execute(
+        update(File)
+        .where(File.id.in_(list(counts)))
+        .values(downloads_count=func.coalesce(File.downloads_count, 0) + case(counts, value=File.id, else_=0))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
 async def get_user_downloads(db: AsyncSession, user_id: int, 
                             skip: int = 0, limit: int = 50) -> List[Download]:
     """Get user's download history"""
@@ -514,6 +1022,15 @@ async def get_user_downloads(db: AsyncSession, user_id: int,
     return result.scalars().all()
 
 
+async def get_user_downloads_page(db: AsyncSession, user_id: int, cursor: str = None,
+                                  limit: int = 50, backward: bool = False) -> Page:
+    """Get user's download history, continuing after cursor (keyset variant of get_user_downloads)"""
+    query = select(Download).where(Download.user_id == user_id)\
+        .options(selectinload(Download.file))
+    keys = [(Download.downloaded_at, True), (Download.id, True)]
+    return await paginate(db, query, keys, cursor=cursor, limit=limit, backward=backward)
+
+
 async def get_total_downloads(db: AsyncSession) -> int:
     """Get total downloads count"""
     result = await db.execute(select(func.count(Download.id)))
@@ -529,8 +1046,22 @@ async def get_top_downloaded_files(db: AsyncSession, limit: int = 10) -> List[Di
     """
     query = select(File).where(File.id.isnot(None)).order_by(desc(File.downloads_count)).limit(limit)
     result = await db.execute(query)
-    files = result.scalars().all()
-    return [{"file": file, "downloads": file.downloads_count} for file in files]
+    files = {file.id: file for file in result.scalars().all()}
+    
+    # Merge increments not yet reconciled; pending counts only go up, so the
+    # true top N is within the stored top N plus files with pending downloads
+    pending = await download_counter.get_pending()
+    missing_ids = [file_id for file_id in pending if file_id not in files]
+    if missing_ids:
+        result = await db.execute(select(File).where(File.id.in_(missing_ids)))
+        files.update({file.id: file for file in result.scalars().all()})
+    
+    merged = [
+        {"file": file, "downloads": (file.downloads_count or 0) + pending.get(file.id, 0)}
+        for file in files.values()
+    ]
+    merged.sort(key=lambda item: item["downloads"], reverse=True)
+    return merged[:limit]
 
 
 # ==================== SAVED LIST CRUD ====================
@@ -580,6 +1111,21 @@ async def get_user_saved_files(db: AsyncSession, user_id: int,
     return result.scalars().all()
 
 
+async def get_user_saved_files_page(db: AsyncSession, user_id: int, cursor: str = None,
+                                    limit: int = 50, backward: bool = False) -> Page:
+    """Get user's saved files, continuing after cursor (keyset variant of get_user_saved_files)"""
+    query = select(SavedList).where(SavedList.user_id == user_id)\
+        .options(selectinload(SavedList.file))
+    keys = [(SavedList.saved_at, True), (SavedList.id, True)]
+    return await paginate(db, query, keys, cursor=cursor, limit=limit, backward=backward)
+
+
+async def get_user_saved_count(db: AsyncSession, user_id: int) -> int:
+    """Get number of files in user's saved list"""
+    result = await db.execute(select(func.count(SavedList.id)).where(SavedList.user_id == user_id))
+    return result.scalar() or 0
+
+
 async def is_file_saved(db: AsyncSession, user_id: int, file_id: int) -> bool:
     """Check if file is in user's saved list"""
     result = await db.execute(
@@ -945,6 +1491,9 @@ async def get_health_stats(db: AsyncSession, days: int = 7) -> Dict[str, Any]:
 
 # ==================== SETTINGS CRUD ====================
 
+ADMIN_DISPLAY_USERNAME_KEY = "admin_display_username"
+
+
 async def get_setting(db: AsyncSession, key: str) -> Optional[str]:
     """Get setting value by key"""
     result = await db.execute(select(Settings).where(Settings.key == key))
@@ -965,6 +1514,9 @@ async def set_setting(db: AsyncSession, key: str, value: str) -> Settings:
     
     await db.commit()
     await db.refresh(setting)
+    
+    if key == ADMIN_DISPLAY_USERNAME_KEY:
+        await publish_admin_contact_change()
     return setting
 
 
@@ -976,22 +1528,127 @@ async def delete_setting(db: AsyncSession, key: str) -> bool:
     if setting:
         await db.delete(setting)
         await db.commit()
+        
+        if key == ADMIN_DISPLAY_USERNAME_KEY:
+            await publish_admin_contact_change()
         return True
     return False
 
 
+async def get_admin_contact(db: AsyncSession) -> str:
+    """
+    Get admin username shown to users (help, blocked notice)
+    
+    Custom display username from settings, else primary admin's Telegram
+    username, else any admin's username, else "admin". Cached until the
+    display username or admin status changes.
+    """
+    cached = get_cached_admin_contact()
+    if cached is not None:
+        return cached
+    
+    from app.core.config import settings as app_settings
+    
+    admin_username = "admin"  # Default fallback
+    try:
+        # First try to get custom display username from settings
+        display_username = await get_setting(db, ADMIN_DISPLAY_USERNAME_KEY)
+        if display_username:
+            admin_username = display_username
+        else:
+            # Try to get primary admin user
+            admin_user = await get_user_by_telegram_id(db, app_settings.ADMIN_ID)
+            if admin_user and admin_user.username:
+                admin_username = admin_user.username
+            else:
+                # Try to get any admin user
+                result = await db.execute(
+                    select(User).where(User.is_admin == True).limit(1)
+                )
+                admin_user = result.scalar_one_or_none()
+                if admin_user and admin_user.username:
+                    admin_username = admin_user.username
+    except Exception:
+        return admin_username  # Use default (uncached) if can't get admin username
+    
+    cache_admin_contact(admin_username)
+    return admin_username
+
+
 # ==================== FORCE SUBSCRIBE (FSUB) CRUD ====================
 
-async def get_force_subscribe_channels(db: AsyncSession) -> List[Dict[str, Any]]:
-    """Get all force subscribe channels"""
-    import json
-    channels_json = await get_setting(db, "force_subscribe_channels")
+FSUB_CHANNELS_KEY = "force_subscribe_channels"
+FSUB_CHANNELS_VERSION_KEY = "force_subscribe_channels_version"
+
+
+async def _load_force_subscribe_channels(db: AsyncSession) -> tuple:
+    """Read (version, channels) from settings table"""
+    result = await db.execute(
+        select(Settings.key, Settings.value).where(
+            Settings.key.in_([FSUB_CHANNELS_KEY, FSUB_CHANNELS_VERSION_KEY])
+        )
+    )
+    values = dict(result.all())
+    
+    try:
+        version = int(values.get(FSUB_CHANNELS_VERSION_KEY) or 0)
+    except ValueError:
+        version = 0
+    
+    channels_json = values.get(FSUB_CHANNELS_KEY)
     if not channels_json:
-        return []
+        return version, []
     try:
-        return json.loads(channels_json)
+        return version, json.loads(channels_json)
     except (json.JSONDecodeError, TypeError):
-        return []
+        return version, []
+
+
+async def _save_force_subscribe_channels(db: AsyncSession, version: int,
+                                         channels: List[Dict[str, Any]]) -> None:
+    """Store channel list with a bumped version and notify other processes"""
+    new_version = version + 1
+    
+    result = await db.execute(
+        select(Settings).where(Settings.key.in_([FSUB_CHANNELS_KEY, FSUB_CHANNELS_VERSION_KEY]))
+    )
+    rows = {setting.key: setting for setting in result.scalars().all()}
+    
+    # Channel list (row removed when empty)
+    if channels:
+        if FSUB_CHANNELS_KEY in rows:
+            rows[FSUB_CHANNELS_KEY].value = json.dumps(channels)
+        else:
+            db.add(Settings(key=FSUB_CHANNELS_KEY, value=json.dumps(channels)))
+    elif FSUB_CHANNELS_KEY in rows:
+        await db.delete(rows[FSUB_CHANNELS_KEY])
+    
+    # Version
+    if FSUB_CHANNELS_VERSION_KEY in rows:
+        rows[FSUB_CHANNELS_VERSION_KEY].value = str(new_version)
+    else:
+        db.add(Settings(key=FSUB_CHANNELS_VERSION_KEY, value=str(new_version)))
+    
+    await db.commit()
+    
+    await invalidation.publish(FSUB_CHANNELS_TOPIC, str(new_version))
+    cache_fsub_channels(new_version, channels)
+
+
+async def get_force_subscribe_channels(db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    Get all force subscribe channels
+    
+    Served from a process-wide cached copy; the settings table is only read
+    after the list changes (here or in another process).
+    """
+    cached = get_cached_fsub_channels()
+    if cached is not None:
+        return cached[1]
+    
+    version, channels = await _load_force_subscribe_channels(db)
+    cache_fsub_channels(version, channels)
+    return channels
 
 
 async def add_force_subscribe_channel(db: AsyncSession, channel_id: int, 
@@ -999,8 +1656,7 @@ async def add_force_subscribe_channel(db: AsyncSession, channel_id: int,
                                       channel_title: str = None,
                                       invite_link: str = None) -> bool:
     """Add a force subscribe channel"""
-    import json
-    channels = await get_force_subscribe_channels(db)
+    version, channels = await _load_force_subscribe_channels(db)
     
     # Check if channel already exists
     for channel in channels:
@@ -1015,14 +1671,13 @@ async def add_force_subscribe_channel(db: AsyncSession, channel_id: int,
         "invite_link": invite_link
     })
     
-    await set_setting(db, "force_subscribe_channels", json.dumps(channels))
+    await _save_force_subscribe_channels(db, version, channels)
     return True
 
 
 async def remove_force_subscribe_channel(db: AsyncSession, channel_id: int) -> bool:
     """Remove a force subscribe channel"""
-    import json
-    channels = await get_force_subscribe_channels(db)
+    version, channels = await _load_force_subscribe_channels(db)
     
     # Filter out the channel
     original_count = len(channels)
@@ -1032,9 +1687,6 @@ async def remove_force_subscribe_channel(db: AsyncSession, channel_id: int) -> b
         return False  # Channel not found
     
     # Update settings
-    if channels:
-        await set_setting(db, "force_subscribe_channels", json.dumps(channels))
-    else:
-        await delete_setting(db, "force_subscribe_channels")
+    await _save_force_subscribe_channels(db, version, channels)
     
     return True
@@ -0,0 +1,146 @@
+"""
+Keyset (cursor) pagination
+
+OFFSET pagination reads and discards every row before the page, so deep
+pages get slower as tables grow. Keyset pagination continues from the
+sort key of the last row seen instead:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC
+
+which, backed by a composite index on the same columns, costs the same
+on every page. The row ID is always the last key so the order is total.
+
+Cursors are opaque, URL-safe strings short enough for Telegram callback
+data. Sort keys must not be NULL.
+"""
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# (sort expression, descending)
+SortKey = Tuple[ColumnElement, bool]
+
+
+@dataclass
+class Page:
+    """One page of keyset results"""
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None  # None on the last page
+    prev_cursor: Optional[str] = None  # None on the first page
+
+
+def _encode_value(value: Any) -> str:
+    if value is None:
+        return "n"
+    if isinstance(value, bool):
+        return f"b{int(value)}"
+    if isinstance(value, datetime):
+        return f"d{(value.replace(tzinfo=None) - _EPOCH) // _MICROSECOND}"
+    if isinstance(value, int):
+        return f"i{value}"
+    if isinstance(value, float):
+        return f"f{value!r}"
+    raise TypeError(f"Unsupported cursor value: {type(value).__name__}")
+
+
+def _decode_value(token: str) -> Any:
+    kind, raw = token[:1], token[1:]
+    if kind == "n":
+        return None
+    if kind == "b":
+        return raw == "1"
+    if kind == "d":
+        return _EPOCH + int(raw) * _MICROSECOND
+    if kind == "i":
+        return int(raw)
+    if kind == "f":
+        return float(raw)
+    raise ValueError(f"Unknown cursor value type: {kind!r}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort key values (last one the row ID) as an opaque cursor"""
+    raw = ",".join(_encode_value(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a cursor from encode_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        return [_decode_value(token) for token in raw.split(",")]
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def _after(keys: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement:
+    """Condition for rows after values in the order given by keys"""
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        # Row value comparison can use a composite index directly
+        columns = tuple_(*(column for column, _ in keys))
+        return columns < tuple(values) if directions.pop() else columns > tuple(values)
+    
+    # Mixed directions: (a > x) OR (a = x AND b < y) OR ...
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [key == value for (key, _), value in zip(keys[:i], values[:i])]
+        clauses.append(and_(*equal, column < values[i] if descending else column > values[i]))
+    return or_(*clauses)
+
+
+async def paginate(db: AsyncSession, query: Select, keys: Sequence[SortKey],
+                   cursor: Optional[str] = None, limit: int = 50, backward: bool = False) -> Page:
+    """
+    Fetch one page of query in keys order
+    
+    Args:
+        query: Select of a single entity, without ORDER BY/OFFSET/LIMIT
+        keys: Sort expressions with direction, ending with the row ID
+        cursor: Continue after this cursor (None = first page)
+        limit: Page size
+        backward: Fetch the page before cursor instead (for "previous")
+    
+    Raises:
+        ValueError: If the cursor is malformed or from another listing
+    """
+    if backward:
+        # Walk the reversed order, then flip the page back
+        keys = [(column, not descending) for column, descending in keys]
+    
+    statement = query.add_columns(*(column for column, _ in keys))
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise ValueError("Invalid cursor: wrong number of sort keys")
+        statement = statement.where(_after(keys, values))
+    statement = statement.order_by(
+        *(column.desc() if descending else column.asc() for column, descending in keys)
+    ).limit(limit + 1)
+    
+    rows = (await db.execute(statement)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    
+    page = Page(items=[row[0] for row in rows])
+    if rows:
+        first, last = encode_cursor(rows[0][1:]), encode_cursor(rows[-1][1:])
+        more_before, more_after = (has_more, bool(cursor)) if backward else (bool(cursor), has_more)
+        page.prev_cursor = first if more_before else None
+        page.next_cursor = last if more_after else None
+    return page
@@ -17,6 +17,10 @@ PERMISSIONS = {
 
 ALL_PERMISSIONS = list(PERMISSIONS.keys())
 
+# One bit per permission, in PERMISSIONS order
+PERMISSION_BITS = {name: 1 << index for index, name in enumerate(PERMISSIONS)}
+ALL_PERMISSIONS_MASK = (1 << len(PERMISSIONS)) - 1
+
 
 def parse_permissions(permissions_str: Optional[str]) -> List[str]:
     """Parse permissions from JSON string"""
@@ -43,3 +47,34 @@ def get_permission_display_names(permissions: List[str]) -> List[str]:
     """Get display names for permissions"""
     return [PERMISSIONS.get(p, p) for p in permissions]
 
+
+
+def permissions_to_mask(permissions: List[str]) -> int:
+    """Convert list of permission names to bitmask (unknown names ignored)"""
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS.get(permission, 0)
+    return mask
+
+
+def resolve_permission_mask(telegram_id: int, is_admin: bool,
+                            permissions_str: Optional[str], primary_admin_id: int) -> int:
+    """
+    Resolve effective permission bitmask for a user
+    
+    Primary admin and admins with no permissions set (backward compatibility)
+    get all permissions; non-admins get none.
+    """
+    if telegram_id == primary_admin_id:
+        return ALL_PERMISSIONS_MASK
+    if not is_admin:
+        return 0
+    if not permissions_str:
+        return ALL_PERMISSIONS_MASK
+    return permissions_to_mask(parse_permissions(permissions_str))
+
+
+def mask_has_permission(mask: int, permission: str) -> bool:
+    """Check if bitmask grants a specific permission"""
+    bit = PERMISSION_BITS.get(permission)
+    return bit is not None and bool(mask & bit)
@@ -0,0 +1,375 @@
+"""
+Full-text search index for the file catalog
+
+Title, tags and description are indexed by the database itself:
+
+    SQLite      - FTS5 external-content table files_fts, kept in sync by
+                  triggers on files, ranked with bm25()
+    PostgreSQL  - generated tsvector column files.search_vector with a GIN
+                  index, ranked with ts_rank()
+
+Both use language-neutral tokenization ('simple' / unicode61) since the
+catalog mixes Uzbek, Russian and English. Query words are prefix-matched
+and AND-ed together.
+
+Queries with no full-text match fall back to typo-tolerant trigram
+matching on titles, ranked by similarity (SEARCH_FUZZY_THRESHOLD):
+
+    SQLite      - in-process TrigramIndex, kept current via file change
+                  events on the invalidation bus
+    PostgreSQL  - pg_trgm GIN index on files.title, word_similarity()
+
+Indexes are created by the migrations and, for create_all deployments,
+by ensure_search_index() in init_db.
+"""
+import logging
+import math
+import re
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from sqlalchemy import Float, Integer, Select, case, func, literal, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from sqlalchemy.sql.elements import ColumnElement
+from app.core import invalidation
+from app.core.config import settings
+from app.models.base import File
+from app.models.cache import FILE_TOPIC
+
+logger = logging.getLogger(__name__)
+
+# Field weights: title matters most, then tags, then description
+TITLE_WEIGHT, TAGS_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 5.0, 1.0
+
+MAX_QUERY_TERMS = 8
+
+# Score of rows matched by fulltext_match's extra condition only
+# (below any full-text score: bm25 is negated, ts_rank is >= 0)
+OTHER_MATCH_SCORE = -1.0
+
+SQLITE_FTS_TABLE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5("
+    "title, tags, description, content='files', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+SQLITE_TRIGGERS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts(rowid, title, tags, description)
+        VALUES (new.id, new.title, new.tags, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN
+        INSERT INTO files_fts(files_fts, rowid, title, tags, description)
+        VALUES ('delete', old.id, old.title, old.tags, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE OF title, tags, description ON files BEGIN
+        INSERT INTO files_fts(files_fts, rowid, title, tags, description)
+        VALUES ('delete', old.id, old.title, old.tags, old.description);
+        INSERT INTO files_fts(rowid, title, tags, description)
+        VALUES (new.id, new.title, new.tags, new.description);
+    END""",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE files ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+    ") STORED",
+    "CREATE INDEX IF NOT EXISTS ix_files_search_vector ON files USING GIN (search_vector)",
+]
+
+POSTGRES_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_files_title_trgm ON files USING GIN (title gin_trgm_ops)",
+]
+
+# (feature, dialect) -> whether the index exists (checked once per process)
+_available = {}
+
+_PROBES = {
+    ("fulltext", "sqlite"): "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files_fts'",
+    ("fulltext", "postgresql"): (
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'files' AND column_name = 'search_vector'"
+    ),
+    ("trigram", "postgresql"): "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_files_title_trgm'",
+}
+
+
+def query_terms(query: str, limit: Optional[int] = MAX_QUERY_TERMS) -> List[str]:
+    """Split a search query into lowercase words, as the index tokenizes them"""
+    return re.findall(r"\w+", query.lower())[:limit]
+
+
+async def ensure_search_index(conn: AsyncConnection) -> None:
+    """Create the full-text index if missing (idempotent)"""
+    dialect = conn.dialect.name
+    
+    if dialect == "sqlite":
+        exists = (await conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files_fts'")
+        )).first()
+        try:
+            # SQLite may be built without FTS5; the triggers need the table
+            async with conn.begin_nested():
+                await conn.execute(text(SQLITE_FTS_TABLE_DDL))
+                for statement in SQLITE_TRIGGERS_DDL:
+                    await conn.execute(text(statement))
+        except Exception as e:
+            logger.warning(f"Could not create SQLite FTS5 index, full-text search disabled: {e}")
+            _available[("fulltext", dialect)] = False
+            return
+        if not exists:
+            # Index files stored before the index existed
+            await conn.execute(text("INSERT INTO files_fts(files_fts) VALUES ('rebuild')"))
+            logger.info("Created SQLite FTS5 search index")
+    elif dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            await conn.execute(text(statement))
+        try:
+            # CREATE EXTENSION may need privileges the app user lacks
+            async with conn.begin_nested():
+                for statement in POSTGRES_TRGM_DDL:
+                    await conn.execute(text(statement))
+            _available[("trigram", dialect)] = True
+        except Exception as e:
+            logger.warning(f"Could not create pg_trgm index, fuzzy search disabled: {e}")
+            _available[("trigram", dialect)] = False
+    
+    _available[("fulltext", dialect)] = True
+
+
+async def is_search_index_available(db: AsyncSession, feature: str = "fulltext") -> bool:
+    """
+    Whether a search index exists in this database
+    
+    Args:
+        feature: "fulltext" or "trigram" (in-process on SQLite, always available)
+    """
+    dialect = db.bind.dialect.name
+    if feature == "trigram" and dialect == "sqlite":
+        return True
+    
+    key = (feature, dialect)
+    if key not in _available:
+        probe = _PROBES.get(key)
+        _available[key] = probe is not None and (await db.execute(text(probe))).first() is not None
+        if not _available[key]:
+            logger.warning(f"Search index '{feature}' missing for {dialect}")
+    return _available[key]
+
+
+def fulltext_match(statement: Select, dialect: str, query: str,
+                   also: Optional[ColumnElement] = None) -> Optional[Tuple[Select, ColumnElement]]:
+    """
+    Restrict a select(File) statement to full-text matches
+    
+    Args:
+        also: Condition for further rows to include (e.g. a search key
+            match), ranked after all full-text matches
+    
+    Returns:
+        (statement, score) with higher score = more relevant, or None if
+        the query has no searchable words or the dialect has no full-text
+        index
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    
+    if dialect == "sqlite":
+        # "word"* is a prefix query; quoting keeps FTS5 operators out
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        matches = text(
+            "SELECT rowid AS id, bm25(files_fts, "
+            f"{TITLE_WEIGHT}, {TAGS_WEIGHT}, {DESCRIPTION_WEIGHT}) AS rank "
+            "FROM files_fts WHERE files_fts MATCH :fts_query"
+        ).bindparams(fts_query=match).columns(id=Integer, rank=Float).subquery("fts")
+        # bm25: lower (negative) is better
+        if also is None:
+            return statement.join(matches, matches.c.id == File.id), -matches.c.rank
+        return (
+            statement.outerjoin(matches, matches.c.id == File.id).where(or_(matches.c.id.isnot(None), also)),
+            func.coalesce(-matches.c.rank, OTHER_MATCH_SCORE)
+        )
+    
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(literal("simple", type_=REGCONFIG), " & ".join(f"{term}:*" for term in terms))
+        search_vector = literal_column("files.search_vector", type_=TSVECTOR)
+        matched = search_vector.op("@@")(tsquery)
+        if also is None:
+            return statement.where(matched), func.ts_rank(search_vector, tsquery)
+        return (
+            statement.where(or_(matched, also)),
+            case((matched, func.ts_rank(search_vector, tsquery)), else_=literal(OTHER_MATCH_SCORE, type_=Float))
+        )
+    
+    return None
+
+
+def apply_fulltext_search(statement: Select, dialect: str, query: str,
+                          also: Optional[ColumnElement] = None) -> Optional[Select]:
+    """Restrict a select(File) statement to full-text matches, best first (see fulltext_match)"""
+    match = fulltext_match(statement, dialect, query, also)
+    if match is None:
+        return None
+    statement, score = match
+    return statement.order_by(score.desc())
+
+
+# ==================== TRIGRAM (FUZZY) SEARCH ====================
+
+def trigrams(value: str) -> FrozenSet[str]:
+    """Trigrams of each word padded like pg_trgm ("  w", " wo", "wor", "ord", "rd ")"""
+    grams = set()
+    for word in re.findall(r"\w+", value.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class TrigramIndex:
+    """
+    In-process trigram index over file titles (SQLite deployments)
+    
+    Score is the share of query trigrams found in the title, like
+    pg_trgm's word_similarity(). Candidates are generated from the
+    rarest query trigrams only: a title reaching the threshold must
+    contain at least one of them, so common trigrams are never scanned.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._grams: Dict[int, FrozenSet[str]] = {}
+        self._loaded = False
+        # File IDs changed since the last refresh
+        self._dirty: Set[int] = set()
+    
+    def __len__(self) -> int:
+        return len(self._grams)
+    
+    def add(self, file_id: int, title: str) -> None:
+        """Index or re-index a title"""
+        self.remove(file_id)
+        grams = trigrams(title or "")
+        self._grams[file_id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(file_id)
+    
+    def remove(self, file_id: int) -> None:
+        """Drop a file from the index"""
+        for gram in self._grams.pop(file_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(file_id)
+                if not posting:
+                    del self._postings[gram]
+    
+    def mark_dirty(self, payload: str = "") -> None:
+        """Schedule a file (or everything, for empty payload) for reload"""
+        if not payload:
+            self._loaded = False
+            return
+        try:
+            self._dirty.add(int(payload))
+        except ValueError:
+            pass
+    
+    async def refresh(self, db: AsyncSession) -> None:
+        """Load all titles on first use, then re-read changed files"""
+        if not self._loaded:
+            self._dirty.clear()
+            rows = (await db.execute(select(File.id, File.title))).all()
+            self._postings, self._grams = {}, {}
+            for file_id, title in rows:
+                self.add(file_id, title)
+            self._loaded = True
+            logger.info(f"Loaded trigram index ({len(rows)} titles)")
+            return
+        
+        if self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            rows = dict((await db.execute(
+                select(File.id, File.title).where(File.id.in_(dirty))
+            )).all())
+            for file_id in dirty:
+                if file_id in rows:
+                    self.add(file_id, rows[file_id])
+                else:
+                    self.remove(file_id)
+    
+    def search(self, query: str, threshold: float, limit: int) -> List[Tuple[int, float]]:
+        """
+        Find titles similar to query
+        
+        Returns:
+            [(file_id, score)] best first, score >= threshold
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        
+        # Titles need at least this many of the query trigrams
+        needed = max(1, math.ceil(threshold * len(query_grams)))
+        present = sorted(
+            (gram for gram in query_grams if gram in self._postings),
+            key=lambda gram: len(self._postings[gram])
+        )
+        if len(present) < needed:
+            return []
+        
+        candidates: Set[int] = set()
+        for gram in present[:len(present) - needed + 1]:
+            candidates.update(self._postings[gram])
+        
+        scored = []
+        for file_id in candidates:
+            title_grams = self._grams[file_id]
+            common = len(query_grams & title_grams)
+            if common >= needed:
+                # Tie-break on overall overlap, so closer-length titles win
+                scored.append((common / len(query_grams), common / len(query_grams | title_grams), file_id))
+        scored.sort(reverse=True)
+        return [(file_id, score) for score, _, file_id in scored[:limit]]
+
+
+trigram_index = TrigramIndex()
+invalidation.subscribe(FILE_TOPIC, trigram_index.mark_dirty)
+
+
+async def fuzzy_search_scores(db: AsyncSession, query: str, limit: int) -> Optional[List[Tuple[int, float]]]:
+    """
+    (file ID, similarity) for titles similar to query, best first
+    
+    Returns None if fuzzy search is disabled or unavailable. On PostgreSQL
+    returns an empty list; use apply_trigram_search there instead.
+    """
+    if not settings.SEARCH_FUZZY_ENABLED or not await is_search_index_available(db, "trigram"):
+        return None
+    if db.bind.dialect.name != "sqlite":
+        return []
+    
+    await trigram_index.refresh(db)
+    return trigram_index.search(query, settings.SEARCH_FUZZY_THRESHOLD, limit)
+
+
+async def fuzzy_search_ids(db: AsyncSession, query: str, limit: int) -> Optional[List[int]]:
+    """File IDs with titles similar to query, best first (see fuzzy_search_scores)"""
+    scores = await fuzzy_search_scores(db, query, limit)
+    return None if scores is None else [file_id for file_id, _ in scores]
+
+
+async def trigram_match(db: AsyncSession, statement: Select, query: str) -> Tuple[Select, ColumnElement]:
+    """Restrict a select(File) statement to pg_trgm title matches; returns (statement, similarity)"""
+    # <% uses the GIN index with the session's word_similarity threshold
+    await db.execute(select(func.set_config(
+        "pg_trgm.word_similarity_threshold", str(settings.SEARCH_FUZZY_THRESHOLD), True
+    )))
+    return statement.where(literal(query).op("<%")(File.title)), func.word_similarity(query, File.title)
+
+
+async def apply_trigram_search(db: AsyncSession, statement: Select, query: str) -> Select:
+    """Restrict a select(File) statement to pg_trgm title matches, most similar first"""
+    statement, similarity = await trigram_match(db, statement, query)
+    return statement.order_by(similarity.desc())
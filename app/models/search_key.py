@@ -0,0 +1,108 @@
+"""
+Script-independent search keys
+
+Uzbek titles and queries are typed in Latin or Cyrillic script, with any
+of several apostrophes (o', o‘, oʻ, ў). files.search_key holds the title
+in one canonical form, computed when the title is written (create_file,
+update_file):
+
+    - lowercase, Cyrillic transliterated to Uzbek Latin
+    - apostrophes dropped, so o', o‘, oʻ and ў all become o
+    - diacritics removed, punctuation turned into single spaces
+
+Queries are converted the same way, so "Oʻzbek tili", "O'zbek tili" and
+"Ўзбек тили" all become "ozbek tili" and are found with one indexed
+equality or prefix lookup (search_key_match) - no lower() or ilike scans.
+
+The lookup matches the beginning of the whole title only: "tili" does
+not find "Ўзбек тили". Words further into a title are found by the
+full-text search (in the script they were written in) and, when
+nothing matches, by the trigram fallback.
+"""
+import logging
+import re
+import unicodedata
+from typing import Optional
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql.elements import ColumnElement
+from app.models.base import File
+
+logger = logging.getLogger(__name__)
+
+# Keys are cut to this length (longer titles match on their beginning)
+MAX_SEARCH_KEY_LENGTH = 255
+
+# Rows per UPDATE when filling missing keys
+BACKFILL_BATCH_SIZE = 500
+
+# Uzbek Cyrillic alphabet (and Russian letters) -> Uzbek Latin
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo",
+    "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "x", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "",
+    "ы": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+
+# Apostrophe variants used for oʻ, gʻ and the tutuq belgisi (ъ)
+APOSTROPHES = "'`´‘’ʻʼʹʽ′"
+
+_VOWELS = set("аеёиоуэюяўaeiou")
+_DROP_APOSTROPHES = str.maketrans("", "", APOSTROPHES)
+
+
+def search_key(value: Optional[str]) -> str:
+    """Canonical form of a title or query (see module docstring)"""
+    value = unicodedata.normalize("NFKC", value or "").lower()
+    
+    letters = []
+    previous = ""
+    for char in value:
+        if char == "е" and (not previous.isalpha() or previous in _VOWELS or previous in "ъь"):
+            # Word-initial and post-vowel е is written "ye" in Latin (ер -> yer)
+            letters.append("ye")
+        else:
+            letters.append(CYRILLIC_TO_LATIN.get(char, char))
+        previous = char
+    value = "".join(letters).translate(_DROP_APOSTROPHES)
+    
+    # Strip diacritics (ş -> s, é -> e)
+    value = "".join(
+        char for char in unicodedata.normalize("NFKD", value) if not unicodedata.combining(char)
+    )
+    return " ".join(re.findall(r"[^\W_]+", value))[:MAX_SEARCH_KEY_LENGTH].rstrip()
+
+
+def search_key_match(dialect: str, key: str) -> ColumnElement:
+    """
+    Condition for titles whose search key equals or starts with key
+    
+    Matches from the start of the title only (see module docstring).
+    PostgreSQL uses LIKE 'key%' (served by the text_pattern_ops index);
+    elsewhere a range over the plain (binary collation) index.
+    """
+    if dialect == "postgresql":
+        return File.search_key.startswith(key, autoescape=True)
+    return and_(File.search_key >= key, File.search_key < key + "\U0010ffff")
+
+
+async def ensure_search_keys(conn: AsyncConnection) -> None:
+    """Compute missing search keys, e.g. rows written by an older version (idempotent)"""
+    filled = 0
+    while True:
+        rows = (await conn.execute(
+            select(File.id, File.title).where(File.search_key.is_(None)).limit(BACKFILL_BATCH_SIZE)
+        )).all()
+        if not rows:
+            break
+        await conn.execute(
+            update(File.__table__).where(File.__table__.c.id == bindparam("row_id"))
+            .values(search_key=bindparam("new_key")),
+            [{"row_id": row_id, "new_key": search_key(title)} for row_id, title in rows]
+        )
+        filled += len(rows)
+    
+    if filled:
+        logger.info(f"Computed search keys for {filled} files")
@@ -0,0 +1,54 @@
+"""
+Normalized file tags
+
+files.tags keeps the comma-separated string admins enter (shown as is
+and full-text indexed). Each tag is also stored normalized in file_tags,
+one row per (tag, file), so filtering, counting and browsing by tag use
+an index instead of LIKE scans over files.tags.
+
+create_file and update_file keep the rows in step with files.tags;
+existing files are backfilled by the migration, or on startup for
+databases created without migrations.
+"""
+import logging
+from typing import List, Optional
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.models.base import File, FileTag
+
+logger = logging.getLogger(__name__)
+
+# Longer tags are cut (file_tags.tag column size)
+MAX_TAG_LENGTH = 64
+
+
+def normalize_tags(tags: Optional[str]) -> List[str]:
+    """Distinct tags of a comma-separated string: lowercase, single-spaced, no leading '#'"""
+    result = []
+    for tag in (tags or "").split(","):
+        tag = " ".join(tag.lower().split()).lstrip("#").lstrip()[:MAX_TAG_LENGTH].rstrip()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+async def sync_file_tags(db: AsyncSession, file_id: int, tags: Optional[str]) -> None:
+    """Replace a file's file_tags rows (caller commits)"""
+    await db.execute(delete(FileTag).where(FileTag.file_id == file_id))
+    rows = [{"tag": tag, "file_id": file_id} for tag in normalize_tags(tags)]
+    if rows:
+        await db.execute(insert(FileTag), rows)
+
+
+async def ensure_file_tags(conn: AsyncConnection) -> None:
+    """Fill file_tags from files.tags if it is empty but files have tags (idempotent)"""
+    if (await conn.execute(select(FileTag.file_id).limit(1))).first():
+        return
+    
+    tagged = (await conn.execute(
+        select(File.id, File.tags).where(File.tags.isnot(None), File.tags != "")
+    )).all()
+    rows = [{"tag": tag, "file_id": file_id} for file_id, tags in tagged for tag in normalize_tags(tags)]
+    if rows:
+        await conn.execute(insert(FileTag), rows)
+        logger.info(f"Indexed {len(rows)} tags of {len(tagged)} files")
@@ -0,0 +1,137 @@
+"""
+Write-behind buffer for download events
+
+Handlers call download_events.record() instead of writing to the DB on
+the user's critical path. Events are flushed in batches every
+DOWNLOAD_FLUSH_BATCH_SIZE events or DOWNLOAD_FLUSH_INTERVAL_MS
+milliseconds, whichever comes first, and on graceful shutdown.
+
+Per-file counts go to the download hot counter (app/core/counters.py),
+which the same background task reconciles into files.downloads_count
+every DOWNLOAD_COUNTER_RECONCILE_INTERVAL seconds.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.counters import download_counter
+from app.core.database import AsyncSessionLocal
+from app.models.crud import record_downloads_bulk, apply_download_counts
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadEventBuffer:
+    """In-process queue of (user_id, file_id, downloaded_at) events"""
+    
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        """
+        Args:
+            batch_size: Flush as soon as this many events are pending
+            flush_interval: Flush at least this often (seconds)
+            max_pending: Oldest events are dropped beyond this (DB outage)
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[Tuple[int, int, datetime]] = []
+        self._batch_ready = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    def record(self, user_id: int, file_id: int) -> None:
+        """Queue a download event (never blocks, never touches the DB)"""
+        self._pending.append((user_id, file_id, datetime.utcnow()))
+        
+        if len(self._pending) > self.max_pending:
+            dropped = len(self._pending) - self.max_pending
+            del self._pending[:dropped]
+            logger.warning(f"Download event buffer full, dropped {dropped} oldest events")
+        
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+        
+        # Start flusher lazily if startup hook did not run
+        if self._task is None or self._task.done():
+            self.start()
+    
+    async def flush(self) -> int:
+        """Write all pending events to the DB; returns number written"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            
+            batch, self._pending = self._pending, []
+            self._batch_ready.clear()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await record_downloads_bulk(db, batch)
+            except asyncio.CancelledError:
+                # Keep events for the final flush in stop()
+                self._pending = batch + self._pending
+                raise
+            except Exception as e:
+                # Put events back in front of anything queued meanwhile
+                self._pending = batch + self._pending
+                logger.error(f"Error flushing {len(batch)} download events: {e}", exc_info=True)
+                return 0
+            
+            counts: Dict[int, int] = {}
+            for _, file_id, _ in batch:
+                counts[file_id] = counts.get(file_id, 0) + 1
+            await download_counter.incr_many(counts)
+            
+            logger.debug(f"Flushed {len(batch)} download events")
+            return len(batch)
+    
+    async def reconcile_counts(self) -> int:
+        """Write pending download counts into files.downloads_count"""
+        async def _apply(counts: Dict[int, int], batch: Optional[str]) -> None:
+            async with AsyncSessionLocal() as db:
+                await apply_download_counts(db, counts, batch)
+        
+        return await download_counter.reconcile(_apply)
+    
+    async def _run(self) -> None:
+        """Flush loop (also reconciles download counters)"""
+        next_reconcile = time.monotonic() + settings.DOWNLOAD_COUNTER_RECONCILE_INTERVAL
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+            
+            if time.monotonic() >= next_reconcile:
+                await self.reconcile_counts()
+                next_reconcile = time.monotonic() + settings.DOWNLOAD_COUNTER_RECONCILE_INTERVAL
+    
+    def start(self) -> None:
+        """Start background flusher (needs a running event loop)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="download-events")
+    
+    async def stop(self) -> None:
+        """Stop background flusher, flush remaining events and reconcile counts"""
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        
+        written = await self.flush()
+        if written:
+            logger.info(f"Flushed {written} buffered download events on shutdown")
+        await self.reconcile_counts()
+
+
+download_events = DownloadEventBuffer(
+    batch_size=settings.DOWNLOAD_FLUSH_BATCH_SIZE,
+    flush_interval=settings.DOWNLOAD_FLUSH_INTERVAL_MS / 1000,
+    max_pending=settings.DOWNLOAD_BUFFER_MAX_PENDING,
+)
@@ -1,9 +1,8 @@
 """Background tasks for file processing"""
 import logging
-import tempfile
-import os
 from typing import Optional
-from app.bot.main import _bot_instance
+from app.bot import main as bot_main
+from app.bot.reupload import send_processed_document
 from app.models.crud import get_setting, get_file_by_id, update_file_processed_id
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import AsyncSessionLocal
@@ -34,6 +33,49 @@ def process_file_sync(file_id: int, file_telegram_id: str, file_name: Optional[s
         loop.close()
 
 
+async def process_document(bot, file_telegram_id: str, file_name: Optional[str],
+                           title: str, thumbnail_id: str) -> Optional[str]:
+    """
+    Re-upload a document with thumbnail and suffixed filename via the admin chat
+    
+    Args:
+        bot: Bot instance
+        file_telegram_id: Telegram file_id
+        file_name: Original filename
+        title: File title
+        thumbnail_id: Default thumbnail file_id
+    
+    Returns:
+        processed_file_id (None if Telegram returned no document)
+    """
+    from app.core.config import settings
+    admin_id = settings.ADMIN_ID
+    
+    # Upload processed document with thumbnail (streamed, no temp files)
+    sent_message = await send_processed_document(
+        bot,
+        chat_id=admin_id,
+        telegram_file_id=file_telegram_id,
+        file_name=file_name,
+        title=title,
+        thumbnail_id=thumbnail_id,
+        caption=f"📚 {title}"
+    )
+    
+    # Get processed file_id
+    processed_file_id = None
+    if sent_message.document:
+        processed_file_id = sent_message.document.file_id
+    
+    # Delete the sent message (it was just for getting file_id)
+    try:
+        await bot.delete_message(chat_id=admin_id, message_id=sent_message.message_id)
+    except Exception:
+        pass
+    
+    return processed_file_id
+
+
 async def process_file_async(file_id: int, file_telegram_id: str, file_name: Optional[str], title: str):
     """
     Async function to process file (download, add thumbnail, rename, re-upload)
@@ -44,6 +86,8 @@ async def process_file_async(file_id: int, file_telegram_id: str, file_name: Opt
         file_name: Original filename
         title: File title
     """
+    # Read at call time - the bot instance is set after this module is imported
+    _bot_instance = bot_main._bot_instance
     if not _bot_instance:
         logger.error("Bot instance not available for file processing")
         return
@@ -59,67 +103,15 @@ async def process_file_async(file_id: int, file_telegram_id: str, file_name: Opt
             
             logger.info(f"Processing file {file_id} (telegram_id: {file_telegram_id[:20]}...)")
             
-            # Download original file
-            doc_file = await _bot_instance.get_file(file_telegram_id)
-            
-            # Create temporary file for document
-            original_filename = file_name or title
-            file_ext = os.path.splitext(original_filename)[1] if original_filename else '.pdf'
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_doc:
-                doc_path = tmp_doc.name
-                await _bot_instance.download_file(doc_file.file_path, doc_path)
-            
-            # Download thumbnail
-            thumb_file = await _bot_instance.get_file(global_thumbnail)
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_thumb:
-                thumb_path = tmp_thumb.name
-                await _bot_instance.download_file(thumb_file.file_path, thumb_path)
-            
-            # Prepare filename with "- PrimeLingoBot" suffix
-            name_without_ext, ext = os.path.splitext(original_filename or title)
-            new_filename = f"{name_without_ext} - PrimeLingoBot{ext}"
-            
-            # Create InputFile objects
-            from aiogram.types import FSInputFile
-            doc_input = FSInputFile(doc_path, filename=new_filename)
-            thumb_input = FSInputFile(thumb_path)
-            
-            # Get admin ID for sending processed file
-            from app.core.config import settings
-            admin_id = settings.ADMIN_ID
-            
-            # Upload processed document with thumbnail
-            sent_message = await _bot_instance.send_document(
-                chat_id=admin_id,
-                document=doc_input,
-                caption=f"📚 {title}",
-                thumbnail=thumb_input
+            processed_file_id = await process_document(
+                _bot_instance, file_telegram_id, file_name, title, global_thumbnail
             )
             
-            # Get processed file_id
-            processed_file_id = None
-            if sent_message.document:
-                processed_file_id = sent_message.document.file_id
-            
-            # Delete the sent message (it was just for getting file_id)
-            try:
-                await _bot_instance.delete_message(chat_id=admin_id, message_id=sent_message.message_id)
-            except Exception:
-                pass
-            
             # Update database with processed_file_id
             if processed_file_id:
                 await update_file_processed_id(db, file_id, processed_file_id)
                 logger.info(f"Successfully processed file {file_id}, processed_file_id stored")
             
-            # Clean up temporary files
-            for path in [doc_path, thumb_path]:
-                if path and os.path.exists(path):
-                    try:
-                        os.unlink(path)
-                    except Exception as cleanup_error:
-                        logger.warning(f"Error cleaning up temp file {path}: {cleanup_error}")
-            
         except Exception as e:
             logger.error(f"Error processing file {file_id}: {e}", exc_info=True)
             raise
@@ -0,0 +1,123 @@
+"""
+Background file size backfill
+
+Search results and the admin file list show the stored files.file_size.
+Rows uploaded before sizes were recorded have NULL there; this job looks
+them up with get_file, FILE_SIZE_BACKFILL_WORKERS at a time under a shared
+rate limit (FILE_SIZE_BACKFILL_PER_MINUTE), and writes each batch back with
+one UPDATE.
+
+Started on bot startup and whenever a page shows files without a size.
+Files Telegram refuses to describe (e.g. over the 20 MB get_file limit)
+keep NULL and are skipped until the bot restarts; transient errors are
+retried on the next run.
+"""
+import asyncio
+import logging
+from typing import Optional, Set, Tuple
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from app.bot import main as bot_main
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.rate_limit import RateLimiter
+from app.models.crud import get_files_missing_size, set_file_sizes
+
+logger = logging.getLogger(__name__)
+
+
+class FileSizeBackfill:
+    """Fills missing file sizes; one run at a time per process"""
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._rerun = False
+        # Files Telegram has no size for (not asked again)
+        self._unavailable: Set[int] = set()
+    
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def trigger(self) -> None:
+        """Start a run, or schedule another one after the current run"""
+        if self.is_running():
+            self._rerun = True
+            return
+        
+        bot = bot_main._bot_instance
+        if not bot:
+            logger.debug("Bot instance not available, skipping file size backfill")
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(bot), name="file-size-backfill")
+    
+    async def _fetch_size(self, bot, row: Tuple[int, str], limiter: RateLimiter,
+                          semaphore: asyncio.Semaphore) -> Optional[int]:
+        """Size in bytes, None if not available (yet)"""
+        file_id, telegram_file_id = row
+        
+        async with semaphore:
+            for _ in range(settings.MAX_RETRIES):
+                await limiter.wait()
+                try:
+                    file_info = await bot.get_file(telegram_file_id)
+                    if file_info.file_size is None:
+                        self._unavailable.add(file_id)
+                    return file_info.file_size
+                except TelegramRetryAfter as e:
+                    logger.warning(f"Flood wait {e.retry_after}s while fetching file sizes")
+                    limiter.pause(e.retry_after)
+                except TelegramBadRequest as e:
+                    logger.info(f"No size available for file {file_id}: {e}")
+                    self._unavailable.add(file_id)
+                    return None
+                except Exception as e:
+                    logger.warning(f"Could not fetch size for file {file_id}: {e}")
+                    return None
+        return None
+    
+    async def _run(self, bot) -> None:
+        limiter = RateLimiter(settings.FILE_SIZE_BACKFILL_PER_MINUTE)
+        semaphore = asyncio.Semaphore(max(settings.FILE_SIZE_BACKFILL_WORKERS, 1))
+        
+        while True:
+            self._rerun = False
+            after_id, filled = 0, 0
+            try:
+                while True:
+                    async with AsyncSessionLocal() as db:
+                        batch = await get_files_missing_size(
+                            db, after_id=after_id, limit=settings.FILE_SIZE_BACKFILL_BATCH_SIZE
+                        )
+                    if not batch:
+                        break
+                    
+                    rows = [row for row in batch if row[0] not in self._unavailable]
+                    results = await asyncio.gather(
+                        *(self._fetch_size(bot, row, limiter, semaphore) for row in rows)
+                    )
+                    sizes = {row[0]: size for row, size in zip(rows, results) if size is not None}
+                    if sizes:
+                        async with AsyncSessionLocal() as db:
+                            await set_file_sizes(db, sizes)
+                        filled += len(sizes)
+                    after_id = batch[-1][0]
+            except Exception as e:
+                logger.error(f"File size backfill failed: {e}", exc_info=True)
+                return
+            
+            if filled:
+                logger.info(f"File size backfill stored {filled} sizes")
+            if not self._rerun:
+                return
+    
+    async def shutdown(self) -> None:
+        """Stop a running backfill (sizes already written are kept)"""
+        if self.is_running():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+file_size_backfill = FileSizeBackfill()
@@ -0,0 +1,341 @@
+"""
+Catalog-wide reprocessing job
+
+Re-uploads existing files with the default thumbnail and filename suffix
+and stores the new processed_file_id, so users don't wait for on-the-fly
+processing on download. Modes:
+
+    missing - files without processed_file_id
+    all     - every file (after the default thumbnail changes)
+    resume  - continue an interrupted or stopped job from its checkpoint
+
+Files are streamed from the DB in ID order (keyset batches) into a bounded
+queue consumed by REPROCESS_WORKERS workers. Uploads share one rate limiter
+(REPROCESS_UPLOADS_PER_MINUTE) and back off on Telegram flood waits.
+
+Progress is checkpointed in the settings table: last_id is the highest file
+ID below which every file is done. A job interrupted by shutdown or a crash
+is resumed on bot startup.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+from aiogram.exceptions import TelegramRetryAfter
+from app.bot import main as bot_main
+from app.core.admission import processing_scheduler
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.rate_limit import RateLimiter
+from app.models.crud import (
+    get_setting, set_setting, get_files_to_reprocess, count_files_to_reprocess,
+    update_file_processed_id
+)
+from app.tasks.file_processing import process_document
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "reprocess_job"
+MODES = ("missing", "all", "resume")
+
+# Fairness key in the processing scheduler; the job gets one turn per round
+ADMISSION_KEY = "reprocess_job"
+
+# A "running" job whose checkpoint is older than this many intervals is dead
+STALE_CHECKPOINTS = 6
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _is_stale(state: Dict[str, Any]) -> bool:
+    """Whether a job marked running has stopped checkpointing"""
+    try:
+        updated_at = datetime.fromisoformat(state["updated_at"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    age = (datetime.utcnow() - updated_at).total_seconds()
+    return age > settings.REPROCESS_CHECKPOINT_INTERVAL * STALE_CHECKPOINTS
+
+
+class ReprocessJob:
+    """Single reprocessing job per deployment, run in the process that started it"""
+    
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._resume_task: Optional[asyncio.Task] = None
+        self._stop_requested = False
+        self._save_lock = asyncio.Lock()
+    
+    def is_running(self) -> bool:
+        """Whether the job is running in this process"""
+        return self._task is not None and not self._task.done()
+    
+    async def _load_state(self) -> Dict[str, Any]:
+        async with AsyncSessionLocal() as db:
+            raw = await get_setting(db, STATE_KEY)
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+    
+    async def _save_state(self) -> None:
+        async with self._save_lock:
+            self.state["updated_at"] = _now()
+            async with AsyncSessionLocal() as db:
+                await set_setting(db, STATE_KEY, json.dumps(self.state))
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """
+        Get job progress
+        
+        Returns live state if the job runs here, the last checkpoint otherwise.
+        """
+        state = dict(self.state) if self.is_running() else await self._load_state()
+        if not state:
+            return {"status": "idle"}
+        
+        if state.get("status") == "running" and not self.is_running() and _is_stale(state):
+            state["status"] = "interrupted"
+        done = state.get("processed", 0) + state.get("failed", 0)
+        total = state.get("total", 0)
+        state["percent"] = round(done * 100 / total, 1) if total else 100.0
+        state.pop("stop_requested", None)
+        return state
+    
+    async def start(self, mode: str = "missing") -> Dict[str, Any]:
+        """
+        Start the job in this process
+        
+        Args:
+            mode: "missing", "all" or "resume"
+        
+        Raises:
+            ValueError: If the job can't be started (reason in message)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if self.is_running():
+            raise ValueError("Reprocessing is already running")
+        
+        bot = bot_main._bot_instance
+        if not bot:
+            raise ValueError("Bot instance not available")
+        
+        async with AsyncSessionLocal() as db:
+            thumbnail_id = await get_setting(db, "default_thumbnail_id")
+        if not thumbnail_id:
+            raise ValueError("No default thumbnail set")
+        
+        previous = await self._load_state()
+        if previous.get("status") == "running" and not _is_stale(previous):
+            raise ValueError("Reprocessing is already running in another process")
+        
+        if mode == "resume":
+            if previous.get("status") not in ("running", "interrupted", "cancelled", "failed"):
+                raise ValueError("No unfinished job to resume")
+            if previous.get("thumbnail_id") != thumbnail_id:
+                raise ValueError("Default thumbnail changed since the job started, start a new job")
+            state = previous
+        else:
+            state = {
+                "mode": mode,
+                "thumbnail_id": thumbnail_id,
+                "last_id": 0,
+                "processed": 0,
+                "failed": 0,
+                "started_at": _now(),
+                "last_error": None,
+            }
+        
+        async with AsyncSessionLocal() as db:
+            remaining = await count_files_to_reprocess(
+                db, after_id=state["last_id"], only_missing=state["mode"] == "missing"
+            )
+        state.update({
+            "status": "running",
+            "total": state["processed"] + state["failed"] + remaining,
+            "finished_at": None,
+            "stop_requested": False,
+        })
+        
+        self.state = state
+        self._stop_requested = False
+        await self._save_state()
+        
+        self._task = asyncio.get_running_loop().create_task(self._run(bot), name="reprocess-job")
+        logger.info(f"Reprocessing job started (mode: {state['mode']}, {remaining} files, from ID {state['last_id']})")
+        return await self.get_status()
+    
+    async def stop(self) -> bool:
+        """
+        Ask the job to stop after in-flight uploads finish
+        
+        Works for a job running in another process too (checked at its next
+        checkpoint). Returns False if no job is running.
+        """
+        if self.is_running():
+            self._stop_requested = True
+            return True
+        
+        state = await self._load_state()
+        if state.get("status") != "running" or _is_stale(state):
+            return False
+        state["stop_requested"] = True
+        async with AsyncSessionLocal() as db:
+            await set_setting(db, STATE_KEY, json.dumps(state))
+        return True
+    
+    async def _process_one(self, bot, row: Tuple[int, str, Optional[str], str],
+                           limiter: RateLimiter) -> bool:
+        """Process one file; returns False if it failed"""
+        file_id, telegram_file_id, file_name, title = row
+        
+        for _ in range(settings.MAX_RETRIES):
+            await limiter.wait()
+            try:
+                # Shares the global re-upload slots with on-the-fly processing
+                async with processing_scheduler.slot(ADMISSION_KEY, limit_queue=False):
+                    processed_file_id = await process_document(
+                        bot, telegram_file_id, file_name, title, self.state["thumbnail_id"]
+                    )
+                if processed_file_id:
+                    async with AsyncSessionLocal() as db:
+                        await update_file_processed_id(db, file_id, processed_file_id)
+                return True
+            except TelegramRetryAfter as e:
+                logger.warning(f"Flood wait {e.retry_after}s while reprocessing file {file_id}")
+                limiter.pause(e.retry_after)
+            except Exception as e:
+                logger.error(f"Error reprocessing file {file_id}: {e}", exc_info=True)
+                self.state["last_error"] = f"File {file_id}: {e}"
+                break
+        
+        return False
+    
+    async def _checkpoint_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REPROCESS_CHECKPOINT_INTERVAL)
+            try:
+                # Stop requested from another process
+                if (await self._load_state()).get("stop_requested"):
+                    self._stop_requested = True
+                await self._save_state()
+            except Exception as e:
+                logger.warning(f"Could not checkpoint reprocessing job: {e}")
+    
+    async def _run(self, bot) -> None:
+        state = self.state
+        only_missing = state["mode"] == "missing"
+        workers = max(settings.REPROCESS_WORKERS, 1)
+        limiter = RateLimiter(settings.REPROCESS_UPLOADS_PER_MINUTE)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        
+        # Queued file IDs in order; last_id and the counters only move past a
+        # contiguous done prefix, so a resumed job never counts a file twice
+        pending: Deque[int] = deque()
+        done: Dict[int, bool] = {}
+        
+        def mark_done(file_id: int, ok: bool) -> None:
+            done[file_id] = ok
+            while pending and pending[0] in done:
+                state["processed" if done.pop(pending[0]) else "failed"] += 1
+                state["last_id"] = pending.popleft()
+        
+        async def produce() -> None:
+            after_id = state["last_id"]
+            while not self._stop_requested:
+                async with AsyncSessionLocal() as db:
+                    batch = await get_files_to_reprocess(
+                        db, after_id=after_id, limit=settings.REPROCESS_BATCH_SIZE,
+                        only_missing=only_missing
+                    )
+                if not batch:
+                    break
+                for row in batch:
+                    pending.append(row[0])
+                    await queue.put(row)
+                after_id = batch[-1][0]
+            for _ in range(workers):
+                await queue.put(None)
+        
+        async def work() -> None:
+            while True:
+                row = await queue.get()
+                if row is None:
+                    return
+                if self._stop_requested:
+                    # Left unprocessed; checkpoint stays before it
+                    continue
+                ok = await self._process_one(bot, row, limiter)
+                mark_done(row[0], ok)
+        
+        checkpointer = asyncio.create_task(self._checkpoint_loop())
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(work()) for _ in range(workers)]
+        try:
+            await asyncio.gather(*tasks)
+            state["status"] = "cancelled" if self._stop_requested else "completed"
+        except asyncio.CancelledError:
+            # Shutdown - resumed on next startup
+            state["status"] = "interrupted"
+            raise
+        except Exception as e:
+            logger.error(f"Reprocessing job failed: {e}", exc_info=True)
+            state["status"] = "failed"
+            state["last_error"] = str(e)
+        finally:
+            checkpointer.cancel()
+            for task in tasks:
+                task.cancel()
+            state["stop_requested"] = False
+            if state["status"] != "interrupted":
+                state["finished_at"] = _now()
+            try:
+                await self._save_state()
+            except Exception as e:
+                logger.error(f"Could not save reprocessing job state: {e}")
+            logger.info(
+                f"Reprocessing job {state['status']}: {state['processed']} processed, "
+                f"{state['failed']} failed, checkpoint ID {state['last_id']}"
+            )
+    
+    async def _resume_when_stale(self) -> None:
+        state = await self._load_state()
+        status = state.get("status")
+        if status == "running" and not _is_stale(state):
+            # Previous process may have just died - wait until its checkpoint expires
+            await asyncio.sleep(settings.REPROCESS_CHECKPOINT_INTERVAL * STALE_CHECKPOINTS)
+            state = await self._load_state()
+            status = state.get("status")
+        
+        if status == "interrupted" or (status == "running" and _is_stale(state)):
+            try:
+                await self.start("resume")
+            except ValueError as e:
+                logger.warning(f"Could not resume reprocessing job: {e}")
+    
+    def resume_interrupted(self) -> None:
+        """Resume a job interrupted by shutdown or crash (call on bot startup)"""
+        if self._resume_task is None or self._resume_task.done():
+            self._resume_task = asyncio.get_running_loop().create_task(
+                self._resume_when_stale(), name="reprocess-resume"
+            )
+    
+    async def shutdown(self) -> None:
+        """Interrupt the job, saving its checkpoint for resume"""
+        for task in (self._resume_task, self._task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._resume_task = None
+        self._task = None
+
+
+reprocess_job = ReprocessJob()
@@ -86,6 +86,26 @@ async def run_bot():
             raise
             
     finally:
+        # Checkpoint catalog reprocessing so it resumes on next start
+        try:
+            from app.tasks.reprocess import reprocess_job
+            await reprocess_job.shutdown()
+        except Exception as e:
+            logger.warning(f"Error stopping reprocessing job: {e}")
+        
+        try:
+            from app.tasks.file_sizes import file_size_backfill
+            await file_size_backfill.shutdown()
+        except Exception as e:
+            logger.warning(f"Error stopping file size backfill: {e}")
+        
+        # Write buffered download events before exiting
+        try:
+            from app.tasks.download_events import download_events
+            await download_events.stop()
+        except Exception as e:
+            logger.warning(f"Error flushing download events: {e}")
+        
         # Close Redis connection if used
         try:
             await close_redis()
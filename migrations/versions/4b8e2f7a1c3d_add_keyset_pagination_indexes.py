@@ -0,0 +1,42 @@
+"""add_keyset_pagination_indexes
+
+Composite (sort key, id) indexes for cursor pagination of files, users,
+downloads, saved lists and admin logs.
+
+Revision ID: 4b8e2f7a1c3d
+Revises: 9d2f6a3c8e15
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e2f7a1c3d'
+down_revision: Union[str, None] = '9d2f6a3c8e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_files_created_at_id', 'files', ['created_at', 'id']),
+    ('ix_files_file_type_created_at_id', 'files', ['file_type', 'created_at', 'id']),
+    ('ix_users_joined_at_id', 'users', ['joined_at', 'id']),
+    ('ix_downloads_user_id_downloaded_at_id', 'downloads', ['user_id', 'downloaded_at', 'id']),
+    ('ix_saved_list_user_id_saved_at_id', 'saved_list', ['user_id', 'saved_at', 'id']),
+    ('ix_admin_logs_created_at_id', 'admin_logs', ['created_at', 'id']),
+    ('ix_admin_logs_admin_id_created_at_id', 'admin_logs', ['admin_id', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,64 @@
+"""add_file_tags_table
+
+Normalized file_tags table (one row per tag and file) for tag filters,
+facet counts and browsing, backfilled from files.tags; plus a
+(level, created_at, id) index for browsing by level.
+
+Revision ID: 6e3a9c1f5b27
+Revises: 4b8e2f7a1c3d
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3a9c1f5b27'
+down_revision: Union[str, None] = '4b8e2f7a1c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MAX_TAG_LENGTH = 64
+
+
+def _normalize_tags(tags):
+    # Same rules as app.models.tags.normalize_tags at the time of this revision
+    result = []
+    for tag in (tags or '').split(','):
+        tag = ' '.join(tag.lower().split()).lstrip('#').lstrip()[:MAX_TAG_LENGTH].rstrip()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('file_tags'):
+        op.create_table(
+            'file_tags',
+            sa.Column('tag', sa.String(length=64), nullable=False),
+            sa.Column('file_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('tag', 'file_id')
+        )
+    op.create_index(op.f('ix_file_tags_file_id'), 'file_tags', ['file_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_files_level_created_at_id', 'files', ['level', 'created_at', 'id'], unique=False,
+                    if_not_exists=True)
+
+    # Backfill from files.tags
+    file_tags = sa.table('file_tags', sa.column('tag', sa.String), sa.column('file_id', sa.Integer))
+    bind.execute(sa.delete(file_tags))
+    files = bind.execute(sa.text("SELECT id, tags FROM files WHERE tags IS NOT NULL AND tags != ''")).all()
+    rows = [{'tag': tag, 'file_id': file_id} for file_id, tags in files for tag in _normalize_tags(tags)]
+    if rows:
+        op.bulk_insert(file_tags, rows)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_files_level_created_at_id', table_name='files', if_exists=True)
+    op.drop_index(op.f('ix_file_tags_file_id'), table_name='file_tags', if_exists=True)
+    op.drop_table('file_tags')
@@ -0,0 +1,81 @@
+"""add_file_search_index
+
+Full-text index over files.title, tags and description:
+FTS5 table + sync triggers on SQLite, generated tsvector column + GIN
+index on PostgreSQL.
+
+Revision ID: 7c1e4b9d2a6f
+Revises: f5e8c6d91c91
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4b9d2a6f'
+down_revision: Union[str, None] = 'f5e8c6d91c91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5("
+            "title, tags, description, content='files', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            """CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN
+                INSERT INTO files_fts(rowid, title, tags, description)
+                VALUES (new.id, new.title, new.tags, new.description);
+            END"""
+        )
+        op.execute(
+            """CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN
+                INSERT INTO files_fts(files_fts, rowid, title, tags, description)
+                VALUES ('delete', old.id, old.title, old.tags, old.description);
+            END"""
+        )
+        op.execute(
+            """CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE OF title, tags, description ON files BEGIN
+                INSERT INTO files_fts(files_fts, rowid, title, tags, description)
+                VALUES ('delete', old.id, old.title, old.tags, old.description);
+                INSERT INTO files_fts(rowid, title, tags, description)
+                VALUES (new.id, new.title, new.tags, new.description);
+            END"""
+        )
+        # Index existing rows
+        op.execute("INSERT INTO files_fts(files_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        # Generated column is filled for existing rows by the ALTER itself
+        op.execute(
+            "ALTER TABLE files ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+            ") STORED"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_files_search_vector ON files USING GIN (search_vector)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS files_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS files_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS files_fts_ai")
+        op.execute("DROP TABLE IF EXISTS files_fts")
+
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_files_search_vector")
+        op.execute("ALTER TABLE files DROP COLUMN IF EXISTS search_vector")
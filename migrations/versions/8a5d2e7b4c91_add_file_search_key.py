@@ -0,0 +1,76 @@
+"""add_file_search_key
+
+files.search_key: title lowercased, transliterated from Cyrillic to
+Uzbek Latin, without apostrophes - for script-independent equality and
+prefix lookups. Backfilled for existing rows.
+
+Revision ID: 8a5d2e7b4c91
+Revises: 6e3a9c1f5b27
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a5d2e7b4c91'
+down_revision: Union[str, None] = '6e3a9c1f5b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same rules as app.models.search_key.search_key at the time of this revision
+MAX_SEARCH_KEY_LENGTH = 255
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '',
+    'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+}
+APOSTROPHES = "'`´‘’ʻʼʹʽ′"
+VOWELS = set('аеёиоуэюяўaeiou')
+
+
+def _search_key(value):
+    value = unicodedata.normalize('NFKC', value or '').lower()
+    letters = []
+    previous = ''
+    for char in value:
+        if char == 'е' and (not previous.isalpha() or previous in VOWELS or previous in 'ъь'):
+            letters.append('ye')
+        else:
+            letters.append(CYRILLIC_TO_LATIN.get(char, char))
+        previous = char
+    value = ''.join(letters).translate(str.maketrans('', '', APOSTROPHES))
+    value = ''.join(char for char in unicodedata.normalize('NFKD', value) if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'[^\W_]+', value))[:MAX_SEARCH_KEY_LENGTH].rstrip()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = [column['name'] for column in sa.inspect(bind).get_columns('files')]
+    if 'search_key' not in columns:
+        op.add_column('files', sa.Column('search_key', sa.String(), nullable=True))
+    op.create_index('ix_files_search_key', 'files', ['search_key'], unique=False, if_not_exists=True,
+                    postgresql_ops={'search_key': 'text_pattern_ops'})
+
+    # Backfill existing rows
+    files = sa.table('files', sa.column('id', sa.Integer), sa.column('search_key', sa.String))
+    rows = bind.execute(sa.text('SELECT id, title FROM files')).all()
+    if rows:
+        bind.execute(
+            files.update().where(files.c.id == sa.bindparam('row_id')).values(search_key=sa.bindparam('new_key')),
+            [{'row_id': row_id, 'new_key': _search_key(title)} for row_id, title in rows]
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_files_search_key', table_name='files', if_exists=True)
+    op.drop_column('files', 'search_key')
@@ -0,0 +1,32 @@
+"""add_file_title_trigram_index
+
+pg_trgm GIN index on files.title for typo-tolerant search. SQLite
+deployments use an in-process trigram index instead (no schema change).
+
+Revision ID: 9d2f6a3c8e15
+Revises: 7c1e4b9d2a6f
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f6a3c8e15'
+down_revision: Union[str, None] = '7c1e4b9d2a6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_files_title_trgm ON files USING GIN (title gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_files_title_trgm")